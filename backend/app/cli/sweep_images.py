@@ -0,0 +1,47 @@
+"""
+Delete images nothing references any more
+
+    python -m app.cli.sweep_images [--grace-seconds 300] [--batch-size 200]
+
+Makes one full pass: scans ImageRefs for unreferenced images and deletes
+the ones released longer than the grace period ago. Run it on a schedule
+(cron, or an EventBridge rule invoking lambda_handler.sweep_images) where
+the API doesn't sweep in the background, e.g. on Lambda.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from ..services.image_sweeper import IMAGE_SWEEP_BATCH_SIZE, IMAGE_SWEEP_GRACE_SECONDS, ImageSweeper
+from ..services.s3_service import S3Service
+
+
+async def sweep_once(s3_service, sweeper):
+    """Schedule every unreferenced image, then delete the ones that are due; returns how many were deleted"""
+    await sweeper.scan(s3_service)
+    return await sweeper.sweep(s3_service)
+
+
+def sweep_images(grace_seconds=IMAGE_SWEEP_GRACE_SECONDS, batch_size=IMAGE_SWEEP_BATCH_SIZE):
+    """Run one sweep; returns the sweeper's counters"""
+    sweeper = ImageSweeper(grace_seconds=grace_seconds, batch_size=batch_size)
+    asyncio.run(sweep_once(S3Service(), sweeper))
+    return sweeper.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete images nothing references any more")
+    parser.add_argument("--grace-seconds", type=int, default=IMAGE_SWEEP_GRACE_SECONDS,
+                        help="how long an image must have been unreferenced")
+    parser.add_argument("--batch-size", type=int, default=IMAGE_SWEEP_BATCH_SIZE, help="images per delete batch")
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+    stats = sweep_images(grace_seconds=args.grace_seconds, batch_size=args.batch_size)
+    print(f"Deleted {stats['deleted']} images, kept {stats['kept']}, {stats['errors']} errors")
+    print(f"Done in {time.monotonic() - started:.1f}s")
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+"""
+Export and import DynamoDB tables as gzipped NDJSON
+
+    python -m app.cli.table_transfer export --dir dump/ [--tables Users Reviews] [--segments 8]
+    python -m app.cli.table_transfer import --dir dump/ [--tables Users Reviews] [--create-tables]
+
+Each line is {"Item": {...}} in DynamoDB JSON, the format DynamoDB's own
+S3 export uses. Exports are split into dump/<table>/segment-SSSS-part-PPPPP.ndjson.gz
+files. Both directions stream page by page or batch by batch, so memory
+use doesn't grow with the table. They also record checkpoints as they
+go: run the same command again to resume an interrupted run.
+"""
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import base64
+import boto3
+import glob
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from ..services.dynamodb_service import connection_args
+
+DEFAULT_TABLES = ("Users", "FoodStalls", "MenuItems", "Reviews")
+PART_ITEMS = 100000  # items per export file
+BATCH_WRITE_ITEMS = 25  # BatchWriteItem's limit
+BATCH_WRITE_MAX_ATTEMPTS = 8
+IMPORT_CHECKPOINT_ITEMS = 1000
+
+# Mirrors infrastructure/dynamodb/tables.js; keep the two in step.
+# Used to create missing tables (with their GSIs) before an import.
+TABLES = {
+    "Users": {
+        "key": [("id", "HASH")],
+        "attributes": {"id": "S", "email": "S"},
+        "indexes": {"EmailIndex": [("email", "HASH")]},
+    },
+    "FoodStalls": {
+        "key": [("id", "HASH")],
+        "attributes": {"id": "S", "owner_id": "S"},
+        "indexes": {"OwnerIndex": [("owner_id", "HASH")]},
+    },
+    "MenuItems": {
+        "key": [("id", "HASH")],
+        "attributes": {"id": "S", "food_stall_id": "S", "category": "S"},
+        "indexes": {
+            "FoodStallIndex": [("food_stall_id", "HASH")],
+            "CategoryIndex": [("food_stall_id", "HASH"), ("category", "RANGE")],
+        },
+    },
+    "Reviews": {
+        "key": [("id", "HASH")],
+        "attributes": {"id": "S", "food_stall_id": "S", "user_id": "S"},
+        "indexes": {
+            "FoodStallIndex": [("food_stall_id", "HASH")],
+            "UserReviewIndex": [("food_stall_id", "HASH"), ("user_id", "RANGE")],
+        },
+    },
+    "MenuDocuments": {
+        "key": [("food_stall_id", "HASH")],
+        "attributes": {"food_stall_id": "S"},
+        "indexes": {},
+    },
+    "LoginAttempts": {
+        "key": [("key", "HASH")],
+        "attributes": {"key": "S"},
+        "indexes": {},
+        "ttl": "expires_at",
+    },
+    "ImageRefs": {
+        "key": [("key", "HASH")],
+        "attributes": {"key": "S"},
+        "indexes": {},
+    },
+    "RefreshTokens": {
+        "key": [("id", "HASH")],
+        "attributes": {"id": "S"},
+        "indexes": {},
+        "ttl": "expires_at",
+    },
+}
+
+
+def create_client(endpoint_url=None, max_connections=10):
+    """Create a DynamoDB client sized for `max_connections` worker threads"""
+    config = Config(max_pool_connections=max_connections, retries={"mode": "adaptive", "max_attempts": 10})
+    return boto3.client("dynamodb", endpoint_url=endpoint_url, config=config, **connection_args())
+
+
+def _key_schema(key):
+    return [{"AttributeName": name, "KeyType": key_type} for name, key_type in key]
+
+
+def create_table(client, table):
+    """Create a table and its GSIs from TABLES unless it already exists"""
+    schema = TABLES[table]
+    params = {
+        "TableName": table,
+        "KeySchema": _key_schema(schema["key"]),
+        "AttributeDefinitions": [
+            {"AttributeName": name, "AttributeType": attribute_type}
+            for name, attribute_type in schema["attributes"].items()
+        ],
+        # On-demand, so bulk loads aren't throttled by provisioned capacity
+        "BillingMode": "PAY_PER_REQUEST",
+    }
+    if schema["indexes"]:
+        params["GlobalSecondaryIndexes"] = [
+            {"IndexName": name, "KeySchema": _key_schema(key), "Projection": {"ProjectionType": "ALL"}}
+            for name, key in schema["indexes"].items()
+        ]
+
+    try:
+        client.create_table(**params)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ResourceInUseException":
+            raise
+        return False
+
+    client.get_waiter("table_exists").wait(TableName=table)
+    if schema.get("ttl"):
+        client.update_time_to_live(
+            TableName=table,
+            TimeToLiveSpecification={"AttributeName": schema["ttl"], "Enabled": True}
+        )
+    return True
+
+
+def _encode_binary(value):
+    """Base64-encode the binary values in a DynamoDB JSON attribute value, like DynamoDB exports do"""
+    (tag, inner), = value.items()
+    if tag == "B":
+        return {"B": base64.b64encode(inner).decode("ascii")}
+    if tag == "BS":
+        return {"BS": [base64.b64encode(item).decode("ascii") for item in inner]}
+    if tag == "M":
+        return {"M": {name: _encode_binary(item) for name, item in inner.items()}}
+    if tag == "L":
+        return {"L": [_encode_binary(item) for item in inner]}
+    return value
+
+
+def _decode_binary(value):
+    """Undo _encode_binary"""
+    (tag, inner), = value.items()
+    if tag == "B":
+        return {"B": base64.b64decode(inner)}
+    if tag == "BS":
+        return {"BS": [base64.b64decode(item) for item in inner]}
+    if tag == "M":
+        return {"M": {name: _decode_binary(item) for name, item in inner.items()}}
+    if tag == "L":
+        return {"L": [_decode_binary(item) for item in inner]}
+    return value
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json_atomic(path, data):
+    """Replace a checkpoint file in one step, so an interrupted run never leaves half of one"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _part_path(table_dir, segment, part):
+    return os.path.join(table_dir, f"segment-{segment:04d}-part-{part:05d}.ndjson.gz")
+
+
+def export_segment(client, table, segment, total_segments, table_dir, part_items=PART_ITEMS):
+    """
+    Export one parallel scan segment, resuming from its checkpoint
+
+    Each part file is written under a temporary name and renamed into
+    place before the checkpoint moves past it. Returns the segment's
+    item count.
+    """
+    checkpoint_path = os.path.join(table_dir, f"segment-{segment:04d}.checkpoint.json")
+    state = _read_json(checkpoint_path) or {"parts": 0, "items": 0, "next_key": None, "done": False}
+    if state["done"]:
+        return state["items"]
+
+    params = {"TableName": table, "Segment": segment, "TotalSegments": total_segments}
+    next_key = state["next_key"]
+    while True:
+        part_path = _part_path(table_dir, segment, state["parts"])
+        tmp_path = part_path + ".tmp"
+        count = 0
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as out:
+            while count < part_items:
+                if next_key:
+                    params["ExclusiveStartKey"] = next_key
+                response = client.scan(**params)
+                for item in response.get("Items", []):
+                    out.write(json.dumps({"Item": {name: _encode_binary(value) for name, value in item.items()}}))
+                    out.write("\n")
+                count += len(response.get("Items", []))
+                next_key = response.get("LastEvaluatedKey")
+                if not next_key:
+                    break
+
+        if count:
+            os.replace(tmp_path, part_path)
+            state["parts"] += 1
+        else:
+            os.unlink(tmp_path)
+        state.update(items=state["items"] + count, next_key=next_key, done=not next_key)
+        _write_json_atomic(checkpoint_path, state)
+        print(f"{table} segment {segment + 1}/{total_segments}: {state['items']} items")
+        if state["done"]:
+            return state["items"]
+
+
+def export_tables(client, tables, directory, segments=4, workers=8, part_items=PART_ITEMS):
+    """Export tables with `segments` parallel scan segments each; returns {table: item count}"""
+    jobs = []
+    for table in tables:
+        table_dir = os.path.join(directory, table)
+        os.makedirs(table_dir, exist_ok=True)
+        manifest_path = os.path.join(table_dir, "export.json")
+        manifest = _read_json(manifest_path)
+        if manifest is None:
+            manifest = {"table": table, "segments": segments, "schema": TABLES.get(table), "complete": False}
+            _write_json_atomic(manifest_path, manifest)
+        elif manifest["segments"] != segments:
+            # The checkpoints belong to segments of a different split
+            raise ValueError(f"{table} was being exported with {manifest['segments']} segments, not {segments}")
+        jobs.extend((table, segment, table_dir) for segment in range(segments))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (table, executor.submit(export_segment, client, table, segment, segments, table_dir, part_items))
+            for table, segment, table_dir in jobs
+        ]
+        counts = {table: 0 for table in tables}
+        for table, future in futures:
+            counts[table] += future.result()
+
+    for table in tables:
+        manifest_path = os.path.join(directory, table, "export.json")
+        manifest = _read_json(manifest_path)
+        manifest.update(complete=True, items=counts[table])
+        _write_json_atomic(manifest_path, manifest)
+    return counts
+
+
+def write_batch(client, table, requests):
+    """BatchWriteItem with backoff until DynamoDB has processed every request"""
+    for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+        response = client.batch_write_item(RequestItems={table: requests})
+        requests = response.get("UnprocessedItems", {}).get(table)
+        if not requests:
+            return
+        # Throttled: back off with jitter before retrying the leftovers
+        time.sleep(min(0.05 * 2 ** attempt, 5.0) * random.uniform(0.5, 1.0))
+    raise RuntimeError(f"{len(requests)} items for {table} were still unprocessed after {BATCH_WRITE_MAX_ATTEMPTS} attempts")
+
+
+def import_part(client, table, path, checkpoint_path, checkpoint_items=IMPORT_CHECKPOINT_ITEMS):
+    """
+    Import one export file in batches of 25, resuming after its checkpoint
+
+    Puts are idempotent, so the few items after the last checkpoint may
+    safely be written again. Returns the number of items written.
+    """
+    state = _read_json(checkpoint_path) or {"lines": 0, "done": False}
+    if state["done"]:
+        return 0
+
+    written = 0
+    lines = 0
+    batch = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            lines += 1
+            if lines <= state["lines"] or not line.strip():
+                continue
+            item = json.loads(line)["Item"]
+            batch.append({"PutRequest": {"Item": {name: _decode_binary(value) for name, value in item.items()}}})
+            if len(batch) == BATCH_WRITE_ITEMS:
+                write_batch(client, table, batch)
+                written += len(batch)
+                batch = []
+                if lines - state["lines"] >= checkpoint_items:
+                    state["lines"] = lines
+                    _write_json_atomic(checkpoint_path, state)
+
+    if batch:
+        write_batch(client, table, batch)
+        written += len(batch)
+    _write_json_atomic(checkpoint_path, {"lines": lines, "done": True})
+    return written
+
+
+def import_tables(client, tables, directory, workers=8, checkpoint_dir=None, create_tables=False):
+    """Import exported tables, one export file per worker at a time; returns {table: items written}"""
+    jobs = []
+    for table in tables:
+        if create_tables and create_table(client, table):
+            print(f"Created table {table}")
+        table_checkpoint_dir = os.path.join(checkpoint_dir or directory, "import-checkpoints", table)
+        os.makedirs(table_checkpoint_dir, exist_ok=True)
+        for path in sorted(glob.glob(os.path.join(directory, table, "segment-*-part-*.ndjson.gz"))):
+            checkpoint_path = os.path.join(table_checkpoint_dir, os.path.basename(path) + ".json")
+            jobs.append((table, path, checkpoint_path))
+
+    counts = {table: 0 for table in tables}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (table, path, executor.submit(import_part, client, table, path, checkpoint_path))
+            for table, path, checkpoint_path in jobs
+        ]
+        for table, path, future in futures:
+            counts[table] += future.result()
+            print(f"{table}: imported {os.path.basename(path)}")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and import DynamoDB tables as gzipped NDJSON")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("--dir", required=True, help="directory holding one subdirectory per table")
+    parser.add_argument("--tables", nargs="+", default=list(DEFAULT_TABLES), choices=sorted(TABLES))
+    parser.add_argument("--segments", type=int, default=4, help="parallel scan segments per table (export)")
+    parser.add_argument("--workers", type=int, default=8, help="worker threads")
+    parser.add_argument("--create-tables", action="store_true", help="create missing tables first (import)")
+    parser.add_argument("--checkpoint-dir", help="where import checkpoints go (default: --dir)")
+    parser.add_argument("--endpoint-url", help="e.g. http://localhost:8000 for DynamoDB Local")
+    args = parser.parse_args(argv)
+
+    client = create_client(args.endpoint_url, max_connections=max(10, args.workers))
+    started = time.monotonic()
+    if args.command == "export":
+        counts = export_tables(client, args.tables, args.dir, segments=args.segments, workers=args.workers)
+    else:
+        counts = import_tables(
+            client,
+            args.tables,
+            args.dir,
+            workers=args.workers,
+            checkpoint_dir=args.checkpoint_dir,
+            create_tables=args.create_tables
+        )
+
+    for table, count in counts.items():
+        print(f"{table}: {count} items")
+    print(f"Done in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,11 @@
 from mangum import Mangum
 from app.main import app
+from app.cli.sweep_images import sweep_images as run_image_sweep
 
 # Handler for AWS Lambda
-handler = Mangum(app)
\ No newline at end of file
+handler = Mangum(app)
+
+
+def sweep_images(event, context):
+    """Handler for a scheduled (e.g. EventBridge) rule; background tasks don't survive between invocations"""
+    return run_image_sweep()
@@ -1,11 +1,29 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
 import os
-from .routers import auth, foodstalls, reviews, users, menus
+from .routers import auth, foodstalls, reviews, users, menus, search, uploads, media, live
 from .services.auth_service import get_current_user
+from .services.principal_cache import principal_cache, token_version_cache
+from .services.password_service import password_hasher, PasswordPoolBusy
+from .services.login_throttle import login_throttle
+from .services.s3_service import S3Service, UploadTooLargeError, STORAGE_BACKEND
+from .services.image_sweeper import IMAGE_SWEEPER_ENABLED, image_sweeper
+from .services.live_updates import live_updates
+from .services.read_cache import food_stall_cache, food_stall_scans, menu_cache, nearby_cache, review_cache
+from .utils.compression import CompressionMiddleware, response_compressor
 
-app = FastAPI(title="Food Stall Finder API")
+@asynccontextmanager
+async def lifespan(app):
+    # Reclaim replaced and deleted images in the background
+    if IMAGE_SWEEPER_ENABLED:
+        image_sweeper.start(S3Service())
+    yield
+    await image_sweeper.stop()
+
+app = FastAPI(title="Food Stall Finder API", lifespan=lifespan)
 
 # Configure CORS
 origins = [
@@ -24,6 +42,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON responses (gzip, or Brotli when installed)
+app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(auth.router, tags=["Authentication"], prefix="/auth")
 app.include_router(users.router, tags=["Users"], prefix="/users")
@@ -42,6 +63,43 @@ app.include_router(
     tags=["Menus"], 
     prefix="/menus"
 )
+app.include_router(
+    search.router, 
+    tags=["Search"], 
+    prefix="/search"
+)
+app.include_router(
+    uploads.router, 
+    tags=["Uploads"], 
+    prefix="/uploads"
+)
+app.include_router(
+    live.router, 
+    tags=["Live"], 
+    prefix="/live"
+)
+if STORAGE_BACKEND == "local":
+    app.include_router(
+        media.router, 
+        tags=["Media"], 
+        prefix="/media"
+    )
+
+@app.exception_handler(PasswordPoolBusy)
+async def password_pool_busy_handler(request: Request, exc: PasswordPoolBusy):
+    # Shed login/registration bursts instead of queueing them without bound
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many authentication requests, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(UploadTooLargeError)
+async def upload_too_large_handler(request: Request, exc: UploadTooLargeError):
+    return JSONResponse(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        content={"detail": str(exc)},
+    )
 
 @app.get("/")
 async def root():
@@ -51,6 +109,25 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": "2025-07-21T15:06:36", "user": "cuteszme"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "principal_cache": principal_cache.stats(),
+        "token_version_cache": token_version_cache.stats(),
+        "password_pool": password_hasher.stats(),
+        "login_throttle": login_throttle.stats(),
+        "image_sweeper": image_sweeper.stats(),
+        "compression": response_compressor.stats(),
+        "live_updates": live_updates.stats(),
+        "read_cache": {
+            "food_stalls": food_stall_cache.stats(),
+            "menus": menu_cache.stats(),
+            "reviews": review_cache.stats(),
+            "nearby": nearby_cache.stats(),
+            "food_stall_scans": food_stall_scans.stats()
+        }
+    }
+
 # Customize OpenAPI schema
 def custom_openapi():
     if app.openapi_schema:
@@ -1,6 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional, Dict
 
 class Location(BaseModel):
     latitude: float
@@ -19,16 +18,21 @@ class FoodStallUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     location: Optional[Location] = None
-    image_url: Optional[str] = None
+
+class MenuFacets(BaseModel):
+    item_count: int = 0
+    categories: Dict[str, int] = {}
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    median_price: Optional[float] = None
 
 class FoodStall(FoodStallBase):
     id: str
     owner_id: str
     image_url: str
+    image_variants: Dict[str, str] = {}  # variant name -> URL, e.g. thumb, detail, full
+    created_at: str
+    updated_at: str
     average_rating: float = 0.0
     review_count: int = 0
-    created_at: datetime
-    updated_at: datetime
-
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    menu_facets: Optional[MenuFacets] = None
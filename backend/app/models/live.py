@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from ..services.live_updates import LIVE_MAX_RADIUS_KM
+
+class LiveBounds(BaseModel):
+    south: float = Field(ge=-90, le=90)
+    west: float = Field(ge=-180, le=180)
+    north: float = Field(ge=-90, le=90)
+    east: float = Field(ge=-180, le=180)
+
+class LiveArea(BaseModel):
+    # Either a point and radius (in kilometers) or a map viewport
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    radius: Optional[float] = Field(None, gt=0, le=LIVE_MAX_RADIUS_KM)
+    bounds: Optional[LiveBounds] = None
@@ -1,10 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel
+from typing import Dict, Optional, List
 
 class MenuItemBase(BaseModel):
     name: str
-    price: float = Field(..., gt=0)
+    price: float
     description: str
     category: str
 
@@ -13,17 +12,29 @@ class MenuItemCreate(MenuItemBase):
 
 class MenuItemUpdate(BaseModel):
     name: Optional[str] = None
-    price: Optional[float] = Field(None, gt=0)
+    price: Optional[float] = None
     description: Optional[str] = None
     category: Optional[str] = None
-    image_url: Optional[str] = None
 
 class MenuItem(MenuItemBase):
     id: str
     food_stall_id: str
     image_url: str
-    created_at: datetime
-    updated_at: datetime
+    image_variants: Dict[str, str] = {}  # variant name -> URL, e.g. thumb, detail, full
 
-    class Config:
-        orm_mode = True
\ No newline at end of file
+class MenuDocument(BaseModel):
+    food_stall_id: str
+    version: int
+    updated_at: str
+    items: List[MenuItem]
+
+class MenuImportRow(BaseModel):
+    row: int  # manifest row, numbered from 1
+    status: str  # "created" or "failed"
+    item: Optional[MenuItem] = None
+    error: Optional[str] = None
+
+class MenuImportResult(BaseModel):
+    created: int
+    failed: int
+    results: List[MenuImportRow]
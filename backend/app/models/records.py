@@ -0,0 +1,95 @@
+from collections.abc import MutableMapping
+
+
+class Record(MutableMapping):
+    """
+    Compact DynamoDB item with its known attributes in __slots__
+
+    Behaves like the item dict it replaces (item["name"], item.get("price"),
+    "id" in item, dict(item)), without a per-item hash table. Attributes a
+    subclass doesn't declare are kept in `extra`.
+    """
+
+    __slots__ = ("extra",)
+    fields = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.fields = frozenset(cls.__slots__)
+
+    def __init__(self, attributes=()):
+        self.extra = None
+        for name, value in dict(attributes).items():
+            self[name] = value
+
+    def __getitem__(self, name):
+        if name in self.fields:
+            try:
+                return getattr(self, name)
+            except AttributeError:
+                raise KeyError(name) from None
+        if self.extra is None:
+            raise KeyError(name)
+        return self.extra[name]
+
+    def __setitem__(self, name, value):
+        if name in self.fields:
+            setattr(self, name, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[name] = value
+
+    def __delitem__(self, name):
+        if name in self.fields:
+            try:
+                delattr(self, name)
+            except AttributeError:
+                raise KeyError(name) from None
+        elif self.extra is not None and name in self.extra:
+            del self.extra[name]
+        else:
+            raise KeyError(name)
+
+    def __iter__(self):
+        for name in self.__slots__:
+            if hasattr(self, name):
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def get(self, name, default=None):
+        if name in self.fields:
+            return getattr(self, name, default)
+        if self.extra is None:
+            return default
+        return self.extra.get(name, default)
+
+    def __contains__(self, name):
+        if name in self.fields:
+            return hasattr(self, name)
+        return self.extra is not None and name in self.extra
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class FoodStallRecord(Record):
+    __slots__ = (
+        "id", "owner_id", "name", "description", "location", "image_url", "image_variants",
+        "average_rating", "review_count", "menu_facets", "created_at", "updated_at"
+    )
+
+
+class MenuItemRecord(Record):
+    __slots__ = (
+        "id", "food_stall_id", "name", "price", "description", "category", "image_url",
+        "image_variants", "created_at", "updated_at"
+    )
+
+
+class ReviewRecord(Record):
+    __slots__ = ("id", "food_stall_id", "user_id", "user_name", "rating", "comment", "created_at", "updated_at")
@@ -1,16 +1,15 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
 
 class ReviewBase(BaseModel):
-    rating: int = Field(..., ge=1, le=5)
+    rating: int  # 1-5, checked by the router
     comment: str
 
 class ReviewCreate(ReviewBase):
     pass
 
 class ReviewUpdate(BaseModel):
-    rating: Optional[int] = Field(None, ge=1, le=5)
+    rating: Optional[int] = None
     comment: Optional[str] = None
 
 class Review(ReviewBase):
@@ -18,8 +17,5 @@ class Review(ReviewBase):
     food_stall_id: str
     user_id: str
     user_name: str
-    created_at: datetime
-    updated_at: datetime
-
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    created_at: str
+    updated_at: str
@@ -0,0 +1,4 @@
+from pydantic import BaseModel
+
+class ImageAttach(BaseModel):
+    key: str  # key returned by POST /uploads/presign
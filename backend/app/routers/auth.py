@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
 from ..services.user_service import UserService
-from ..services.auth_service import AuthService
+from ..services.auth_service import AuthService, get_current_user
+from ..services.login_throttle import login_throttle
+import math
+import os
+
+# Take the client IP from X-Forwarded-For (only safe behind a trusted proxy)
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"
 
 router = APIRouter()
 auth_service = AuthService()
@@ -16,6 +22,10 @@ class Token(BaseModel):
     token_type: str
     user_id: str
     user_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class UserCreate(BaseModel):
     email: str
@@ -41,35 +51,90 @@ async def register(user_data: UserCreate):
         user_type=user_data.user_type
     )
     
-    # Generate token
+    # Generate tokens
+    user = {
+        "id": user_id,
+        "email": user_data.email,
+        "name": user_data.name,
+        "user_type": user_data.user_type,
+        "token_version": 0
+    }
     access_token = auth_service.create_access_token(
-        data={"sub": user_id, "user_type": user_data.user_type}
+        data=auth_service.access_token_claims(user)
     )
     
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "user_id": user_id,
-        "user_type": user_data.user_type
+        "user_type": user_data.user_type,
+        "refresh_token": await auth_service.issue_refresh_token(user)
     }
 
+def get_client_ip(request: Request):
+    if TRUST_PROXY_HEADERS:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else None
+
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    client_ip = get_client_ip(request)
+    
+    # Reject throttled callers before any DynamoDB or bcrypt work
+    retry_after = await login_throttle.check(form_data.username, client_ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    
     user = await auth_service.authenticate_user(form_data.username, form_data.password)
     if not user:
+        await login_throttle.record_failure(form_data.username, client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    await login_throttle.record_success(form_data.username, client_ip)
+    
     access_token = auth_service.create_access_token(
-        data={"sub": user["id"], "user_type": user["user_type"]}
+        data=auth_service.access_token_claims(user)
     )
     
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "user_id": user["id"],
-        "user_type": user["user_type"]
-    }
\ No newline at end of file
+        "user_type": user["user_type"],
+        "refresh_token": await auth_service.issue_refresh_token(user)
+    }
+
+@router.post("/refresh", response_model=Token)
+async def refresh(refresh_request: RefreshRequest):
+    tokens = await auth_service.refresh_user_tokens(refresh_request.refresh_token)
+    if not tokens:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or revoked refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return {
+        "access_token": tokens["access_token"],
+        "token_type": "bearer",
+        "user_id": tokens["user"]["id"],
+        "user_type": tokens["user"]["user_type"],
+        "refresh_token": tokens["refresh_token"]
+    }
+
+@router.post("/logout-all")
+async def logout_all(current_user: dict = Depends(get_current_user)):
+    """Revoke every access and refresh token issued to the current user"""
+    await user_service.revoke_tokens(current_user["id"])
+    
+    return {"message": "All sessions have been signed out"}
\ No newline at end of file
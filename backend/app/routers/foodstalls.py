@@ -1,48 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Request, Response
 from typing import List, Optional
-from pydantic import BaseModel
 import json
+from ..models.food_stall import FoodStall
+from ..models.upload import ImageAttach
 from ..services.auth_service import get_current_user
 from ..services.foodstall_service import FoodStallService
 from ..services.s3_service import S3Service
+from ..utils.fast_json import model_response, parse_fields
+from ..utils.http_cache import collection_etag, not_modified_response, weak_etag
 
 router = APIRouter()
 foodstall_service = FoodStallService()
 s3_service = S3Service()
 
-class Location(BaseModel):
-    latitude: float
-    longitude: float
-    address: str
-
-class FoodStallBase(BaseModel):
-    name: str
-    description: str
-    location: Location
-
-class FoodStallCreate(FoodStallBase):
-    pass
-
-class FoodStallUpdate(BaseModel):
-    name: Optional[str] = None
-    description: Optional[str] = None
-    location: Optional[Location] = None
-
-class FoodStall(FoodStallBase):
-    id: str
-    owner_id: str
-    image_url: str
-    created_at: str
-    updated_at: str
-    average_rating: float = 0.0
-    review_count: int = 0
-
 @router.post("/", response_model=FoodStall)
 async def create_food_stall(
     name: str = Form(...),
     description: str = Form(...),
     location_data: str = Form(...),  # JSON string containing location data
-    image: UploadFile = File(...),
+    image: Optional[UploadFile] = File(None),
+    image_key: Optional[str] = Form(None),  # key of an image uploaded via /uploads/presign
     current_user: dict = Depends(get_current_user)
 ):
     # Verify user is an owner
@@ -61,46 +38,95 @@ async def create_food_stall(
             detail="Invalid location data format"
         )
     
-    # Upload image to S3
-    image_url = await s3_service.upload_file(
-        file=image,
-        folder="food_stalls",
-        object_id=f"{current_user['id']}_{name.replace(' ', '_').lower()}"
-    )
+    if image_key:
+        # Image was already uploaded straight to S3
+        try:
+            prepared = await s3_service.finalize_direct_upload(
+                key=image_key,
+                folder="food_stalls",
+                owner_id=current_user["id"]
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    elif image:
+        # Hash and resize the image; it is uploaded while the stall is written
+        prepared = await s3_service.prepare_image(
+            file=image,
+            folder="food_stalls"
+        )
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either an image or an image_key is required"
+        )
     
-    # Create food stall
-    food_stall = await foodstall_service.create_food_stall(
-        name=name,
-        description=description,
-        location=location,
-        image_url=image_url,
-        owner_id=current_user["id"]
+    # Create food stall while its image uploads; it is deleted again if the upload fails
+    food_stall = await s3_service.store_image_with(
+        prepared,
+        foodstall_service.create_food_stall(
+            name=name,
+            description=description,
+            location=location,
+            image_url=prepared["image_url"],
+            image_variants=prepared["image_variants"],
+            owner_id=current_user["id"]
+        ),
+        undo=lambda stall: foodstall_service.delete_food_stall(stall["id"])
     )
     
     return food_stall
 
 @router.get("/", response_model=List[FoodStall])
 async def get_food_stalls(
+    request: Request,
+    response: Response,
     latitude: Optional[float] = None,
     longitude: Optional[float] = None,
     radius: Optional[float] = None,  # in kilometers
+    fields: Optional[str] = None,  # comma-separated, e.g. "id,name,location,average_rating"
     current_user: dict = Depends(get_current_user)
 ):
+    try:
+        field_names = parse_fields(fields, FoodStall)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Only the requested attributes are read from DynamoDB, plus the ones the ETag is built from
+    read_fields = set(field_names) | {"id", "updated_at"} if field_names else None
+    
     # If location is provided, filter by proximity
     if latitude and longitude and radius:
         food_stalls = await foodstall_service.get_food_stalls_by_location(
             latitude=latitude,
             longitude=longitude,
-            radius=radius
+            radius=radius,
+            fields=read_fields
         )
     else:
-        food_stalls = await foodstall_service.get_all_food_stalls()
+        food_stalls = await foodstall_service.get_all_food_stalls(fields=read_fields)
+    
+    not_modified = not_modified_response(
+        request,
+        response,
+        collection_etag(food_stalls, "food_stalls", latitude, longitude, radius, field_names)
+    )
+    if not_modified:
+        return not_modified
     
-    return food_stalls
+    # Stalls were validated when written; skip re-validating them on the way out
+    return model_response(FoodStall, food_stalls, response, field_names)
 
 @router.get("/{stall_id}", response_model=FoodStall)
 async def get_food_stall(
     stall_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user)
 ):
     food_stall = await foodstall_service.get_food_stall_by_id(stall_id)
@@ -110,7 +136,15 @@ async def get_food_stall(
             detail="Food stall not found"
         )
     
-    return food_stall
+    not_modified = not_modified_response(
+        request,
+        response,
+        weak_etag("food_stall", stall_id, food_stall.get("updated_at"))
+    )
+    if not_modified:
+        return not_modified
+    
+    return model_response(FoodStall, food_stall, response)
 
 @router.put("/{stall_id}", response_model=FoodStall)
 async def update_food_stall(
@@ -146,24 +180,83 @@ async def update_food_stall(
                 detail="Invalid location data format"
             )
     
-    # Upload new image if provided
-    image_url = None
+    # Prepare new image if provided
+    prepared = None
     if image:
-        image_url = await s3_service.upload_file(
+        prepared = await s3_service.prepare_image(
             file=image,
-            folder="food_stalls",
-            object_id=f"{current_user['id']}_{food_stall['name'].replace(' ', '_').lower()}"
+            folder="food_stalls"
         )
     
     # Update food stall
-    updated_stall = await foodstall_service.update_food_stall(
+    update = foodstall_service.update_food_stall(
         stall_id=stall_id,
         name=name,
         description=description,
         location=location,
-        image_url=image_url
+        image_url=prepared["image_url"] if prepared else None,
+        image_variants=prepared["image_variants"] if prepared else None
+    )
+    if not prepared:
+        return await update
+    
+    return await _replace_image(food_stall, prepared, update)
+
+@router.post("/{stall_id}/image", response_model=FoodStall)
+async def attach_food_stall_image(
+    stall_id: str,
+    image_attach: ImageAttach,
+    current_user: dict = Depends(get_current_user)
+):
+    """Attach an image uploaded via a presigned POST to a food stall"""
+    # Verify ownership
+    food_stall = await foodstall_service.get_food_stall_by_id(stall_id)
+    if not food_stall:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Food stall not found"
+        )
+    
+    if food_stall["owner_id"] != current_user["id"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to update this food stall"
+        )
+    
+    try:
+        prepared = await s3_service.finalize_direct_upload(
+            key=image_attach.key,
+            folder="food_stalls",
+            owner_id=current_user["id"]
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    update = foodstall_service.update_food_stall(
+        stall_id=stall_id,
+        image_url=prepared["image_url"],
+        image_variants=prepared["image_variants"]
+    )
+    return await _replace_image(food_stall, prepared, update)
+
+async def _replace_image(food_stall, prepared, update):
+    """Run a stall update that switches to a prepared image while the image uploads"""
+    # If the upload fails, point the stall back at its previous image
+    updated_stall = await s3_service.store_image_with(
+        prepared,
+        update,
+        undo=lambda stall: foodstall_service.update_food_stall(
+            stall_id=food_stall["id"],
+            image_url=food_stall["image_url"],
+            image_variants=food_stall.get("image_variants")
+        )
     )
     
+    # The previous image is deleted by the sweeper once nothing else uses it
+    await s3_service.release_image(food_stall.get("image_url"))
     return updated_stall
 
 @router.delete("/{stall_id}")
@@ -186,5 +279,6 @@ async def delete_food_stall(
         )
     
     await foodstall_service.delete_food_stall(stall_id)
+    await s3_service.release_image(food_stall.get("image_url"))
     
     return {"message": "Food stall deleted successfully"}
\ No newline at end of file
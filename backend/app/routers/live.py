@@ -0,0 +1,105 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, WebSocketException, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+import asyncio
+import os
+from ..models.live import LiveArea
+from ..services.auth_service import get_current_user
+from ..services.live_updates import LIVE_MAX_RADIUS_KM, live_updates
+from ..utils.fast_json import dumps
+
+# Idle SSE streams send a comment this often so proxies keep them open
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "25"))
+
+router = APIRouter()
+
+def watch_area(subscription, area):
+    """Point a subscription at a LiveArea; raises ValueError if the area is incomplete or too large"""
+    if area.bounds is not None:
+        bounds = area.bounds
+        live_updates.watch_bounds(subscription, bounds.south, bounds.west, bounds.north, bounds.east)
+    elif None not in (area.latitude, area.longitude, area.radius):
+        live_updates.watch_radius(subscription, area.latitude, area.longitude, area.radius)
+    else:
+        raise ValueError("Send either bounds or latitude, longitude and radius")
+
+async def websocket_user(token: str = Query(...)):
+    # Browsers can't set headers on a WebSocket, so the token is a query parameter
+    try:
+        return await get_current_user(token)
+    except HTTPException:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+
+async def send_events(websocket, subscription):
+    while True:
+        message = await subscription.queue.get()
+        await websocket.send_text(dumps(message).decode("utf-8"))
+
+@router.websocket("/stalls")
+async def live_stalls(websocket: WebSocket, current_user: dict = Depends(websocket_user)):
+    """
+    Push stall changes inside an area
+
+    Send {"latitude", "longitude", "radius"} or {"bounds": {"south", "west",
+    "north", "east"}} to choose the area, and again whenever it changes.
+    Events are {"type": "created" | "updated" | "moved" | "rated" | "deleted",
+    "stall": ...}; after {"type": "resync"} some were dropped, so refetch
+    GET /foodstalls/ for the area.
+    """
+    await websocket.accept()
+    subscription = live_updates.subscribe()
+    # Everything goes out through the queue so only one task writes to the socket
+    sender = asyncio.create_task(send_events(websocket, subscription))
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                watch_area(subscription, LiveArea.model_validate_json(text))
+            except ValidationError as e:
+                live_updates.send(subscription, {"type": "error", "detail": e.errors(include_url=False, include_context=False)})
+            except ValueError as e:
+                live_updates.send(subscription, {"type": "error", "detail": str(e)})
+            else:
+                live_updates.send(subscription, {"type": "subscribed", "cells": len(subscription.cells)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        live_updates.unsubscribe(subscription)
+
+@router.get("/stalls/events")
+async def live_stall_events(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius: float = Query(..., gt=0, le=LIVE_MAX_RADIUS_KM),  # in kilometers
+    current_user: dict = Depends(get_current_user)
+):
+    """The same events as the WebSocket, as Server-Sent Events for one fixed area"""
+    subscription = live_updates.subscribe()
+    try:
+        live_updates.watch_radius(subscription, latitude, longitude, radius)
+    except ValueError as e:
+        live_updates.unsubscribe(subscription)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    async def stream():
+        try:
+            yield f"event: subscribed\ndata: {len(subscription.cells)}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {message['type']}\ndata: {dumps(message).decode('utf-8')}\n\n"
+        finally:
+            live_updates.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,72 @@
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from ..services.s3_service import S3Service
+
+# Only mounted when STORAGE_BACKEND=local
+router = APIRouter()
+s3_service = S3Service()
+
+@router.api_route("/{key:path}", methods=["GET", "HEAD"])
+async def get_media(key: str):
+    """
+    Serve a locally stored object
+
+    Range requests are supported, and servers that implement the ASGI
+    pathsend extension send the file with sendfile.
+    """
+    store = s3_service.s3
+    try:
+        metadata = await run_in_threadpool(store.read_metadata, key)
+    except ValueError:
+        metadata = None
+    if metadata is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Object not found"
+        )
+
+    headers = {}
+    if metadata.get("CacheControl"):
+        headers["Cache-Control"] = metadata["CacheControl"]
+    return FileResponse(store.path_for(key), media_type=metadata["ContentType"], headers=headers)
+
+@router.post("", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_media(request: Request):
+    """Accept a presigned POST upload, like S3 does for the URL from /uploads/presign"""
+    store = s3_service.s3
+    form = await request.form()
+    file = form.get("file")
+    if file is None or isinstance(file, str):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A file is required"
+        )
+
+    try:
+        policy = store.verify_presigned_post(form.get("policy", ""), form.get("signature"))
+    except (ValueError, KeyError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=str(e) or "Invalid upload policy"
+        )
+
+    if form.get("key") != policy["key"] or form.get("Content-Type") != policy["content_type"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Upload does not match its policy"
+        )
+    if policy["max_bytes"] is not None and (file.size or 0) > policy["max_bytes"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is too large"
+        )
+
+    await run_in_threadpool(
+        store.upload_fileobj,
+        file.file,
+        None,
+        policy["key"],
+        ExtraArgs={"ContentType": policy["content_type"]}
+    )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
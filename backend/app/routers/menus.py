@@ -1,30 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
 from typing import List, Optional
-from pydantic import BaseModel
+import asyncio
 import json
+import os
+import shutil
+import tempfile
+import zipfile
+from ..models.menu import MenuDocument, MenuImportResult, MenuItem
+from ..models.upload import ImageAttach
 from ..services.auth_service import get_current_user
-from ..services.menu_service import MenuService
+from ..services.menu_service import MenuItemsNotCreated, MenuService
 from ..services.foodstall_service import FoodStallService
-from ..services.s3_service import S3Service
+from ..services.s3_service import S3Service, MAX_UPLOAD_BYTES
+from ..utils.fast_json import model_response, parse_fields
+from ..utils.http_cache import not_modified_response, weak_etag
+from ..utils.menu_import import parse_menu_manifest, validate_menu_rows
 
 router = APIRouter()
 menu_service = MenuService()
 foodstall_service = FoodStallService()
 s3_service = S3Service()
 
-class MenuItemBase(BaseModel):
-    name: str
-    price: float
-    description: str
-    category: str
-
-class MenuItemCreate(MenuItemBase):
-    pass
-
-class MenuItem(MenuItemBase):
-    id: str
-    food_stall_id: str
-    image_url: str
+# Menu import configuration
+MENU_IMPORT_MAX_ROWS = int(os.getenv("MENU_IMPORT_MAX_ROWS", "500"))
+MENU_IMPORT_CONCURRENCY = int(os.getenv("MENU_IMPORT_CONCURRENCY", "8"))  # images uploaded at once
 
 @router.post("/items/{stall_id}", response_model=MenuItem)
 async def add_menu_item(
@@ -33,7 +34,8 @@ async def add_menu_item(
     price: float = Form(...),
     description: str = Form(...),
     category: str = Form(...),
-    image: UploadFile = File(...),
+    image: Optional[UploadFile] = File(None),
+    image_key: Optional[str] = Form(None),  # key of an image uploaded via /uploads/presign
     current_user: dict = Depends(get_current_user)
 ):
     # Verify ownership
@@ -50,31 +52,205 @@ async def add_menu_item(
             detail="You don't have permission to add menu items to this food stall"
         )
     
-    # Upload image to S3
-    image_url = await s3_service.upload_file(
-        file=image,
-        folder="menu_items",
-        object_id=f"{stall_id}_{name.replace(' ', '_').lower()}"
-    )
+    if image_key:
+        # Image was already uploaded straight to S3
+        try:
+            prepared = await s3_service.finalize_direct_upload(
+                key=image_key,
+                folder="menu_items",
+                owner_id=current_user["id"]
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    elif image:
+        # Hash and resize the image; it is uploaded while the item is written
+        prepared = await s3_service.prepare_image(
+            file=image,
+            folder="menu_items"
+        )
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either an image or an image_key is required"
+        )
     
-    # Create menu item
-    menu_item = await menu_service.create_menu_item(
-        food_stall_id=stall_id,
-        name=name,
-        price=price,
-        description=description,
-        category=category,
-        image_url=image_url
+    # Create menu item while its image uploads; it is deleted again if the upload fails
+    menu_item = await s3_service.store_image_with(
+        prepared,
+        menu_service.create_menu_item(
+            food_stall_id=stall_id,
+            name=name,
+            price=price,
+            description=description,
+            category=category,
+            image_url=prepared["image_url"],
+            image_variants=prepared["image_variants"]
+        ),
+        undo=lambda item: menu_service.delete_menu_item(item["id"])
     )
     
     return menu_item
 
+@router.post("/import/{stall_id}", response_model=MenuImportResult)
+async def import_menu(
+    stall_id: str,
+    manifest: UploadFile = File(...),  # CSV or JSON: name, price, description, category, image
+    images: UploadFile = File(...),  # zip holding the images the manifest names
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Add many menu items at once
+    
+    Every row is validated before anything is written. Images are uploaded
+    concurrently (each distinct image once), items are written with batched
+    writes and the menu document is rewritten once. Rows whose image fails
+    to upload are reported as failed; the rest are created. If the items
+    can't be saved, none are and every row is reported as failed.
+    """
+    # Verify ownership
+    food_stall = await foodstall_service.get_food_stall_by_id(stall_id)
+    if not food_stall:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Food stall not found"
+        )
+    
+    if food_stall["owner_id"] != current_user["id"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to add menu items to this food stall"
+        )
+    
+    try:
+        rows = parse_menu_manifest(await manifest.read(), manifest.filename, manifest.content_type)
+        archive = zipfile.ZipFile(images.file)
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if not rows or len(rows) > MENU_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A manifest must have between 1 and {MENU_IMPORT_MAX_ROWS} rows"
+        )
+    
+    image_sizes = {info.filename: info.file_size for info in archive.infolist() if not info.is_dir()}
+    rows, errors = validate_menu_rows(rows, image_sizes, MAX_UPLOAD_BYTES)
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=errors
+        )
+    
+    # Upload each distinct image once; rows sharing it take extra references
+    rows_by_image = {}
+    for row in rows:
+        rows_by_image.setdefault(row["image"], []).append(row)
+    
+    semaphore = asyncio.Semaphore(MENU_IMPORT_CONCURRENCY)
+    uploads = await asyncio.gather(
+        *(_import_image(archive, image_rows, semaphore) for image_rows in rows_by_image.values()),
+        return_exceptions=True
+    )
+    
+    results = []
+    ready = []
+    for image_rows, uploaded in zip(rows_by_image.values(), uploads):
+        if isinstance(uploaded, BaseException):
+            print(f"Error importing menu image {image_rows[0]['image']}: {uploaded}")
+            results.extend(
+                {"row": row["row"], "status": "failed", "error": f"Image upload failed: {uploaded}"}
+                for row in image_rows
+            )
+            continue
+        for row in image_rows:
+            ready.append(dict(row, **uploaded))
+    
+    try:
+        menu_items = await menu_service.create_menu_items(stall_id, ready)
+    except MenuItemsNotCreated as e:
+        # Every item written was deleted again, so none of their image
+        # references are needed and the rows can be retried as they are.
+        # On any other error some items may exist and keep theirs: an
+        # unused image beats an item without one.
+        print(f"Error importing menu items for food stall {stall_id}: {e}")
+        for row in ready:
+            await s3_service.release_image(row["image_url"])
+        results.extend(
+            {"row": row["row"], "status": "failed", "error": f"Could not save menu items; retry the import: {e}"}
+            for row in ready
+        )
+        menu_items = []
+    
+    results.extend(
+        {"row": row["row"], "status": "created", "item": menu_item}
+        for row, menu_item in zip(ready, menu_items)
+    )
+    results.sort(key=lambda result: result["row"])
+    
+    return {
+        "created": len(menu_items),
+        "failed": len(results) - len(menu_items),
+        "results": results
+    }
+
+def _extract_image(archive, name):
+    """Copy an image out of the archive into a seekable temporary file"""
+    fileobj = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    with archive.open(name) as member:
+        shutil.copyfileobj(member, fileobj)
+    fileobj.seek(0)
+    return fileobj
+
+async def _import_image(archive, image_rows, semaphore):
+    """Upload one image for the rows that use it, taking one reference per row"""
+    first = image_rows[0]
+    async with semaphore:
+        fileobj = await run_in_threadpool(_extract_image, archive, first["image"])
+        try:
+            image = UploadFile(
+                file=fileobj,
+                filename=first["image"],
+                headers=Headers({"content-type": first["content_type"]})
+            )
+            uploaded = await s3_service.upload_image(file=image, folder="menu_items")
+        finally:
+            fileobj.close()
+    
+    key = s3_service.get_key(uploaded["image_url"])
+    acquired = 1
+    try:
+        for _ in image_rows[1:]:
+            await s3_service.acquire_image(key)
+            acquired += 1
+    except Exception:
+        for _ in range(acquired):
+            await s3_service.release_image(uploaded["image_url"])
+        raise
+    return uploaded
+
 @router.get("/items/{stall_id}", response_model=List[MenuItem])
 async def get_menu_items(
     stall_id: str,
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
+    fields: Optional[str] = None,  # comma-separated, e.g. "id,name,price"
     current_user: dict = Depends(get_current_user)
 ):
+    try:
+        field_names = parse_fields(fields, MenuItem)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
     # Verify food stall exists
     food_stall = await foodstall_service.get_food_stall_by_id(stall_id)
     if not food_stall:
@@ -83,16 +259,58 @@ async def get_menu_items(
             detail="Food stall not found"
         )
     
-    # Get menu items
+    # Get menu items from the materialized menu document
+    document = await menu_service.get_menu_document(stall_id)
+    response.headers["X-Menu-Version"] = str(document["version"])
+    
+    # The document version changes with every menu write
+    not_modified = not_modified_response(
+        request,
+        response,
+        weak_etag("menu_items", stall_id, document["version"], category, field_names)
+    )
+    if not_modified:
+        return not_modified
+    
+    # The whole menu is one document, so fields only trims the response
+    menu_items = document["items"]
     if category:
-        menu_items = await menu_service.get_menu_items_by_category(
-            food_stall_id=stall_id,
-            category=category
+        menu_items = [item for item in menu_items if item.get("category") == category]
+    
+    return model_response(MenuItem, menu_items, response, field_names)
+
+@router.get("/document/{stall_id}", response_model=MenuDocument)
+async def get_menu_document(
+    stall_id: str,
+    request: Request,
+    response: Response,
+    category: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    # Verify food stall exists
+    food_stall = await foodstall_service.get_food_stall_by_id(stall_id)
+    if not food_stall:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Food stall not found"
         )
-    else:
-        menu_items = await menu_service.get_menu_items(food_stall_id=stall_id)
     
-    return menu_items
+    document = await menu_service.get_menu_document(stall_id)
+    response.headers["X-Menu-Version"] = str(document["version"])
+    
+    not_modified = not_modified_response(
+        request,
+        response,
+        weak_etag("menu_document", stall_id, document["version"], category)
+    )
+    if not_modified:
+        return not_modified
+    
+    if category:
+        document = dict(document)
+        document["items"] = [item for item in document["items"] if item.get("category") == category]
+    
+    return model_response(MenuDocument, document, response)
 
 @router.put("/items/{item_id}", response_model=MenuItem)
 async def update_menu_item(
@@ -120,25 +338,86 @@ async def update_menu_item(
             detail="You don't have permission to update this menu item"
         )
     
-    # Upload new image if provided
-    image_url = None
+    # Prepare new image if provided
+    prepared = None
     if image:
-        image_url = await s3_service.upload_file(
+        prepared = await s3_service.prepare_image(
             file=image,
-            folder="menu_items",
-            object_id=f"{menu_item['food_stall_id']}_{menu_item['name'].replace(' ', '_').lower()}"
+            folder="menu_items"
         )
     
     # Update menu item
-    updated_item = await menu_service.update_menu_item(
+    update = menu_service.update_menu_item(
         item_id=item_id,
         name=name,
         price=price,
         description=description,
         category=category,
-        image_url=image_url
+        image_url=prepared["image_url"] if prepared else None,
+        image_variants=prepared["image_variants"] if prepared else None
+    )
+    if not prepared:
+        return await update
+    
+    return await _replace_image(menu_item, prepared, update)
+
+@router.post("/items/{item_id}/image", response_model=MenuItem)
+async def attach_menu_item_image(
+    item_id: str,
+    image_attach: ImageAttach,
+    current_user: dict = Depends(get_current_user)
+):
+    """Attach an image uploaded via a presigned POST to a menu item"""
+    # Get menu item
+    menu_item = await menu_service.get_menu_item_by_id(item_id)
+    if not menu_item:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Menu item not found"
+        )
+    
+    # Verify ownership
+    food_stall = await foodstall_service.get_food_stall_by_id(menu_item["food_stall_id"])
+    if food_stall["owner_id"] != current_user["id"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to update this menu item"
+        )
+    
+    try:
+        prepared = await s3_service.finalize_direct_upload(
+            key=image_attach.key,
+            folder="menu_items",
+            owner_id=current_user["id"]
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    update = menu_service.update_menu_item(
+        item_id=item_id,
+        image_url=prepared["image_url"],
+        image_variants=prepared["image_variants"]
+    )
+    return await _replace_image(menu_item, prepared, update)
+
+async def _replace_image(menu_item, prepared, update):
+    """Run a menu item update that switches to a prepared image while the image uploads"""
+    # If the upload fails, point the item back at its previous image
+    updated_item = await s3_service.store_image_with(
+        prepared,
+        update,
+        undo=lambda item: menu_service.update_menu_item(
+            item_id=menu_item["id"],
+            image_url=menu_item["image_url"],
+            image_variants=menu_item.get("image_variants")
+        )
     )
     
+    # The previous image is deleted by the sweeper once nothing else uses it
+    await s3_service.release_image(menu_item.get("image_url"))
     return updated_item
 
 @router.delete("/items/{item_id}")
@@ -163,6 +442,7 @@ async def delete_menu_item(
         )
     
     await menu_service.delete_menu_item(item_id)
+    await s3_service.release_image(menu_item.get("image_url"))
     
     return {"message": "Menu item deleted successfully"}
 
@@ -187,6 +467,8 @@ async def delete_menu_category(
         )
     
     # Delete all menu items in the category
-    await menu_service.delete_menu_category(stall_id, category)
+    deleted_items = await menu_service.delete_menu_category(stall_id, category)
+    for item in deleted_items:
+        await s3_service.release_image(item.get("image_url"))
     
     return {"message": f"Category '{category}' deleted successfully"}
\ No newline at end of file
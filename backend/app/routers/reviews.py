@@ -1,34 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from typing import List, Optional
-from pydantic import BaseModel
-from datetime import datetime
+from ..models.review import Review, ReviewCreate, ReviewUpdate
 from ..services.auth_service import get_current_user
 from ..services.review_service import ReviewService
 from ..services.foodstall_service import FoodStallService
+from ..utils.fast_json import model_response, parse_fields
+from ..utils.http_cache import collection_etag, not_modified_response
 
 router = APIRouter()
 review_service = ReviewService()
 foodstall_service = FoodStallService()
 
-class ReviewBase(BaseModel):
-    rating: int  # 1-5
-    comment: str
-
-class ReviewCreate(ReviewBase):
-    pass
-
-class ReviewUpdate(BaseModel):
-    rating: Optional[int] = None
-    comment: Optional[str] = None
-
-class Review(ReviewBase):
-    id: str
-    food_stall_id: str
-    user_id: str
-    user_name: str
-    created_at: str
-    updated_at: str
-
 @router.post("/{stall_id}", response_model=Review)
 async def create_review(
     stall_id: str,
@@ -86,8 +68,19 @@ async def create_review(
 @router.get("/{stall_id}", response_model=List[Review])
 async def get_reviews(
     stall_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,  # comma-separated, e.g. "rating,comment"
     current_user: dict = Depends(get_current_user)
 ):
+    try:
+        field_names = parse_fields(fields, Review)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
     # Verify food stall exists
     food_stall = await foodstall_service.get_food_stall_by_id(stall_id)
     if not food_stall:
@@ -96,10 +89,18 @@ async def get_reviews(
             detail="Food stall not found"
         )
     
-    # Get reviews
+    # Get reviews; they are cached whole, so fields only trims the response
     reviews = await review_service.get_reviews_by_stall(stall_id)
     
-    return reviews
+    not_modified = not_modified_response(
+        request,
+        response,
+        collection_etag(reviews, "reviews", stall_id, field_names)
+    )
+    if not_modified:
+        return not_modified
+    
+    return model_response(Review, reviews, response, field_names)
 
 @router.put("/{review_id}", response_model=Review)
 async def update_review(
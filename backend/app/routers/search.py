@@ -0,0 +1,98 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+import time
+from ..services.auth_service import get_current_user
+from ..services.search_service import SearchService, FOOD_STALL, MENU_ITEM
+from ..services.query_service import QueryService
+from ..models.food_stall import MenuFacets
+
+router = APIRouter()
+search_service = SearchService()
+query_service = QueryService()
+
+class SearchHit(BaseModel):
+    type: str  # "food_stall" or "menu_item"
+    id: str
+    food_stall_id: str
+    name: str
+    score: float
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+    took_ms: float
+
+class StallMatch(BaseModel):
+    id: str
+    name: str
+    description: str
+    location: Dict[str, Any]
+    owner_id: str
+    image_url: str
+    image_variants: Dict[str, str] = {}
+    average_rating: float = 0.0
+    review_count: int = 0
+    menu_facets: Optional[MenuFacets] = None
+    distance: Optional[float] = None  # in kilometers
+    matched_price: Optional[float] = None  # cheapest matching menu item
+
+class QueryPlan(BaseModel):
+    index: str  # "spatial", "category", "price" or "all"
+    estimated: int
+    examined: int
+    matched: int
+
+class StallQueryResponse(BaseModel):
+    results: List[StallMatch]
+    plan: QueryPlan
+
+@router.get("/", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[str] = None,  # "food_stall" or "menu_item"
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    if type and type not in (FOOD_STALL, MENU_ITEM):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Type must be either '{FOOD_STALL}' or '{MENU_ITEM}'"
+        )
+
+    started = time.perf_counter()
+    results = await search_service.search(q, limit=limit, doc_type=type)
+
+    return {
+        "query": q,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+@router.get("/stalls", response_model=StallQueryResponse)
+async def query_food_stalls(
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    radius: Optional[float] = Query(None, gt=0),  # in kilometers
+    category: Optional[str] = None,
+    max_price: Optional[float] = Query(None, gt=0),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(get_current_user)
+):
+    location_params = (latitude, longitude, radius)
+    if any(param is not None for param in location_params) and None in location_params:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Latitude, longitude and radius must be provided together"
+        )
+
+    return await query_service.query_food_stalls(
+        latitude=latitude,
+        longitude=longitude,
+        radius=radius,
+        category=category,
+        max_price=max_price,
+        min_rating=min_rating,
+        limit=limit
+    )
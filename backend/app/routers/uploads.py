@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict
+from pydantic import BaseModel
+from ..services.auth_service import get_current_user
+from ..services.s3_service import S3Service
+
+router = APIRouter()
+s3_service = S3Service()
+
+# Upload targets and the S3 folder their images live in
+UPLOAD_FOLDERS = {
+    "food_stall": "food_stalls",
+    "menu_item": "menu_items",
+}
+
+class PresignRequest(BaseModel):
+    target: str  # "food_stall" or "menu_item"
+    filename: str
+    content_type: str
+
+class PresignedUpload(BaseModel):
+    key: str
+    url: str
+    fields: Dict[str, str]
+    expires_in: int
+
+@router.post("/presign", response_model=PresignedUpload)
+async def presign_upload(
+    presign_request: PresignRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get a presigned POST for uploading an image straight to S3
+
+    POST the file to `url` as multipart form data with `fields`, then pass
+    `key` to the stall or menu item image endpoint (or as `image_key` on
+    create) to attach it.
+    """
+    if current_user["user_type"] != "owner":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only owners can upload images"
+        )
+
+    folder = UPLOAD_FOLDERS.get(presign_request.target)
+    if not folder:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Target must be either 'food_stall' or 'menu_item'"
+        )
+
+    try:
+        return await s3_service.create_presigned_upload(
+            folder=folder,
+            owner_id=current_user["id"],
+            filename=presign_request.filename,
+            content_type=presign_request.content_type
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
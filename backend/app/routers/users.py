@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from typing import Optional
-from ..services.auth_service import get_current_user
+from ..services.auth_service import AuthService, get_current_user
 from ..services.user_service import UserService
 
 router = APIRouter()
 user_service = UserService()
+auth_service = AuthService()
 
 class UserUpdate(BaseModel):
     name: Optional[str] = None
@@ -18,6 +19,11 @@ class UserProfile(BaseModel):
     email: str
     user_type: str
 
+class UpdatedUserProfile(UserProfile):
+    # Set when the update replaced the caller's tokens; the old ones stop working
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+
 @router.get("/me", response_model=UserProfile)
 async def get_user_profile(current_user: dict = Depends(get_current_user)):
     """Get current user's profile"""
@@ -28,15 +34,24 @@ async def get_user_profile(current_user: dict = Depends(get_current_user)):
         "user_type": current_user["user_type"]
     }
 
-@router.put("/me", response_model=UserProfile)
+@router.put("/me", response_model=UpdatedUserProfile)
 async def update_user_profile(
     user_data: UserUpdate,
     current_user: dict = Depends(get_current_user)
 ):
-    """Update current user's profile"""
+    """
+    Update current user's profile
+    
+    Changing the name, email or password replaces the caller's tokens, so
+    a new access and refresh token pair is returned with the profile.
+    """
+    # Only fields that actually change touch the tokens
+    name = user_data.name if user_data.name != current_user["name"] else None
+    email = user_data.email if user_data.email != current_user["email"] else None
+    
     # Check if email is being updated and if it's already taken
-    if user_data.email and user_data.email != current_user["email"]:
-        existing_user = await user_service.get_user_by_email(user_data.email)
+    if email:
+        existing_user = await user_service.get_user_by_email(email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -46,8 +61,8 @@ async def update_user_profile(
     # Update user profile
     updated_user = await user_service.update_user(
         user_id=current_user["id"],
-        name=user_data.name,
-        email=user_data.email,
+        name=name,
+        email=email,
         password=user_data.password
     )
     
@@ -57,9 +72,15 @@ async def update_user_profile(
             detail="Error updating user profile"
         )
     
-    return {
+    profile = {
         "id": updated_user["id"],
         "name": updated_user["name"],
         "email": updated_user["email"],
         "user_type": updated_user["user_type"]
-    }
\ No newline at end of file
+    }
+    if name or email or user_data.password:
+        profile["access_token"] = auth_service.create_access_token(
+            data=auth_service.access_token_claims(updated_user)
+        )
+        profile["refresh_token"] = await auth_service.issue_refresh_token(updated_user)
+    return profile
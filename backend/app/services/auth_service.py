@@ -1,19 +1,36 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from botocore.exceptions import ClientError
 from typing import Optional
+import hashlib
 import jwt
 import os
+import uuid
+from .dynamodb_service import DynamoDBService
 from .user_service import UserService
+from .principal_cache import principal_cache, token_version_cache
+from .password_service import password_hasher
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# "lookup" reads the user from DynamoDB on each request (cached, see
+# principal_cache); "stateless" trusts the profile claims in the access token
+# and only checks its token_version against a small cached version map
+AUTH_MODE = os.getenv("AUTH_MODE", "lookup")
+STATELESS_AUTH = AUTH_MODE == "stateless"
+
+# Stateless access tokens are short-lived and renewed with a refresh token
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv(
+    "ACCESS_TOKEN_EXPIRE_MINUTES",
+    "5" if STATELESS_AUTH else "30"
+))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+
+# Outstanding refresh tokens by id; each one can be exchanged only once
+REFRESH_TOKENS_TABLE = "RefreshTokens"
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -21,18 +38,19 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 class AuthService:
     def __init__(self):
         self.user_service = UserService()
+        self.dynamodb = DynamoDBService()
     
-    def verify_password(self, plain_password, hashed_password):
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password, hashed_password):
+        return await password_hasher.verify(plain_password, hashed_password)
     
-    def get_password_hash(self, password):
-        return pwd_context.hash(password)
+    async def get_password_hash(self, password):
+        return await password_hasher.hash(password)
     
     async def authenticate_user(self, email: str, password: str):
         user = await self.user_service.get_user_by_email(email)
         if not user:
             return False
-        if not self.verify_password(password, user["password"]):
+        if not await self.verify_password(password, user["password"]):
             return False
         return user
     
@@ -45,6 +63,121 @@ class AuthService:
         to_encode.update({"exp": expire})
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
+    
+    def access_token_claims(self, user):
+        """Claims for a user's access token, including the profile for stateless mode"""
+        return {
+            "sub": user["id"],
+            "user_type": user["user_type"],
+            "name": user["name"],
+            "email": user["email"],
+            "ver": int(user.get("token_version", 0))
+        }
+    
+    def create_refresh_token(self, user, token_id, expires_delta: Optional[timedelta] = None):
+        """Create a long-lived token that can only be exchanged for new access tokens"""
+        return self.create_access_token(
+            data={
+                "sub": user["id"],
+                "type": "refresh",
+                "jti": token_id,
+                "ver": int(user.get("token_version", 0))
+            },
+            expires_delta=expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+    
+    async def issue_refresh_token(self, user):
+        """Record a new single-use refresh token for a user and return it"""
+        token_id = str(uuid.uuid4())
+        expires_delta = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        await self.dynamodb.put_item(REFRESH_TOKENS_TABLE, {
+            "id": token_id,
+            "user_id": user["id"],
+            # Read by DynamoDB TTL, which removes tokens nobody redeemed
+            "expires_at": int((datetime.utcnow() + expires_delta).timestamp())
+        })
+        return self.create_refresh_token(user, token_id, expires_delta)
+    
+    async def redeem_refresh_token(self, token_id):
+        """Use up a refresh token; returns False if it was already used or never issued"""
+        try:
+            await self.dynamodb.delete_item(
+                REFRESH_TOKENS_TABLE,
+                {"id": token_id},
+                ConditionExpression="attribute_exists(id)"
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+    
+    async def redeem_unrecorded_refresh_token(self, refresh_token, expires_at):
+        """
+        Use up a refresh token issued before tokens were recorded (it has no id)
+        
+        A used marker keyed by the token's hash is written instead, until
+        the token would have expired anyway; returns False if one exists.
+        """
+        token_id = "used:" + hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+        try:
+            await self.dynamodb.put_item(
+                REFRESH_TOKENS_TABLE,
+                {"id": token_id, "expires_at": int(expires_at or datetime.utcnow().timestamp())},
+                ConditionExpression="attribute_not_exists(id)"
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+    
+    async def refresh_user_tokens(self, refresh_token: str):
+        """
+        Exchange a refresh token for a new access and refresh token pair
+        
+        Refresh tokens are rotated: each one works once and is replaced by
+        the new one. The user is re-read so the new tokens carry the current
+        profile. A refresh token is rejected once tokens were revoked after
+        it was issued. Returns None if the token is invalid.
+        """
+        try:
+            payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.PyJWTError:
+            return None
+        if payload.get("type") != "refresh" or payload.get("sub") is None:
+            return None
+        
+        if payload.get("jti") is not None:
+            redeemed = await self.redeem_refresh_token(payload["jti"])
+        else:
+            redeemed = await self.redeem_unrecorded_refresh_token(refresh_token, payload.get("exp"))
+        if not redeemed:
+            return None
+        
+        user = await self.user_service.get_user_by_id(payload["sub"])
+        if user is None or int(payload.get("ver", 0)) < int(user.get("revoked_version", 0)):
+            return None
+        
+        token_version_cache.set(
+            user["id"],
+            (int(user.get("token_version", 0)), int(user.get("revoked_version", 0)))
+        )
+        return {
+            "access_token": self.create_access_token(data=self.access_token_claims(user)),
+            "refresh_token": await self.issue_refresh_token(user),
+            "user": user
+        }
+
+async def get_token_versions(user_id):
+    """Get a user's (token_version, revoked_version) from the version map, reading them on a miss"""
+    versions = token_version_cache.get(user_id)
+    if versions is None:
+        versions = await UserService().get_token_versions(user_id)
+        if versions is None:
+            return None
+        token_version_cache.set(user_id, versions)
+    return versions
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -59,17 +192,50 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         user_type: str = payload.get("user_type")
         if user_id is None or user_type is None:
             raise credentials_exception
+        if payload.get("type") == "refresh":
+            raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
     
+    # Tokens issued before a revocation (logout everywhere, password change)
+    # are refused in both modes. Tokens without a version claim predate
+    # versioning and count as version 0.
+    versions = await get_token_versions(user_id)
+    if versions is None:
+        raise credentials_exception
+    token_version, revoked_version = versions
+    if int(payload.get("ver", 0)) < revoked_version:
+        raise credentials_exception
+    
+    # Stateless mode: trust the signed profile claims unless the user's token
+    # version moved on (profile change or revocation). Tokens without a
+    # version claim still go through the cached user lookup.
+    if STATELESS_AUTH and payload.get("ver") is not None and payload.get("email") is not None:
+        if token_version != payload["ver"]:
+            raise credentials_exception
+        return {
+            "id": user_id,
+            "email": payload["email"],
+            "name": payload.get("name", ""),
+            "user_type": user_type
+        }
+    
+    # Most requests come from a token we resolved moments ago
+    principal = principal_cache.get(user_id, token)
+    if principal is not None:
+        return dict(principal)
+    
     user_service = UserService()
     user = await user_service.get_user_by_id(user_id)
     if user is None:
         raise credentials_exception
     
-    return {
+    principal = {
         "id": user["id"],
         "email": user["email"],
         "name": user["name"],
         "user_type": user["user_type"]
-    }
\ No newline at end of file
+    }
+    principal_cache.put(user_id, token, principal, expires_at=payload.get("exp"))
+    
+    return dict(principal)
\ No newline at end of file
@@ -1,7 +1,10 @@
 import boto3
 import os
 import uuid
+from collections.abc import Mapping
 from datetime import datetime
+from decimal import Decimal
+from boto3.dynamodb.types import TypeSerializer
 from botocore.exceptions import ClientError
 
 # DynamoDB configuration
@@ -9,19 +12,94 @@ AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY")
 AWS_SECRET_KEY = os.getenv("AWS_SECRET_KEY")
 
+def to_dynamodb(value):
+    """Convert floats (which boto3 rejects) to Decimals, recursing into maps and lists"""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, Mapping):
+        return {k: to_dynamodb(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_dynamodb(v) for v in value]
+    return value
+
+_serializer = TypeSerializer()
+
+def to_dynamodb_value(value):
+    """Convert a Python value to a low-level client attribute value, e.g. {"S": "abc"}"""
+    return _serializer.serialize(to_dynamodb(value))
+
+def _number(text):
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+def from_dynamodb_value(value):
+    """
+    Convert a low-level client attribute value to a plain Python value
+
+    Numbers become ints and floats rather than the resource API's Decimals.
+    """
+    for tag, inner in value.items():
+        if tag == 'S':
+            return inner
+        if tag == 'N':
+            return _number(inner)
+        if tag == 'M':
+            return {k: from_dynamodb_value(v) for k, v in inner.items()}
+        if tag == 'L':
+            return [from_dynamodb_value(v) for v in inner]
+        if tag == 'NULL':
+            return None
+        if tag == 'NS':
+            return {_number(n) for n in inner}
+        if tag in ('SS', 'BS'):
+            return set(inner)
+        # BOOL, and B (already bytes)
+        return inner
+
+def from_dynamodb_item(item, record_type=dict):
+    """Convert a low-level client item into record_type, e.g. a FoodStallRecord"""
+    record = record_type()
+    for name, value in item.items():
+        record[name] = from_dynamodb_value(value)
+    return record
+
+def connection_args():
+    """Get the boto3 client/resource arguments for the configured region and credentials"""
+    if AWS_ACCESS_KEY and AWS_SECRET_KEY:
+        return {
+            'region_name': AWS_REGION,
+            'aws_access_key_id': AWS_ACCESS_KEY,
+            'aws_secret_access_key': AWS_SECRET_KEY
+        }
+    # For local development with DynamoDB local or when using IAM roles
+    return {'region_name': AWS_REGION}
+
+_client = None
+
+def get_client():
+    """Get the low-level DynamoDB client shared by every service, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = boto3.client('dynamodb', **connection_args())
+    return _client
+
+_resource = None
+_tables = {}
+
+def get_resource():
+    """Get the DynamoDB resource shared by every service, creating it on first use"""
+    global _resource
+    if _resource is None:
+        _resource = boto3.resource('dynamodb', **connection_args())
+    return _resource
+
 class DynamoDBService:
-    def __init__(self):
-        # Initialize DynamoDB resource
-        if AWS_ACCESS_KEY and AWS_SECRET_KEY:
-            self.dynamodb = boto3.resource(
-                'dynamodb',
-                region_name=AWS_REGION,
-                aws_access_key_id=AWS_ACCESS_KEY,
-                aws_secret_access_key=AWS_SECRET_KEY
-            )
-        else:
-            # For local development with DynamoDB local or when using IAM roles
-            self.dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+    # Services are created at import time, so this holds no connection of its
+    # own: the resource and its Table objects are shared and built on first use
+    @property
+    def dynamodb(self):
+        return get_resource()
     
     def generate_id(self):
         """Generate a unique ID for a new item"""
@@ -33,33 +111,61 @@ class DynamoDBService:
     
     def get_table(self, table_name):
         """Get DynamoDB table by name"""
-        return self.dynamodb.Table(table_name)
+        table = _tables.get(table_name)
+        if table is None:
+            table = _tables[table_name] = self.dynamodb.Table(table_name)
+        return table
     
-    async def put_item(self, table_name, item):
+    async def put_item(self, table_name, item, **kwargs):
         """Add or update an item in DynamoDB table"""
         table = self.get_table(table_name)
+        put_params = {k: v for k, v in kwargs.items() if v is not None}
         try:
-            response = table.put_item(Item=item)
+            response = table.put_item(Item=to_dynamodb(item), **to_dynamodb(put_params))
             return response
         except ClientError as e:
             print(f"Error putting item to {table_name}: {e}")
             raise
     
-    async def get_item(self, table_name, key):
+    async def batch_write_items(self, table_name, items):
+        """Put many items, 25 per BatchWriteItem call, retrying unprocessed ones"""
+        table = self.get_table(table_name)
+        try:
+            with table.batch_writer() as batch:
+                for item in items:
+                    batch.put_item(Item=to_dynamodb(item))
+        except ClientError as e:
+            print(f"Error batch writing items to {table_name}: {e}")
+            raise
+    
+    async def batch_delete_items(self, table_name, keys):
+        """Delete many items by primary key, 25 per BatchWriteItem call, retrying unprocessed ones"""
+        table = self.get_table(table_name)
+        try:
+            with table.batch_writer() as batch:
+                for key in keys:
+                    batch.delete_item(Key=key)
+        except ClientError as e:
+            print(f"Error batch deleting items from {table_name}: {e}")
+            raise
+    
+    async def get_item(self, table_name, key, **kwargs):
         """Get an item from DynamoDB table by primary key"""
         table = self.get_table(table_name)
+        get_params = {k: v for k, v in kwargs.items() if v is not None}
         try:
-            response = table.get_item(Key=key)
+            response = table.get_item(Key=key, **get_params)
             return response.get('Item')
         except ClientError as e:
             print(f"Error getting item from {table_name}: {e}")
             raise
     
-    async def delete_item(self, table_name, key):
+    async def delete_item(self, table_name, key, **kwargs):
         """Delete an item from DynamoDB table by primary key"""
         table = self.get_table(table_name)
+        delete_params = {k: v for k, v in kwargs.items() if v is not None}
         try:
-            response = table.delete_item(Key=key)
+            response = table.delete_item(Key=key, **delete_params)
             return response
         except ClientError as e:
             print(f"Error deleting item from {table_name}: {e}")
@@ -91,18 +197,103 @@ class DynamoDBService:
         except ClientError as e:
             print(f"Error scanning {table_name}: {e}")
             raise
-    
-    async def update_item(self, table_name, key, update_expression, expression_attribute_values):
+
+    async def scan_all(self, table_name, **kwargs):
+        """Scan every page of a DynamoDB table, following LastEvaluatedKey"""
+        table = self.get_table(table_name)
+        scan_params = {k: v for k, v in kwargs.items() if v is not None}
+        items = []
+
+        try:
+            while True:
+                response = table.scan(**scan_params)
+                items.extend(response.get('Items', []))
+                last_key = response.get('LastEvaluatedKey')
+                if not last_key:
+                    return items
+                scan_params['ExclusiveStartKey'] = last_key
+        except ClientError as e:
+            print(f"Error scanning {table_name}: {e}")
+            raise
+
+    async def update_item(self, table_name, key, update_expression, expression_attribute_values, **kwargs):
         """Update an item in DynamoDB table"""
         table = self.get_table(table_name)
+        update_params = {k: v for k, v in kwargs.items() if v is not None}
         try:
             response = table.update_item(
                 Key=key,
                 UpdateExpression=update_expression,
-                ExpressionAttributeValues=expression_attribute_values,
-                ReturnValues="ALL_NEW"
+                ExpressionAttributeValues=to_dynamodb(expression_attribute_values),
+                ReturnValues="ALL_NEW",
+                **update_params
             )
             return response.get('Attributes')
         except ClientError as e:
             print(f"Error updating item in {table_name}: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def _client_params(self, table_name, params, projection=None):
+        """
+        Build low-level client parameters, serializing keys and expression values
+
+        `projection` lists the only attributes to read; they are passed by
+        placeholder since names such as "name" and "location" are reserved.
+        """
+        client_params = {k: v for k, v in params.items() if v is not None}
+        client_params['TableName'] = table_name
+        for name in ('Key', 'ExclusiveStartKey', 'ExpressionAttributeValues'):
+            if name in client_params:
+                client_params[name] = {k: to_dynamodb_value(v) for k, v in client_params[name].items()}
+        if projection:
+            names = dict(client_params.get('ExpressionAttributeNames') or {})
+            placeholders = []
+            for index, attribute in enumerate(projection):
+                placeholder = f"#projected{index}"
+                names[placeholder] = attribute
+                placeholders.append(placeholder)
+            client_params['ProjectionExpression'] = ", ".join(placeholders)
+            client_params['ExpressionAttributeNames'] = names
+        return client_params
+
+    async def get_record(self, table_name, key, record_type=dict, projection=None, **kwargs):
+        """Get an item by primary key as a record_type, with plain numbers"""
+        params = self._client_params(table_name, dict(kwargs, Key=key), projection)
+        try:
+            response = get_client().get_item(**params)
+        except ClientError as e:
+            print(f"Error getting item from {table_name}: {e}")
+            raise
+        item = response.get('Item')
+        return from_dynamodb_item(item, record_type) if item is not None else None
+
+    async def query_records(self, table_name, record_type=dict, index_name=None, projection=None, **kwargs):
+        """Query every page of matching items as record_types, with plain numbers"""
+        params = self._client_params(table_name, kwargs, projection)
+        if index_name:
+            params['IndexName'] = index_name
+        try:
+            return self._read_pages(get_client().query, params, record_type)
+        except ClientError as e:
+            print(f"Error querying {table_name}: {e}")
+            raise
+
+    async def scan_records(self, table_name, record_type=dict, projection=None, **kwargs):
+        """Scan every page of a table as record_types, with plain numbers"""
+        params = self._client_params(table_name, kwargs, projection)
+        try:
+            return self._read_pages(get_client().scan, params, record_type)
+        except ClientError as e:
+            print(f"Error scanning {table_name}: {e}")
+            raise
+
+    def _read_pages(self, operation, params, record_type):
+        records = []
+        while True:
+            response = operation(**params)
+            records.extend(from_dynamodb_item(item, record_type) for item in response.get('Items', []))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return records
+            # Already in the client's format
+            params['ExclusiveStartKey'] = last_key
@@ -1,4 +1,11 @@
 from .dynamodb_service import DynamoDBService
+from .search_service import SearchService
+from .query_service import QueryService, NEARBY_COORD_PRECISION
+from .read_cache import food_stall_cache, food_stall_scans, nearby_cache
+from .live_updates import live_updates, stall_position, CREATED, DELETED, MOVED, RATED, UPDATED
+from ..models.records import FoodStallRecord
+from ..utils.geo_index import quantize_point
+from botocore.exceptions import ClientError
 from datetime import datetime
 import math
 import uuid
@@ -7,8 +14,14 @@ class FoodStallService:
     def __init__(self):
         self.dynamodb = DynamoDBService()
         self.table_name = "FoodStalls"
+        self.search_service = SearchService()
+        self.query_service = QueryService()
+        self.cache = food_stall_cache
+        self.scans = food_stall_scans
+        self.nearby_cache = nearby_cache
+        self.live = live_updates
     
-    async def create_food_stall(self, name, description, location, image_url, owner_id):
+    async def create_food_stall(self, name, description, location, image_url, owner_id, image_variants=None):
         """Create a new food stall"""
         stall_id = self.dynamodb.generate_id()
         
@@ -18,6 +31,7 @@ class FoodStallService:
             "description": description,
             "location": location,
             "image_url": image_url,
+            "image_variants": image_variants or {},
             "owner_id": owner_id,
             "average_rating": 0.0,
             "review_count": 0,
@@ -26,33 +40,63 @@ class FoodStallService:
         }
         
         await self.dynamodb.put_item(self.table_name, food_stall)
+        self.search_service.index_food_stall(food_stall)
+        self.query_service.index_food_stall(food_stall)
+        self.scans.forget_all()
+        await self.live.publish(CREATED, food_stall)
         return food_stall
     
     async def get_food_stall_by_id(self, stall_id):
-        """Get food stall by ID"""
-        return await self.dynamodb.get_item(self.table_name, {"id": stall_id})
+        """Get food stall by ID (cached; treat the result as read-only)"""
+        return await self.cache.get(
+            stall_id,
+            lambda: self.dynamodb.get_record(self.table_name, {"id": stall_id}, FoodStallRecord)
+        )
     
     async def get_food_stalls_by_owner(self, owner_id):
         """Get all food stalls owned by a specific user"""
-        return await self.dynamodb.query(
+        return await self.dynamodb.query_records(
             table_name=self.table_name,
+            record_type=FoodStallRecord,
             index_name="OwnerIndex",
             KeyConditionExpression="owner_id = :owner_id",
             ExpressionAttributeValues={":owner_id": owner_id}
         )
     
-    async def get_all_food_stalls(self):
-        """Get all food stalls"""
-        return await self.dynamodb.scan(self.table_name)
+    async def get_all_food_stalls(self, fields=None):
+        """
+        Get all food stalls, reading only `fields` of each if given
+        
+        Concurrent calls share one scan; treat the result as read-only.
+        """
+        projection = tuple(sorted(fields)) if fields else None
+        return await self.scans.do(
+            projection,
+            lambda: self.dynamodb.scan_records(self.table_name, FoodStallRecord, projection=projection)
+        )
     
-    async def get_food_stalls_by_location(self, latitude, longitude, radius):
+    async def get_food_stalls_by_location(self, latitude, longitude, radius, fields=None):
         """
         Get food stalls near a specific location
         
         This is a simplified approach that gets all stalls and filters them by distance.
         For a production app, consider using a geospatial database or service.
+        
+        The location is rounded to NEARBY_COORD_PRECISION so searches from
+        almost the same spot share one result, which is cached briefly;
+        treat it as read-only.
         """
-        all_stalls = await self.get_all_food_stalls()
+        latitude, longitude = quantize_point(latitude, longitude, NEARBY_COORD_PRECISION)
+        # Distances need the location, whatever else was asked for
+        fields = tuple(sorted(set(fields) | {"location"})) if fields else None
+        key = ("stalls", self.query_service.catalog.version, latitude, longitude, radius, fields)
+        return await self.nearby_cache.get(
+            key,
+            lambda: self._find_food_stalls_near(latitude, longitude, radius, fields)
+        )
+    
+    async def _find_food_stalls_near(self, latitude, longitude, radius, fields):
+        all_stalls = await self.get_all_food_stalls(fields)
         nearby_stalls = []
         
         for stall in all_stalls:
@@ -66,15 +110,15 @@ class FoodStallService:
                 )
                 
                 if distance <= radius:
-                    # Add distance to stall for sorting
-                    stall["distance"] = distance
-                    nearby_stalls.append(stall)
+                    # Add distance to a copy for sorting; the scanned stalls are shared
+                    nearby_stalls.append(dict(stall, distance=distance))
         
         # Sort by distance
         nearby_stalls.sort(key=lambda x: x.get("distance", float('inf')))
         return nearby_stalls
     
-    async def update_food_stall(self, stall_id, name=None, description=None, location=None, image_url=None):
+    async def update_food_stall(self, stall_id, name=None, description=None, location=None, image_url=None,
+                                image_variants=None):
         """Update food stall information"""
         update_expression_parts = []
         expression_attribute_values = {":updated_at": self.dynamodb.get_timestamp()}
@@ -94,22 +138,43 @@ class FoodStallService:
         if image_url:
             update_expression_parts.append("image_url = :image_url")
             expression_attribute_values[":image_url"] = image_url
+            # Variants of the previous image no longer apply
+            update_expression_parts.append("image_variants = :image_variants")
+            expression_attribute_values[":image_variants"] = image_variants or {}
         
         # Add the updated_at timestamp
         update_expression_parts.append("updated_at = :updated_at")
         
         update_expression = "SET " + ", ".join(update_expression_parts)
         
-        return await self.dynamodb.update_item(
+        # Live subscribers around the old location must hear about a move
+        previous = await self.get_food_stall_by_id(stall_id) if location else None
+        
+        updated_stall = await self.dynamodb.update_item(
             table_name=self.table_name,
             key={"id": stall_id},
             update_expression=update_expression,
             expression_attribute_values=expression_attribute_values
         )
+        self.search_service.index_food_stall(updated_stall)
+        self.query_service.index_food_stall(updated_stall)
+        await self.cache.invalidate(stall_id)
+        self.scans.forget_all()
+        moved = previous is not None and stall_position(previous) != stall_position(updated_stall)
+        await self.live.publish(MOVED if moved else UPDATED, updated_stall, previous)
+        return updated_stall
     
     async def delete_food_stall(self, stall_id):
         """Delete a food stall"""
-        return await self.dynamodb.delete_item(self.table_name, {"id": stall_id})
+        # The old item tells live subscribers where the stall was
+        response = await self.dynamodb.delete_item(self.table_name, {"id": stall_id}, ReturnValues="ALL_OLD")
+        self.search_service.remove_food_stall(stall_id)
+        self.query_service.remove_food_stall(stall_id)
+        await self.cache.invalidate(stall_id)
+        self.scans.forget_all()
+        if response.get("Attributes"):
+            await self.live.publish(DELETED, None, response["Attributes"])
+        return response
     
     async def update_food_stall_rating(self, stall_id):
         """Update the average rating of a food stall based on its reviews"""
@@ -120,7 +185,7 @@ class FoodStallService:
         
         if not reviews:
             # No reviews, set rating to 0
-            await self.dynamodb.update_item(
+            updated_stall = await self.dynamodb.update_item(
                 table_name=self.table_name,
                 key={"id": stall_id},
                 update_expression="SET average_rating = :rating, review_count = :count, updated_at = :updated_at",
@@ -130,6 +195,10 @@ class FoodStallService:
                     ":updated_at": self.dynamodb.get_timestamp()
                 }
             )
+            self.query_service.index_food_stall(updated_stall)
+            await self.cache.invalidate(stall_id)
+            self.scans.forget_all()
+            await self.live.publish(RATED, updated_stall)
             return
         
         # Calculate average rating
@@ -137,7 +206,7 @@ class FoodStallService:
         average_rating = total_rating / len(reviews)
         
         # Update food stall with new rating
-        await self.dynamodb.update_item(
+        updated_stall = await self.dynamodb.update_item(
             table_name=self.table_name,
             key={"id": stall_id},
             update_expression="SET average_rating = :rating, review_count = :count, updated_at = :updated_at",
@@ -147,6 +216,34 @@ class FoodStallService:
                 ":updated_at": self.dynamodb.get_timestamp()
             }
         )
+        self.query_service.index_food_stall(updated_stall)
+        await self.cache.invalidate(stall_id)
+        self.scans.forget_all()
+        await self.live.publish(RATED, updated_stall)
+    
+    async def update_menu_facets(self, stall_id, menu_facets):
+        """Store the menu summary (categories, price range, item count) on a food stall"""
+        try:
+            updated_stall = await self.dynamodb.update_item(
+                table_name=self.table_name,
+                key={"id": stall_id},
+                update_expression="SET menu_facets = :menu_facets, updated_at = :updated_at",
+                expression_attribute_values={
+                    ":menu_facets": menu_facets,
+                    ":updated_at": self.dynamodb.get_timestamp()
+                },
+                ConditionExpression="attribute_exists(id)"
+            )
+        except ClientError as e:
+            # The stall was deleted; don't recreate it as a facets-only item
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return None
+            raise
+        
+        self.query_service.index_food_stall(updated_stall)
+        await self.cache.invalidate(stall_id)
+        self.scans.forget_all()
+        return updated_stall
     
     def _calculate_distance(self, lat1, lon1, lat2, lon2):
         """
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import time
+
+# Image sweeper configuration
+# Sweep in the background of the API process. Off on Lambda, which freezes background
+# tasks between invocations; run app.cli.sweep_images on a schedule there instead.
+IMAGE_SWEEPER_ENABLED = os.getenv(
+    "IMAGE_SWEEPER_ENABLED", "false" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "true"
+).lower() in ("1", "true", "yes")
+# How long an image must stay unreferenced before it is deleted
+IMAGE_SWEEP_GRACE_SECONDS = int(os.getenv("IMAGE_SWEEP_GRACE_SECONDS", "300"))
+IMAGE_SWEEP_INTERVAL_SECONDS = float(os.getenv("IMAGE_SWEEP_INTERVAL_SECONDS", "60"))
+# Images per batch; each image is deleted together with its variants
+IMAGE_SWEEP_BATCH_SIZE = int(os.getenv("IMAGE_SWEEP_BATCH_SIZE", "200"))
+# How often to look for unreferenced images released by other (or dead) processes; 0 disables
+IMAGE_SWEEP_SCAN_SECONDS = float(os.getenv("IMAGE_SWEEP_SCAN_SECONDS", "3600"))
+# A claim on an image older than this is taken to belong to a sweeper that died
+IMAGE_SWEEP_CLAIM_SECONDS = int(os.getenv("IMAGE_SWEEP_CLAIM_SECONDS", "60"))
+
+
+class ImageSweeper:
+    """
+    Deletes images nothing references any more, in batches, in the background
+
+    Releasing the last reference to an image only schedules it here. It is
+    deleted once its reference count has stayed at zero for the grace
+    period, so an image that is reused right after being replaced survives.
+    """
+
+    def __init__(self, grace_seconds=IMAGE_SWEEP_GRACE_SECONDS, interval=IMAGE_SWEEP_INTERVAL_SECONDS,
+                 batch_size=IMAGE_SWEEP_BATCH_SIZE, scan_interval=IMAGE_SWEEP_SCAN_SECONDS, clock=time.time):
+        self.grace_seconds = grace_seconds
+        self.interval = interval
+        self.batch_size = batch_size
+        self.scan_interval = scan_interval
+        self.clock = clock
+        self.pending = {}  # key -> earliest time it may be deleted
+        self.task = None
+        self.last_scan = None
+        self.deleted = 0
+        self.kept = 0
+        self.batches = 0
+        self.errors = 0
+
+    def schedule(self, key, released_at=None):
+        """Queue an image for deletion once the grace period after its release is over"""
+        due = (released_at if released_at is not None else self.clock()) + self.grace_seconds
+        self.pending[key] = max(self.pending.get(key, 0), due)
+
+    async def sweep(self, s3_service):
+        """Delete every due image that is still unreferenced; returns how many were deleted"""
+        now = self.clock()
+        due = [key for key, due_at in self.pending.items() if due_at <= now]
+        for key in due:
+            del self.pending[key]
+
+        deleted = 0
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start:start + self.batch_size]
+            # Claiming marks the reference row, so a key is only deleted by one
+            # process and uploads of the same image wait until it is gone
+            claims = {}
+            for key in batch:
+                claimed_at = await s3_service.claim_unreferenced_image(key, now - self.grace_seconds)
+                if claimed_at is not None:
+                    claims[key] = claimed_at
+            self.kept += len(batch) - len(claims)
+            if not claims:
+                continue
+
+            try:
+                failed = set(await s3_service.delete_images(list(claims)))
+            except Exception as e:
+                print(f"Error deleting unreferenced images: {e}")
+                self.errors += 1
+                failed = set(claims)
+            else:
+                self.batches += 1
+
+            for key, claimed_at in claims.items():
+                try:
+                    if key in failed:
+                        # Keep the row so the image is tried again
+                        await s3_service.abandon_sweep(key, claimed_at)
+                        self.schedule(key, now - self.grace_seconds)
+                    else:
+                        await s3_service.finish_sweep(key, claimed_at)
+                        deleted += 1
+                except Exception as e:
+                    print(f"Error finishing sweep of {key}: {e}")
+                    self.errors += 1
+
+        self.deleted += deleted
+        return deleted
+
+    async def scan(self, s3_service):
+        """Schedule unreferenced images this process doesn't know about"""
+        for key, released_at in await s3_service.get_unreferenced_images():
+            self.schedule(key, released_at)
+        self.last_scan = self.clock()
+
+    async def run(self, s3_service):
+        """Sweep every interval until cancelled"""
+        while True:
+            try:
+                if self.scan_interval and (self.last_scan is None or self.clock() - self.last_scan >= self.scan_interval):
+                    await self.scan(s3_service)
+                await self.sweep(s3_service)
+            except Exception as e:
+                print(f"Error sweeping images: {e}")
+                self.errors += 1
+            await asyncio.sleep(self.interval)
+
+    def start(self, s3_service):
+        """
+        Start sweeping in the background on the running event loop
+
+        The first full scan waits for scan_interval rather than slowing
+        down the first requests of a new process.
+        """
+        if self.last_scan is None:
+            self.last_scan = self.clock()
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run(s3_service))
+
+    async def stop(self):
+        """Stop the background sweep"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def stats(self):
+        """Get sweeper counters"""
+        return {
+            "running": self.task is not None and not self.task.done(),
+            "pending": len(self.pending),
+            "deleted": self.deleted,
+            "kept": self.kept,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+
+# Shared by every request in the process
+image_sweeper = ImageSweeper()
@@ -0,0 +1,215 @@
+from ..models.food_stall import FoodStall
+from ..utils.distance import calculate_distance
+from ..utils.fast_json import shape_like
+from ..utils.geo_index import cell_for, cells_covering, cells_in_bounds
+import asyncio
+import itertools
+import os
+
+# Live update configuration
+# Subscriptions are indexed by cells of this size in degrees (0.05 is about 5.5 km)
+LIVE_CELL_SIZE_DEG = float(os.getenv("LIVE_CELL_SIZE_DEG", "0.05"))
+# Areas covering more cells than this are refused; the client should zoom in
+LIVE_MAX_CELLS = int(os.getenv("LIVE_MAX_CELLS", "400"))
+# Largest radius a client may watch, in kilometers
+LIVE_MAX_RADIUS_KM = float(os.getenv("LIVE_MAX_RADIUS_KM", "50"))
+# Events waiting to be sent to one client before it is told to resync
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "100"))
+
+CREATED = "created"
+UPDATED = "updated"
+MOVED = "moved"
+RATED = "rated"
+DELETED = "deleted"
+# Sent instead of the events a slow client missed; it should refetch the area
+RESYNC = {"type": "resync"}
+
+
+def stall_position(stall):
+    """Get a stall's (latitude, longitude), or None if it has no location"""
+    location = (stall or {}).get("location") or {}
+    if location.get("latitude") is None or location.get("longitude") is None:
+        return None
+    return float(location["latitude"]), float(location["longitude"])
+
+
+class InMemoryBroker:
+    """
+    Local stand-in for a pub/sub broker
+
+    Hands every published event to the handlers in this process. With
+    several processes, a broker that fans out between them (e.g. Redis
+    pub/sub) goes behind the same publish/subscribe methods; events are
+    plain JSON for that reason.
+    """
+
+    def __init__(self):
+        self.handlers = []
+        self.published = 0
+
+    def subscribe(self, handler):
+        self.handlers.append(handler)
+
+    async def publish(self, event):
+        self.published += 1
+        for handler in self.handlers:
+            handler(event)
+
+    def stats(self):
+        return {"broker": type(self).__name__, "published": self.published}
+
+
+class Subscription:
+    """One client's area of interest and the events waiting to be sent to it"""
+
+    def __init__(self, subscription_id, queue_size=LIVE_QUEUE_SIZE):
+        self.id = subscription_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.center = None  # (latitude, longitude, radius in km)
+        self.bounds = None  # (south, west, north, east)
+        self.cells = ()
+        self.overflows = 0
+
+    def contains(self, position):
+        """Check whether a (latitude, longitude) is inside the area"""
+        if self.center is not None:
+            latitude, longitude, radius = self.center
+            return calculate_distance(latitude, longitude, position[0], position[1]) <= radius
+        if self.bounds is not None:
+            south, west, north, east = self.bounds
+            return south <= position[0] <= north and west <= position[1] <= east
+        return False
+
+
+class LiveUpdates:
+    """
+    Pushes stall changes to the clients watching the area they happen in
+
+    Subscriptions are indexed by the grid cells their area covers, so an
+    event only reaches the subscribers of the cells its old and new
+    positions fall in. Each client has a bounded queue; one that falls
+    behind loses its backlog and gets a single RESYNC event instead of
+    holding events (and memory) for everyone else.
+    """
+
+    def __init__(self, broker, cell_size=LIVE_CELL_SIZE_DEG, max_cells=LIVE_MAX_CELLS,
+                 queue_size=LIVE_QUEUE_SIZE):
+        self.broker = broker
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.queue_size = queue_size
+        self.cells = {}  # (row, col) -> set of subscriptions
+        self.subscriptions = {}  # id -> subscription
+        self.ids = itertools.count(1)
+        self.delivered = 0
+        self.overflows = 0
+        self.errors = 0
+        broker.subscribe(self.dispatch)
+
+    def subscribe(self):
+        """Register a client; it receives nothing until it watches an area"""
+        subscription = Subscription(next(self.ids), self.queue_size)
+        self.subscriptions[subscription.id] = subscription
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Forget a client that went away"""
+        self._index(subscription, ())
+        self.subscriptions.pop(subscription.id, None)
+
+    def watch_radius(self, subscription, latitude, longitude, radius):
+        """Watch the stalls within radius km of a point, replacing any earlier area"""
+        if radius <= 0:
+            raise ValueError("Radius must be positive")
+        self._index(subscription, self._cells(cells_covering, latitude, longitude, radius))
+        subscription.center = (float(latitude), float(longitude), float(radius))
+        subscription.bounds = None
+
+    def watch_bounds(self, subscription, south, west, north, east):
+        """Watch the stalls inside a map viewport, replacing any earlier area"""
+        if south > north or west > east:
+            raise ValueError("Bounds must be south <= north and west <= east")
+        self._index(subscription, self._cells(cells_in_bounds, south, west, north, east))
+        subscription.bounds = (float(south), float(west), float(north), float(east))
+        subscription.center = None
+
+    def _cells(self, list_cells, *area):
+        # The cell count is checked before any are listed: a whole-world area is millions of cells
+        try:
+            return list_cells(*area, self.cell_size, max_cells=self.max_cells)
+        except ValueError:
+            raise ValueError("Area is too large; zoom in to watch it")
+
+    def _index(self, subscription, cells):
+        for cell in subscription.cells:
+            members = self.cells.get(cell)
+            if members is not None:
+                members.discard(subscription)
+                if not members:
+                    del self.cells[cell]
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(subscription)
+        subscription.cells = tuple(cells)
+
+    async def publish(self, event_type, stall, previous=None):
+        """
+        Announce a change to a stall
+
+        `previous` is the stall before the change, so a stall that moved or
+        was deleted also reaches the clients watching where it was.
+        Failures are logged, never raised: the write already happened.
+        """
+        positions = [position for position in (stall_position(stall), stall_position(previous)) if position]
+        if not positions:
+            return
+        if event_type == DELETED:
+            payload = {"id": (stall or previous)["id"]}
+        else:
+            payload = shape_like(FoodStall, stall)
+        try:
+            await self.broker.publish({"type": event_type, "stall": payload, "positions": positions})
+        except Exception as e:
+            print(f"Error publishing a {event_type} stall event: {e}")
+            self.errors += 1
+
+    def dispatch(self, event):
+        """Queue a published event for every subscriber whose area it touches"""
+        positions = [tuple(position) for position in event["positions"]]
+        candidates = set()
+        for position in positions:
+            candidates.update(self.cells.get(cell_for(position[0], position[1], self.cell_size), ()))
+        if not candidates:
+            return
+
+        message = {"type": event["type"], "stall": event["stall"]}
+        for subscription in candidates:
+            if any(subscription.contains(position) for position in positions):
+                self.send(subscription, message)
+
+    def send(self, subscription, message):
+        """Queue a message for one client, replacing its backlog with RESYNC if it is full"""
+        try:
+            subscription.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait(RESYNC)
+            subscription.overflows += 1
+            self.overflows += 1
+            return
+        self.delivered += 1
+
+    def stats(self):
+        """Get subscriber and delivery counters, plus the broker's own"""
+        return {
+            "subscribers": len(self.subscriptions),
+            "watched_cells": len(self.cells),
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "errors": self.errors,
+            **self.broker.stats(),
+        }
+
+
+# Shared by every request in the process
+live_updates = LiveUpdates(InMemoryBroker())
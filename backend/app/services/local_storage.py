@@ -0,0 +1,169 @@
+from botocore.exceptions import ClientError
+import base64
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# Local storage configuration
+LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", "media")
+MEDIA_BASE_URL = os.getenv("MEDIA_BASE_URL", "http://localhost:8000/media").rstrip("/")
+# Signs presigned POST policies; defaults to the JWT secret so every worker agrees
+LOCAL_STORAGE_SECRET = os.getenv("LOCAL_STORAGE_SECRET", os.getenv("SECRET_KEY", "supersecretkey"))
+
+# Sidecar directory holding content type, cache control and user metadata
+METADATA_DIR = ".meta"
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def _not_found(operation, key):
+    return ClientError({"Error": {"Code": "404", "Message": f"Not Found: {key}"}}, operation)
+
+
+class LocalObjectStore:
+    """
+    Stores objects on local disk behind the parts of the boto3 S3 client API
+    that S3Service uses, so development and benchmarks need no S3 credentials
+
+    Objects are written to a temporary file and renamed into place, so a
+    reader never sees a partial object. The bucket argument is ignored.
+    """
+
+    def __init__(self, root=LOCAL_STORAGE_ROOT, base_url=MEDIA_BASE_URL, secret=LOCAL_STORAGE_SECRET):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url
+        self.secret = secret.encode("utf-8")
+        os.makedirs(os.path.join(self.root, METADATA_DIR), exist_ok=True)
+
+    def path_for(self, key):
+        """Get the file path of an object key, rejecting keys that escape the root"""
+        parts = key.split("/") if key else []
+        if not parts or parts[0] == METADATA_DIR or any(part in ("", ".", "..") for part in parts):
+            raise ValueError(f"Invalid object key: {key!r}")
+        return os.path.join(self.root, *parts)
+
+    def _metadata_path(self, key):
+        self.path_for(key)
+        return os.path.join(self.root, METADATA_DIR, *key.split("/")) + ".json"
+
+    def _write_atomic(self, path, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                write(tmp)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _write_object(self, key, write, extra_args):
+        metadata = {
+            "ContentType": extra_args.get("ContentType") or "binary/octet-stream",
+            "CacheControl": extra_args.get("CacheControl"),
+            "Metadata": extra_args.get("Metadata") or {},
+        }
+        # Metadata first: an object's data is only visible once it is complete
+        self._write_atomic(self._metadata_path(key), lambda f: f.write(json.dumps(metadata).encode("utf-8")))
+        self._write_atomic(self.path_for(key), write)
+
+    def read_metadata(self, key):
+        """Get an object's stored metadata, or None if the object does not exist"""
+        path = self.path_for(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(self._metadata_path(key), "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return {"ContentType": "binary/octet-stream", "CacheControl": None, "Metadata": {}}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        self._write_object(key, lambda f: shutil.copyfileobj(fileobj, f, COPY_CHUNK_BYTES), ExtraArgs or {})
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._write_object(Key, lambda f: f.write(Body), kwargs)
+        return {}
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective="COPY", **kwargs):
+        source_key = CopySource["Key"]
+        source_metadata = self.read_metadata(source_key)
+        if source_metadata is None:
+            raise _not_found("CopyObject", source_key)
+        extra_args = kwargs if MetadataDirective == "REPLACE" else source_metadata
+
+        def write(f):
+            with open(self.path_for(source_key), "rb") as source:
+                shutil.copyfileobj(source, f, COPY_CHUNK_BYTES)
+        self._write_object(Key, write, extra_args)
+        return {}
+
+    def head_object(self, Bucket, Key, ChecksumMode=None):
+        metadata = self.read_metadata(Key)
+        if metadata is None:
+            raise _not_found("HeadObject", Key)
+        head = dict(metadata)
+        head["ContentLength"] = os.path.getsize(self.path_for(Key))
+        return head
+
+    def download_fileobj(self, bucket, key, fileobj, Config=None):
+        try:
+            with open(self.path_for(key), "rb") as source:
+                shutil.copyfileobj(source, fileobj, COPY_CHUNK_BYTES)
+        except FileNotFoundError:
+            raise _not_found("GetObject", key)
+
+    def delete_object(self, Bucket, Key):
+        for path in (self.path_for(Key), self._metadata_path(Key)):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        return {}
+
+    def delete_objects(self, Bucket, Delete):
+        errors = []
+        for obj in Delete["Objects"]:
+            try:
+                self.delete_object(Bucket, obj["Key"])
+            except (OSError, ValueError) as e:
+                errors.append({"Key": obj["Key"], "Message": str(e)})
+        return {"Errors": errors}
+
+    def generate_presigned_post(self, bucket, key, Fields=None, Conditions=None, ExpiresIn=3600):
+        """Sign an upload policy for POST /media, mirroring S3's presigned POST"""
+        max_bytes = None
+        for condition in Conditions or []:
+            if isinstance(condition, list) and condition[0] == "content-length-range":
+                max_bytes = condition[2]
+
+        policy = base64.urlsafe_b64encode(json.dumps({
+            "key": key,
+            "content_type": (Fields or {}).get("Content-Type"),
+            "max_bytes": max_bytes,
+            "expires_at": int(time.time() + ExpiresIn),
+        }).encode("utf-8")).decode("ascii")
+
+        fields = dict(Fields or {})
+        fields.update({"key": key, "policy": policy, "signature": self._sign(policy)})
+        return {"url": self.base_url, "fields": fields}
+
+    def verify_presigned_post(self, policy, signature):
+        """Get the upload policy of a presigned POST; raises ValueError if it is forged or expired"""
+        if not hmac.compare_digest(self._sign(policy), signature or ""):
+            raise ValueError("Invalid upload signature")
+        conditions = json.loads(base64.urlsafe_b64decode(policy.encode("ascii")))
+        if conditions["expires_at"] < time.time():
+            raise ValueError("Upload policy has expired")
+        return conditions
+
+    def _sign(self, policy):
+        return hmac.new(self.secret, policy.encode("ascii"), hashlib.sha256).hexdigest()
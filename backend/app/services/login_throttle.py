@@ -0,0 +1,231 @@
+from .dynamodb_service import DynamoDBService
+from ..utils.ttl_cache import TTLCache
+from botocore.exceptions import ClientError
+import os
+import time
+
+# Login throttling configuration
+LOGIN_WINDOW_SECONDS = int(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_MAX_ATTEMPTS_PER_EMAIL = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_EMAIL", "5"))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "20"))
+LOGIN_LOCKOUT_BASE_SECONDS = int(os.getenv("LOGIN_LOCKOUT_BASE_SECONDS", "30"))
+LOGIN_LOCKOUT_MAX_SECONDS = int(os.getenv("LOGIN_LOCKOUT_MAX_SECONDS", "3600"))
+LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "memory")  # "memory" or "dynamodb"
+LOGIN_THROTTLE_MAX_KEYS = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "100000"))
+
+
+def _new_state():
+    return {"failures": [], "lockouts": 0, "locked_until": 0.0}
+
+
+class InMemoryAttemptStore:
+    """Per-process attempt counters; bounded, and forgotten after their TTL"""
+
+    def __init__(self, max_keys=LOGIN_THROTTLE_MAX_KEYS):
+        # The TTL passed to each write always applies; the cache-wide one is just a cap
+        self.cache = TTLCache(max_size=max_keys, ttl=float("inf"))
+
+    async def get(self, key):
+        return self.cache.get(key)
+
+    async def append_failure(self, key, now, ttl):
+        """Add a failure time to a key; returns its state including it"""
+        state = self.cache.get(key) or _new_state()
+        state = dict(state, failures=state["failures"] + [now])
+        self.cache.set(key, state, ttl=ttl)
+        return state
+
+    async def replace_failures(self, key, seen, state, ttl):
+        """Replace a key's state unless failures were added since it had `seen` of them"""
+        current = self.cache.get(key)
+        if current is None or len(current["failures"]) != seen:
+            return False
+        self.cache.set(key, dict(state), ttl=ttl)
+        return True
+
+    async def delete(self, key):
+        self.cache.delete(key)
+
+
+class DynamoDBAttemptStore:
+    """
+    Attempt counters shared by every process, in the LoginAttempts table
+
+    Failures are appended with a single update, so concurrent failed logins
+    on different workers can't overwrite each other. Lockouts and pruning
+    are conditioned on the number of failures they were computed from.
+    """
+
+    def __init__(self):
+        self.dynamodb = DynamoDBService()
+        self.table_name = "LoginAttempts"
+
+    def _state(self, item):
+        return {
+            "failures": [float(ts) for ts in item.get("failures", [])],
+            "lockouts": int(item.get("lockouts", 0)),
+            "locked_until": float(item.get("locked_until", 0)),
+        }
+
+    async def get(self, key):
+        item = await self.dynamodb.get_item(self.table_name, {"key": key})
+        # DynamoDB's TTL deletion is lazy, so expired items may still be read
+        if item is None or float(item.get("expires_at", 0)) <= time.time():
+            return None
+        return self._state(item)
+
+    async def append_failure(self, key, now, ttl):
+        """Add a failure time to a key atomically; returns its state including it"""
+        values = {":failure": [now], ":expires_at": int(now + ttl) + 1, ":now": int(now)}
+        for _ in range(3):
+            try:
+                item = await self.dynamodb.update_item(
+                    table_name=self.table_name,
+                    key={"key": key},
+                    update_expression=(
+                        "SET failures = list_append(if_not_exists(failures, :empty), :failure), "
+                        "expires_at = :expires_at"
+                    ),
+                    expression_attribute_values=dict(values, **{":empty": []}),
+                    ConditionExpression="attribute_not_exists(expires_at) OR expires_at > :now"
+                )
+                return self._state(item)
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+            
+            # Expired but not removed by TTL yet: start the key over, unless someone just did
+            try:
+                item = await self.dynamodb.update_item(
+                    table_name=self.table_name,
+                    key={"key": key},
+                    update_expression=(
+                        "SET failures = :failure, lockouts = :zero, locked_until = :zero, "
+                        "expires_at = :expires_at"
+                    ),
+                    expression_attribute_values=dict(values, **{":zero": 0}),
+                    ConditionExpression="expires_at <= :now"
+                )
+                return self._state(item)
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+        raise RuntimeError(f"Could not record a login failure for {key}")
+
+    async def replace_failures(self, key, seen, state, ttl):
+        """Replace a key's state unless failures were added since it had `seen` of them"""
+        try:
+            await self.dynamodb.update_item(
+                table_name=self.table_name,
+                key={"key": key},
+                update_expression=(
+                    "SET failures = :failures, lockouts = :lockouts, locked_until = :locked_until, "
+                    "expires_at = :expires_at"
+                ),
+                expression_attribute_values={
+                    ":failures": state["failures"],
+                    ":lockouts": state["lockouts"],
+                    ":locked_until": state["locked_until"],
+                    ":expires_at": int(time.time() + ttl) + 1,
+                    ":seen": seen
+                },
+                ConditionExpression="size(failures) = :seen"
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            return False
+        return True
+
+    async def delete(self, key):
+        await self.dynamodb.delete_item(self.table_name, {"key": key})
+
+
+class LoginThrottle:
+    """
+    Sliding-window login attempt limits per email and per client IP
+
+    Once a key sees too many failures within the window it is locked out;
+    each further lockout doubles in length up to LOGIN_LOCKOUT_MAX_SECONDS.
+    Checks run before any user lookup or bcrypt work.
+    """
+
+    def __init__(self, store=None, clock=time.time):
+        self.store = store or (
+            DynamoDBAttemptStore() if LOGIN_THROTTLE_BACKEND == "dynamodb" else InMemoryAttemptStore()
+        )
+        self.clock = clock
+        self.throttled = 0
+        self.lockouts = 0
+
+    def _keys(self, email, ip):
+        keys = [(f"email:{email.strip().casefold()}", LOGIN_MAX_ATTEMPTS_PER_EMAIL)]
+        if ip:
+            keys.append((f"ip:{ip}", LOGIN_MAX_ATTEMPTS_PER_IP))
+        return keys
+
+    async def check(self, email, ip=None):
+        """Get how many seconds the caller must wait before trying again (0 if allowed)"""
+        now = self.clock()
+        retry_after = 0.0
+        for key, _ in self._keys(email, ip):
+            state = await self.store.get(key)
+            if state and state["locked_until"] > now:
+                retry_after = max(retry_after, state["locked_until"] - now)
+
+        if retry_after:
+            self.throttled += 1
+        return retry_after
+
+    async def record_failure(self, email, ip=None):
+        """Count a failed login, locking out keys that exceeded their limit"""
+        now = self.clock()
+        # Long enough to cover any lockout plus the time escalations are remembered
+        ttl = LOGIN_LOCKOUT_MAX_SECONDS + max(LOGIN_WINDOW_SECONDS, LOGIN_LOCKOUT_MAX_SECONDS)
+        for key, max_attempts in self._keys(email, ip):
+            state = await self.store.append_failure(key, now, ttl)
+            seen = len(state["failures"])
+            failures = [ts for ts in state["failures"] if ts > now - LOGIN_WINDOW_SECONDS]
+
+            if len(failures) >= max_attempts:
+                lockouts = state["lockouts"] + 1
+                locked_until = now + min(
+                    LOGIN_LOCKOUT_BASE_SECONDS * 2 ** (lockouts - 1),
+                    LOGIN_LOCKOUT_MAX_SECONDS
+                )
+                # Remember escalated lockouts for a while after the last one ends
+                lockout_ttl = locked_until - now + max(LOGIN_WINDOW_SECONDS, LOGIN_LOCKOUT_MAX_SECONDS)
+                # If a concurrent failure got in first, its request sees the limit and locks instead
+                locked = await self.store.replace_failures(
+                    key,
+                    seen,
+                    {"failures": [], "lockouts": lockouts, "locked_until": locked_until},
+                    lockout_ttl
+                )
+                if locked:
+                    self.lockouts += 1
+            elif len(failures) < seen:
+                # Drop failures that slid out of the window so the list stays short
+                await self.store.replace_failures(
+                    key,
+                    seen,
+                    {"failures": failures, "lockouts": state["lockouts"], "locked_until": state["locked_until"]},
+                    ttl
+                )
+
+    async def record_success(self, email, ip=None):
+        """Clear the email's failures; the IP's are kept so one account can't reset them"""
+        key, _ = self._keys(email, None)[0]
+        await self.store.delete(key)
+
+    def stats(self):
+        """Get throttling counters"""
+        return {
+            "backend": type(self.store).__name__,
+            "throttled": self.throttled,
+            "lockouts": self.lockouts,
+        }
+
+
+# Shared by every request in the process
+login_throttle = LoginThrottle()
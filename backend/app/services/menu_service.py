@@ -1,11 +1,48 @@
 from .dynamodb_service import DynamoDBService
+from .search_service import SearchService
+from .query_service import QueryService
+from .foodstall_service import FoodStallService
+from .read_cache import menu_cache
+from ..models.records import MenuItemRecord
+from ..utils.fast_json import json_default
+from ..utils.menu_facets import compute_menu_facets
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import Binary
+import json
+import zlib
+
+# Attempts at an optimistic (version-conditioned) menu document write
+MENU_DOCUMENT_MAX_RETRIES = 5
+
+
+class MenuItemsNotCreated(Exception):
+    """Creating menu items failed, and every item written for them was deleted again"""
+
+
+def encode_menu_items(items):
+    """Compress menu items into a single binary attribute"""
+    payload = json.dumps(items, default=json_default, separators=(",", ":"))
+    return Binary(zlib.compress(payload.encode("utf-8")))
+
+
+def decode_menu_items(blob):
+    """Decompress menu items stored by encode_menu_items"""
+    if isinstance(blob, Binary):
+        blob = blob.value
+    return json.loads(zlib.decompress(bytes(blob)).decode("utf-8"))
+
 
 class MenuService:
     def __init__(self):
         self.dynamodb = DynamoDBService()
         self.table_name = "MenuItems"
+        self.documents_table_name = "MenuDocuments"
+        self.search_service = SearchService()
+        self.query_service = QueryService()
+        self.foodstall_service = FoodStallService()
+        self.cache = menu_cache
     
-    async def create_menu_item(self, food_stall_id, name, price, description, category, image_url):
+    async def create_menu_item(self, food_stall_id, name, price, description, category, image_url, image_variants=None):
         """Create a new menu item"""
         item_id = self.dynamodb.generate_id()
         
@@ -17,39 +54,267 @@ class MenuService:
             "description": description,
             "category": category,
             "image_url": image_url,
+            "image_variants": image_variants or {},
             "created_at": self.dynamodb.get_timestamp(),
             "updated_at": self.dynamodb.get_timestamp()
         }
         
         await self.dynamodb.put_item(self.table_name, menu_item)
+        self.search_service.index_menu_item(menu_item)
+        self.query_service.index_menu_item(menu_item)
+        await self._write_menu_document(food_stall_id, upserts=[menu_item])
         return menu_item
     
+    async def create_menu_items(self, food_stall_id, rows):
+        """
+        Create many menu items at once, e.g. for a menu import
+        
+        Items are written with batched writes and the menu document is
+        rewritten once for all of them. If any step fails the items written
+        so far are deleted again and MenuItemsNotCreated is raised; if that
+        cleanup fails too, the original error is raised and some of the
+        items may exist.
+        """
+        timestamp = self.dynamodb.get_timestamp()
+        menu_items = [
+            {
+                "id": self.dynamodb.generate_id(),
+                "food_stall_id": food_stall_id,
+                "name": row["name"],
+                "price": float(row["price"]),
+                "description": row["description"],
+                "category": row["category"],
+                "image_url": row["image_url"],
+                "image_variants": row.get("image_variants") or {},
+                "created_at": timestamp,
+                "updated_at": timestamp
+            }
+            for row in rows
+        ]
+        if not menu_items:
+            return []
+        
+        try:
+            await self.dynamodb.batch_write_items(self.table_name, menu_items)
+            for menu_item in menu_items:
+                self.search_service.index_menu_item(menu_item)
+                self.query_service.index_menu_item(menu_item)
+            await self._write_menu_document(food_stall_id, upserts=menu_items)
+        except Exception as e:
+            # Batches written before the failure are already stored
+            try:
+                await self._remove_menu_items(food_stall_id, menu_items)
+            except Exception as cleanup_error:
+                print(f"Error removing menu items after a failed create: {cleanup_error}")
+                raise e
+            raise MenuItemsNotCreated(f"Could not create menu items: {e}") from e
+        return menu_items
+    
+    async def _remove_menu_items(self, food_stall_id, menu_items):
+        """Delete menu items from MenuItems, the indexes and the menu document, wherever they got to"""
+        item_ids = {menu_item["id"] for menu_item in menu_items}
+        await self.dynamodb.batch_delete_items(self.table_name, [{"id": item_id} for item_id in item_ids])
+        for item_id in item_ids:
+            self.search_service.remove_menu_item(item_id)
+            self.query_service.remove_menu_item(item_id)
+        
+        current = await self._read_menu_document(food_stall_id)
+        if any(item["id"] in item_ids for item in current["items"]):
+            await self._write_menu_document(food_stall_id, removed_ids=item_ids)
+    
     async def get_menu_item_by_id(self, item_id):
         """Get menu item by ID"""
-        return await self.dynamodb.get_item(self.table_name, {"id": item_id})
+        return await self.dynamodb.get_record(self.table_name, {"id": item_id}, MenuItemRecord)
     
     async def get_menu_items(self, food_stall_id):
         """Get all menu items for a specific food stall"""
-        return await self.dynamodb.query(
+        document = await self.get_menu_document(food_stall_id)
+        return document["items"]
+    
+    async def get_menu_items_by_category(self, food_stall_id, category):
+        """Get menu items for a specific food stall and category"""
+        document = await self.get_menu_document(food_stall_id)
+        return [item for item in document["items"] if item.get("category") == category]
+    
+    async def get_menu_document(self, food_stall_id):
+        """
+        Get the materialized menu of a food stall
+        
+        The whole menu is stored as one versioned item in MenuDocuments, so
+        reading it is a single get_item. The document is built from the
+        MenuItems index the first time a stall's menu is read. Cached; treat
+        the result as read-only.
+        """
+        return await self.cache.get(food_stall_id, lambda: self._read_menu_document(food_stall_id))
+    
+    async def _read_menu_document(self, food_stall_id):
+        """Read a stall's menu document from DynamoDB, bypassing the cache"""
+        stored = await self.dynamodb.get_item(
+            self.documents_table_name,
+            {"food_stall_id": food_stall_id}
+        )
+        if stored is None:
+            return await self._build_menu_document(food_stall_id)
+        
+        items = decode_menu_items(stored["items"])
+        if stored.get("pending_ids"):
+            # Changes a lost write couldn't apply; read them from MenuItems
+            items = await self._apply_pending_items(items, stored["pending_ids"])
+        return {
+            "food_stall_id": food_stall_id,
+            "version": int(stored["version"]),
+            "updated_at": stored["updated_at"],
+            "items": items
+        }
+    
+    async def _apply_pending_items(self, items, pending_ids):
+        """Bring the given items of a menu document up to date with their MenuItems rows"""
+        items = {item["id"]: item for item in items}
+        for item_id in pending_ids:
+            row = await self.dynamodb.get_record(self.table_name, {"id": item_id}, MenuItemRecord, ConsistentRead=True)
+            if row is None:
+                items.pop(item_id, None)
+            else:
+                items[item_id] = row
+        return self._document_items(list(items.values()))
+    
+    async def _query_menu_items(self, food_stall_id):
+        """Get all menu items for a food stall from the MenuItems index"""
+        return await self.dynamodb.query_records(
             table_name=self.table_name,
+            record_type=MenuItemRecord,
             index_name="FoodStallIndex",
             KeyConditionExpression="food_stall_id = :food_stall_id",
             ExpressionAttributeValues={":food_stall_id": food_stall_id}
         )
     
-    async def get_menu_items_by_category(self, food_stall_id, category):
-        """Get menu items for a specific food stall and category"""
-        return await self.dynamodb.query(
-            table_name=self.table_name,
-            index_name="CategoryIndex",
-            KeyConditionExpression="food_stall_id = :food_stall_id AND category = :category",
-            ExpressionAttributeValues={
-                ":food_stall_id": food_stall_id,
-                ":category": category
-            }
-        )
+    async def _build_menu_document(self, food_stall_id):
+        """Create the first version of a stall's menu document"""
+        items = await self._query_menu_items(food_stall_id)
+        document = self._new_menu_document(food_stall_id, items, version=1)
+        
+        try:
+            await self._put_menu_document(document, expected_version=None)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            # Another request created it first
+            return await self._read_menu_document(food_stall_id)
+        
+        # Backfill the stall's menu facets along with its first menu document
+        await self.foodstall_service.update_menu_facets(food_stall_id, compute_menu_facets(items))
+        
+        return document
+    
+    async def _write_menu_document(self, food_stall_id, upserts=(), removed_ids=()):
+        """
+        Apply menu item changes to a stall's menu document and bump its version
+        
+        If every attempt loses the race, the changed ids are marked as
+        pending on the document instead, and read back from MenuItems until
+        the next write folds them in.
+        """
+        for _ in range(MENU_DOCUMENT_MAX_RETRIES):
+            # Read past the cache: the version check needs the stored version
+            current = await self._read_menu_document(food_stall_id)
+            
+            items = {item["id"]: item for item in current["items"]}
+            for item in upserts:
+                items[item["id"]] = item
+            for item_id in removed_ids:
+                items.pop(item_id, None)
+            
+            document = self._new_menu_document(
+                food_stall_id,
+                list(items.values()),
+                version=current["version"] + 1
+            )
+            
+            try:
+                await self._put_menu_document(document, expected_version=current["version"])
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                continue
+            
+            await self.cache.invalidate(food_stall_id)
+            
+            # Keep the stall's menu facets in step, skipping the write when
+            # only names or descriptions changed
+            menu_facets = compute_menu_facets(document["items"])
+            if menu_facets != compute_menu_facets(current["items"]):
+                await self.foodstall_service.update_menu_facets(food_stall_id, menu_facets)
+            
+            return document
+        
+        # Every attempt lost the race, but the MenuItems rows are already
+        # written: rather than leave the document without them, record their
+        # ids on it so reads and the next write pick them up from MenuItems
+        print(f"Could not update menu document for food stall {food_stall_id}; marking items as pending")
+        item_ids = {item["id"] for item in upserts} | set(removed_ids)
+        await self._mark_pending_items(food_stall_id, item_ids)
+        await self.cache.invalidate(food_stall_id)
+        
+        document = await self._read_menu_document(food_stall_id)
+        await self.foodstall_service.update_menu_facets(food_stall_id, compute_menu_facets(document["items"]))
+        return document
+    
+    async def _mark_pending_items(self, food_stall_id, item_ids):
+        """Record items whose changes a menu document is missing; the next full write clears them"""
+        try:
+            # Bumping the version makes a concurrent write retry and see them
+            await self.dynamodb.update_item(
+                table_name=self.documents_table_name,
+                key={"food_stall_id": food_stall_id},
+                update_expression="ADD pending_ids :item_ids, version :one",
+                expression_attribute_values={":item_ids": set(item_ids), ":one": 1},
+                ConditionExpression="attribute_exists(food_stall_id)"
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            # No document: the next read builds it from MenuItems
+    
+    def _new_menu_document(self, food_stall_id, items, version):
+        return {
+            "food_stall_id": food_stall_id,
+            "version": version,
+            "updated_at": self.dynamodb.get_timestamp(),
+            "items": self._document_items(items)
+        }
+    
+    def _document_items(self, items):
+        # Round-trip through JSON so every price is a plain number
+        items = json.loads(json.dumps(items, default=json_default))
+        items.sort(key=lambda item: (item.get("category", ""), item.get("name", ""), item["id"]))
+        return items
     
-    async def update_menu_item(self, item_id, name=None, price=None, description=None, category=None, image_url=None):
+    async def _put_menu_document(self, document, expected_version):
+        """Store a menu document, failing if someone else changed it first"""
+        item = {
+            "food_stall_id": document["food_stall_id"],
+            "version": document["version"],
+            "updated_at": document["updated_at"],
+            "item_count": len(document["items"]),
+            "items": encode_menu_items(document["items"])
+        }
+        
+        if expected_version is None:
+            await self.dynamodb.put_item(
+                self.documents_table_name,
+                item,
+                ConditionExpression="attribute_not_exists(food_stall_id)"
+            )
+        else:
+            await self.dynamodb.put_item(
+                self.documents_table_name,
+                item,
+                ConditionExpression="version = :expected_version",
+                ExpressionAttributeValues={":expected_version": expected_version}
+            )
+    
+    async def update_menu_item(self, item_id, name=None, price=None, description=None, category=None, image_url=None,
+                               image_variants=None):
         """Update menu item information"""
         update_expression_parts = []
         expression_attribute_values = {":updated_at": self.dynamodb.get_timestamp()}
@@ -73,28 +338,53 @@ class MenuService:
         if image_url:
             update_expression_parts.append("image_url = :image_url")
             expression_attribute_values[":image_url"] = image_url
+            # Variants of the previous image no longer apply
+            update_expression_parts.append("image_variants = :image_variants")
+            expression_attribute_values[":image_variants"] = image_variants or {}
         
         # Add the updated_at timestamp
         update_expression_parts.append("updated_at = :updated_at")
         
         update_expression = "SET " + ", ".join(update_expression_parts)
         
-        return await self.dynamodb.update_item(
+        updated_item = await self.dynamodb.update_item(
             table_name=self.table_name,
             key={"id": item_id},
             update_expression=update_expression,
             expression_attribute_values=expression_attribute_values
         )
+        self.search_service.index_menu_item(updated_item)
+        self.query_service.index_menu_item(updated_item)
+        await self._write_menu_document(updated_item["food_stall_id"], upserts=[updated_item])
+        return updated_item
     
     async def delete_menu_item(self, item_id):
         """Delete a menu item"""
-        return await self.dynamodb.delete_item(self.table_name, {"id": item_id})
+        deleted_item = await self._delete_menu_item_row(item_id)
+        if deleted_item:
+            await self._write_menu_document(deleted_item["food_stall_id"], removed_ids=[item_id])
+        return deleted_item
     
     async def delete_menu_category(self, food_stall_id, category):
         """Delete all menu items in a specific category for a food stall"""
         items = await self.get_menu_items_by_category(food_stall_id, category)
         
         for item in items:
-            await self.delete_menu_item(item["id"])
+            await self._delete_menu_item_row(item["id"])
         
-        return len(items)
\ No newline at end of file
+        # Rewrite the menu document once for the whole category
+        if items:
+            await self._write_menu_document(food_stall_id, removed_ids=[item["id"] for item in items])
+        
+        return items
+    
+    async def _delete_menu_item_row(self, item_id):
+        """Delete a menu item from MenuItems and the in-memory indexes"""
+        response = await self.dynamodb.delete_item(
+            self.table_name,
+            {"id": item_id},
+            ReturnValues="ALL_OLD"
+        )
+        self.search_service.remove_menu_item(item_id)
+        self.query_service.remove_menu_item(item_id)
+        return response.get("Attributes")
@@ -0,0 +1,123 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import os
+import time
+
+# Password hashing configuration
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_POOL_KIND = os.getenv("PASSWORD_POOL_KIND", "thread")  # "thread" or "process"
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+# Hashes allowed to wait for or run on the pool before new ones are refused
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", "64"))
+
+_pwd_context = None
+
+
+def get_pwd_context():
+    """Get the bcrypt CryptContext, importing passlib on first use"""
+    global _pwd_context
+    if _pwd_context is None:
+        # passlib is slow to import and only logins and sign-ups need it
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
+
+
+def hash_password(password):
+    """Hash a password with bcrypt (blocking)"""
+    return get_pwd_context().hash(password)
+
+
+def verify_password(plain_password, hashed_password):
+    """Check a password against a bcrypt hash (blocking)"""
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def _timed_call(func, *args):
+    # Runs in the worker; wall-clock time is comparable across processes
+    started_at = time.time()
+    return started_at, func(*args)
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when too many password hashes are already queued"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, size-limited worker pool
+
+    bcrypt takes hundreds of milliseconds of CPU per call; running it on the
+    event loop would stall every other request in the worker.
+    """
+
+    def __init__(self, max_workers=PASSWORD_POOL_SIZE, kind=PASSWORD_POOL_KIND,
+                 max_pending=PASSWORD_POOL_MAX_PENDING):
+        self.max_workers = max_workers
+        self.kind = kind
+        self.max_pending = max_pending
+        self.executor = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_executor(self):
+        # Created on first use so importing the app stays cheap
+        if self.executor is None:
+            if self.kind == "process":
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="bcrypt"
+                )
+        return self.executor
+
+    async def hash(self, password):
+        """Hash a password off the event loop"""
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password, hashed_password):
+        """Verify a password off the event loop"""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordPoolBusy("Too many password operations in progress")
+
+        self.pending += 1
+        submitted_at = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            started_at, result = await loop.run_in_executor(
+                self._get_executor(), _timed_call, func, *args
+            )
+            finished_at = time.time()
+            self.total_wait += max(started_at - submitted_at, 0.0)
+            self.total_run += max(finished_at - started_at, 0.0)
+            self.completed += 1
+            return result
+        finally:
+            self.pending -= 1
+
+    def stats(self):
+        """Get pool size, queue depth and timing metrics"""
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "pending": self.pending,
+            "queue_depth": max(self.pending - self.max_workers, 0),
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.completed * 1000, 2) if self.completed else 0.0,
+            "avg_run_ms": round(self.total_run / self.completed * 1000, 2) if self.completed else 0.0,
+        }
+
+
+# Shared by every request in the process
+password_hasher = PasswordHasher()
@@ -0,0 +1,64 @@
+from ..utils.ttl_cache import TTLCache
+import hashlib
+import os
+import time
+
+# Principal cache configuration
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+# How long a user's token versions may be trusted before they are re-read. A
+# revocation made by another process takes effect here within this window.
+TOKEN_VERSION_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_VERSION_CACHE_TTL_SECONDS", "30"))
+
+
+class PrincipalCache:
+    """
+    Cache of resolved users keyed by (user id, access token)
+
+    Entries never outlive the token they were resolved from. Tokens are
+    stored as digests so the cache does not retain credentials.
+    """
+
+    def __init__(self, max_size=PRINCIPAL_CACHE_MAX_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS):
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.invalidations = 0
+
+    def _key(self, user_id, token):
+        return (user_id, hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest())
+
+    def get(self, user_id, token):
+        """Get the cached principal for a token, or None"""
+        return self.cache.get(self._key(user_id, token))
+
+    def put(self, user_id, token, principal, expires_at=None):
+        """Cache a principal until the cache TTL or the token expiry, whichever is sooner"""
+        ttl = None
+        if expires_at is not None:
+            ttl = float(expires_at) - time.time()
+        self.cache.set(self._key(user_id, token), principal, ttl=ttl)
+
+    def invalidate_user(self, user_id):
+        """Drop every cached principal of a user, e.g. after a profile change"""
+        self.invalidations += 1
+        return self.cache.delete_where(lambda key: key[0] == user_id)
+
+    def clear(self):
+        """Drop every cached principal"""
+        self.cache.clear()
+
+    def stats(self):
+        """Get cache metrics"""
+        stats = self.cache.stats()
+        stats["invalidations"] = self.invalidations
+        return stats
+
+
+# Shared by every request in the process
+principal_cache = PrincipalCache()
+
+# user id -> (token_version, revoked_version), checked on every request
+token_version_cache = TTLCache(
+    max_size=PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=TOKEN_VERSION_CACHE_TTL_SECONDS
+)
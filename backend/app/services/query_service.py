@@ -0,0 +1,316 @@
+from .dynamodb_service import DynamoDBService
+from ..models.records import FoodStallRecord, MenuItemRecord
+from ..utils.distance import calculate_distance
+from ..utils.geo_index import GeoCellIndex, quantize_point
+from .read_cache import nearby_cache
+import asyncio
+import bisect
+import itertools
+import os
+import time
+
+# Grid cell size in degrees for the spatial index (0.02 degrees is about 2 km)
+GEO_CELL_SIZE_DEG = float(os.getenv("GEO_CELL_SIZE_DEG", "0.02"))
+
+# Rebuild the catalog from DynamoDB after this many seconds
+QUERY_INDEX_TTL_SECONDS = int(os.getenv("QUERY_INDEX_TTL_SECONDS", "300"))
+
+# Query coordinates are rounded to this many decimal places (3 is about 110 m)
+# so that searches from almost the same spot are computed once and cached
+NEARBY_COORD_PRECISION = int(os.getenv("NEARBY_COORD_PRECISION", "3"))
+
+SPATIAL = "spatial"
+CATEGORY = "category"
+PRICE = "price"
+FULL_SCAN = "all"
+
+# Catalog versions; unique across catalogs so they can key shared caches
+_versions = itertools.count(1)
+
+
+def normalize_category(category):
+    """Normalize a menu category for case-insensitive matching"""
+    return str(category or "").strip().casefold()
+
+
+class StallCatalog:
+    """
+    In-memory indexes over food stalls and their menus
+
+    Holds a spatial grid of stall locations, a posting list per menu category
+    (stall id -> cheapest item price in that category) and a list of
+    (cheapest item price, stall id) kept sorted for price range lookups.
+    `version` changes whenever the catalog does and is never reused, even
+    by another catalog.
+    """
+
+    def __init__(self, cell_size=GEO_CELL_SIZE_DEG):
+        self.stalls = {}  # stall id -> stall
+        self.geo = GeoCellIndex(cell_size=cell_size)
+        self.menu_items = {}  # stall id -> {item id: (category, price)}
+        self.item_stalls = {}  # item id -> stall id
+        self.categories = {}  # category -> {stall id: cheapest price}
+        self.min_prices = {}  # stall id -> cheapest price
+        self.price_sorted = []  # sorted (cheapest price, stall id)
+        self.version = next(_versions)
+
+    def clear(self):
+        """Remove every stall and menu item"""
+        self.version = next(_versions)
+        self.stalls.clear()
+        self.geo.clear()
+        self.menu_items.clear()
+        self.item_stalls.clear()
+        self.categories.clear()
+        self.min_prices.clear()
+        self.price_sorted = []
+
+    def upsert_stall(self, stall):
+        """Add or refresh a food stall"""
+        self.version = next(_versions)
+        if not stall:
+            return
+
+        stall_id = stall["id"]
+        self.stalls[stall_id] = stall
+        location = stall.get("location") or {}
+        if location.get("latitude") is not None and location.get("longitude") is not None:
+            self.geo.add(stall_id, location["latitude"], location["longitude"])
+        else:
+            self.geo.remove(stall_id)
+
+    def remove_stall(self, stall_id):
+        """Remove a food stall and its menu"""
+        self.version = next(_versions)
+        self.stalls.pop(stall_id, None)
+        self.geo.remove(stall_id)
+        for item_id in list(self.menu_items.get(stall_id, {})):
+            self.remove_menu_item(item_id)
+
+    def upsert_menu_item(self, item):
+        """Add or refresh a menu item"""
+        self.version = next(_versions)
+        if not item or item.get("price") is None:
+            return
+
+        stall_id = item["food_stall_id"]
+        items = self.menu_items.setdefault(stall_id, {})
+        previous = items.get(item["id"])
+        items[item["id"]] = (normalize_category(item.get("category")), float(item["price"]))
+        self.item_stalls[item["id"]] = stall_id
+
+        self._refresh_stall_prices(stall_id, {previous[0]} if previous else set())
+
+    def remove_menu_item(self, item_id):
+        """Remove a menu item"""
+        self.version = next(_versions)
+        stall_id = self.item_stalls.pop(item_id, None)
+        items = self.menu_items.get(stall_id)
+        if not items or item_id not in items:
+            return
+
+        category, _ = items.pop(item_id)
+        if not items:
+            del self.menu_items[stall_id]
+        self._refresh_stall_prices(stall_id, {category})
+
+    def _refresh_stall_prices(self, stall_id, stale_categories):
+        """Recompute a stall's category postings and its price list entry"""
+        items = self.menu_items.get(stall_id, {})
+
+        category_prices = {}
+        for category, price in items.values():
+            if price < category_prices.get(category, float("inf")):
+                category_prices[category] = price
+
+        for category in stale_categories - set(category_prices):
+            posting = self.categories.get(category)
+            if posting is not None:
+                posting.pop(stall_id, None)
+                if not posting:
+                    del self.categories[category]
+        for category, price in category_prices.items():
+            self.categories.setdefault(category, {})[stall_id] = price
+
+        previous = self.min_prices.pop(stall_id, None)
+        if previous is not None:
+            position = bisect.bisect_left(self.price_sorted, (previous, stall_id))
+            if position < len(self.price_sorted) and self.price_sorted[position] == (previous, stall_id):
+                del self.price_sorted[position]
+        if category_prices:
+            cheapest = min(category_prices.values())
+            self.min_prices[stall_id] = cheapest
+            bisect.insort(self.price_sorted, (cheapest, stall_id))
+
+    def count_at_most(self, max_price):
+        """Count stalls with at least one item priced at or below max_price"""
+        return bisect.bisect_right(self.price_sorted, (max_price, chr(0x10FFFF)))
+
+    def at_most(self, max_price):
+        """Lazily yield stall ids with an item priced at or below max_price, cheapest first"""
+        for position in range(self.count_at_most(max_price)):
+            yield self.price_sorted[position][1]
+
+
+# The catalog is shared by every QueryService instance in the process
+_catalog = StallCatalog()
+_state = {"loaded_at": None}
+_load_lock = asyncio.Lock()
+
+
+class QueryService:
+    def __init__(self):
+        self.dynamodb = DynamoDBService()
+        self.catalog = _catalog
+
+    async def ensure_loaded(self):
+        """Build the catalog from DynamoDB if it is missing or stale"""
+        if not self._is_stale():
+            return
+
+        async with _load_lock:
+            if not self._is_stale():
+                return
+
+            # Two scans replace one menu query per stall
+            food_stalls = await self.dynamodb.scan_records("FoodStalls", FoodStallRecord)
+            menu_items = await self.dynamodb.scan_records("MenuItems", MenuItemRecord)
+
+            self.catalog.clear()
+            for stall in food_stalls:
+                self.catalog.upsert_stall(stall)
+            for item in menu_items:
+                self.catalog.upsert_menu_item(item)
+
+            _state["loaded_at"] = time.monotonic()
+
+    def plan(self, latitude=None, longitude=None, radius=None, category=None, max_price=None):
+        """
+        Choose the most selective index for a query
+
+        Returns (index name, estimated candidate count). Every index that
+        applies is estimated and the one yielding the fewest candidates wins.
+        """
+        options = [(FULL_SCAN, len(self.catalog.stalls))]
+
+        if latitude is not None and longitude is not None and radius is not None:
+            options.append((SPATIAL, self.catalog.geo.estimate(latitude, longitude, radius)))
+
+        if category:
+            options.append((CATEGORY, len(self.catalog.categories.get(normalize_category(category), {}))))
+
+        if max_price is not None:
+            options.append((PRICE, self.catalog.count_at_most(max_price)))
+
+        # Prefer a real index over a full scan when the estimates tie
+        return min(options, key=lambda option: (option[1], option[0] == FULL_SCAN))
+
+    async def query_food_stalls(self, latitude=None, longitude=None, radius=None, category=None,
+                                max_price=None, min_rating=None, limit=50):
+        """
+        Find food stalls matching every given condition
+
+        Candidates come from the most selective index and are checked
+        lazily against the remaining conditions. When category and max_price
+        are both given, an item in that category must be within the price.
+
+        Coordinates are rounded to NEARBY_COORD_PRECISION, and results are
+        cached until the catalog changes; treat them as read-only.
+        """
+        await self.ensure_loaded()
+
+        if latitude is not None and longitude is not None:
+            latitude, longitude = quantize_point(latitude, longitude, NEARBY_COORD_PRECISION)
+        key = (
+            "query", self.catalog.version, latitude, longitude, radius,
+            normalize_category(category) if category else None, max_price, min_rating, limit
+        )
+        return await nearby_cache.get(
+            key,
+            lambda: self._query_food_stalls(latitude, longitude, radius, category, max_price, min_rating, limit)
+        )
+
+    async def _query_food_stalls(self, latitude, longitude, radius, category, max_price, min_rating, limit):
+        """Run a stall query against the catalog, bypassing the cache"""
+        index, estimated = self.plan(latitude, longitude, radius, category, max_price)
+        category = normalize_category(category) if category else None
+        has_location = latitude is not None and longitude is not None and radius is not None
+
+        if index == SPATIAL:
+            candidates = self.catalog.geo.candidates(latitude, longitude, radius)
+        elif index == CATEGORY:
+            candidates = iter(list(self.catalog.categories.get(category, {})))
+        elif index == PRICE:
+            candidates = self.catalog.at_most(max_price)
+        else:
+            candidates = iter(list(self.catalog.stalls))
+
+        examined = 0
+        results = []
+        for stall_id in candidates:
+            examined += 1
+            stall = self.catalog.stalls.get(stall_id)
+            if stall is None:
+                continue
+
+            if min_rating is not None and float(stall.get("average_rating", 0) or 0) < min_rating:
+                continue
+
+            matched_price = None
+            if category:
+                matched_price = self.catalog.categories.get(category, {}).get(stall_id)
+                if matched_price is None:
+                    continue
+            elif max_price is not None:
+                matched_price = self.catalog.min_prices.get(stall_id)
+            if max_price is not None and (matched_price is None or matched_price > max_price):
+                continue
+
+            distance = None
+            if has_location:
+                position = self.catalog.geo.get_position(stall_id)
+                if position is None:
+                    continue
+                distance = calculate_distance(latitude, longitude, position[0], position[1])
+                if distance > radius:
+                    continue
+
+            result = dict(stall)
+            result["distance"] = distance
+            result["matched_price"] = matched_price
+            results.append(result)
+
+        if has_location:
+            results.sort(key=lambda x: x["distance"])
+        else:
+            results.sort(key=lambda x: float(x.get("average_rating", 0) or 0), reverse=True)
+
+        return {
+            "results": results[:limit],
+            "plan": {
+                "index": index,
+                "estimated": estimated,
+                "examined": examined,
+                "matched": len(results),
+            }
+        }
+
+    def index_food_stall(self, stall):
+        """Add or refresh a food stall in the catalog"""
+        self.catalog.upsert_stall(stall)
+
+    def remove_food_stall(self, stall_id):
+        """Remove a food stall from the catalog"""
+        self.catalog.remove_stall(stall_id)
+
+    def index_menu_item(self, item):
+        """Add or refresh a menu item in the catalog"""
+        self.catalog.upsert_menu_item(item)
+
+    def remove_menu_item(self, item_id):
+        """Remove a menu item from the catalog"""
+        self.catalog.remove_menu_item(item_id)
+
+    def _is_stale(self):
+        loaded_at = _state["loaded_at"]
+        return loaded_at is None or time.monotonic() - loaded_at > QUERY_INDEX_TTL_SECONDS
@@ -0,0 +1,234 @@
+from ..utils.ttl_cache import TTLCache
+from ..utils.fast_json import json_default
+from ..utils.single_flight import SingleFlight
+import json
+import os
+
+# Read cache configuration
+READ_CACHE_BACKEND = os.getenv("READ_CACHE_BACKEND", "memory")  # "memory" or "shared"
+READ_CACHE_URL = os.getenv("READ_CACHE_URL")  # e.g. redis://cache:6379/0 for the shared backend
+READ_CACHE_MAX_SIZE = int(os.getenv("READ_CACHE_MAX_SIZE", "10000"))
+READ_CACHE_TTL_SECONDS = float(os.getenv("READ_CACHE_TTL_SECONDS", "30"))
+# Misses (e.g. unknown stall ids) are remembered briefly so they can't hammer DynamoDB
+READ_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("READ_CACHE_NEGATIVE_TTL_SECONDS", "5"))
+# After a write, the shared cache refuses loads of that key for this long, so a load
+# another process started before the write can't store the old value; keep it above
+# the slowest load
+READ_CACHE_TOMBSTONE_SECONDS = float(os.getenv("READ_CACHE_TOMBSTONE_SECONDS", "10"))
+# Results of nearby and filtered stall queries, kept per process
+NEARBY_CACHE_MAX_SIZE = int(os.getenv("NEARBY_CACHE_MAX_SIZE", "2000"))
+NEARBY_CACHE_TTL_SECONDS = float(os.getenv("NEARBY_CACHE_TTL_SECONDS", "15"))
+
+
+class InMemoryCacheBackend:
+    """
+    Per-process LRU backend
+
+    Values are stored as-is, so callers must treat what they get as read-only.
+    Loads overtaken by a write are caught by ReadThroughCache itself.
+    """
+
+    def __init__(self, max_size=READ_CACHE_MAX_SIZE, ttl=READ_CACHE_TTL_SECONDS):
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    async def get(self, key):
+        return self.cache.get(key)
+
+    async def add(self, key, entry, ttl):
+        """Store an entry unless the key already holds one"""
+        if self.cache.get(key) is None:
+            self.cache.set(key, entry, ttl=ttl)
+
+    async def invalidate(self, key):
+        self.cache.delete(key)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+class InMemorySharedClient:
+    """
+    Local stand-in for a shared cache server
+
+    Implements the get/set(ex=, nx=) subset of the redis.asyncio client
+    that SharedCacheBackend uses, storing bytes like the real server would.
+    """
+
+    def __init__(self, max_size=READ_CACHE_MAX_SIZE):
+        self.cache = TTLCache(max_size=max_size, ttl=float("inf"))
+
+    async def get(self, key):
+        return self.cache.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and self.cache.get(key) is not None:
+            return None
+        self.cache.set(key, value, ttl=ex)
+        return True
+
+
+class SharedCacheBackend:
+    """
+    Backend shared by every process, e.g. Redis
+
+    Entries are stored as JSON, so every process sees (and invalidation
+    reaches) the same copy. Invalidating writes a short-lived tombstone
+    rather than deleting the key, and loads only store into an empty key
+    (SET NX), so a load that began in any process before a write can't
+    cache what it read.
+    """
+
+    def __init__(self, client, tombstone_ttl=READ_CACHE_TOMBSTONE_SECONDS):
+        self.client = client
+        self.tombstone_ttl = tombstone_ttl
+        self.errors = 0
+        self.refused = 0
+
+    async def get(self, key):
+        try:
+            raw = await self.client.get(key)
+        except Exception as e:
+            # A cache outage must not take reads down with it
+            print(f"Error reading {key} from the shared cache: {e}")
+            self.errors += 1
+            return None
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return None if entry.get("tombstone") else entry
+
+    async def add(self, key, entry, ttl):
+        """Store an entry unless the key holds one already, or a tombstone"""
+        try:
+            stored = await self.client.set(key, json.dumps(entry, default=json_default), ex=max(int(ttl), 1), nx=True)
+        except Exception as e:
+            print(f"Error writing {key} to the shared cache: {e}")
+            self.errors += 1
+            return
+        if not stored:
+            self.refused += 1
+
+    async def invalidate(self, key):
+        try:
+            await self.client.set(key, json.dumps({"tombstone": True}), ex=max(int(self.tombstone_ttl), 1))
+        except Exception as e:
+            print(f"Error invalidating {key} in the shared cache: {e}")
+            self.errors += 1
+
+    def stats(self):
+        return {"client": type(self.client).__name__, "errors": self.errors, "refused": self.refused}
+
+
+def create_backend():
+    """Create the backend selected by READ_CACHE_BACKEND"""
+    if READ_CACHE_BACKEND != "shared":
+        return InMemoryCacheBackend()
+    if not READ_CACHE_URL:
+        return SharedCacheBackend(InMemorySharedClient())
+
+    # Only needed when a real shared cache is configured
+    try:
+        import redis.asyncio
+    except ImportError:
+        raise RuntimeError(
+            "READ_CACHE_URL is set but the redis package is not installed; "
+            "install it (pip install redis) or unset READ_CACHE_URL"
+        )
+    return SharedCacheBackend(redis.asyncio.from_url(READ_CACHE_URL))
+
+
+class ReadThroughCache:
+    """
+    Read-through cache for one kind of entity, e.g. food stalls by id
+
+    Misses are loaded once per key however many requests ask concurrently.
+    Writers call invalidate() after changing the entity; a load that was
+    already running when that happened is not cached (in other processes
+    too, with the shared backend).
+    """
+
+    def __init__(self, namespace, backend, ttl=READ_CACHE_TTL_SECONDS,
+                 negative_ttl=READ_CACHE_NEGATIVE_TTL_SECONDS):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.flights = SingleFlight()
+        self.loading = {}  # key -> number of loads running
+        self.generations = {}  # key -> invalidation count, while a load is running
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.invalidations = 0
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key, loader):
+        """Get an entity, calling loader() to fetch it from DynamoDB on a miss"""
+        entry = await self.backend.get(self._key(key))
+        if entry is not None:
+            self.hits += 1
+            if not entry["found"]:
+                self.negative_hits += 1
+                return None
+            return entry["value"]
+
+        return await self.flights.do(key, lambda: self._load(key, loader))
+
+    async def _load(self, key, loader):
+        self.misses += 1
+        self.loading[key] = self.loading.get(key, 0) + 1
+        generation = self.generations.setdefault(key, 0)
+        try:
+            value = await loader()
+        finally:
+            current_generation = self.generations.get(key)
+            self.loading[key] -= 1
+            if not self.loading[key]:
+                del self.loading[key]
+                self.generations.pop(key, None)
+
+        if current_generation == generation:
+            entry = {"found": value is not None, "value": value}
+            await self.backend.add(self._key(key), entry, self.ttl if value is not None else self.negative_ttl)
+        return value
+
+    async def invalidate(self, key):
+        """Forget an entity after it was created, changed or deleted"""
+        self.invalidations += 1
+        if key in self.generations:
+            self.generations[key] += 1
+        # Later readers must not join a load that may have read the old value
+        self.flights.forget(key)
+        await self.backend.invalidate(self._key(key))
+
+    def stats(self):
+        """Get hit/miss counters, plus the backend's own"""
+        lookups = self.hits + self.misses + self.flights.coalesced
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "coalesced": self.flights.coalesced,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "backend": self.backend.stats(),
+        }
+
+
+# Shared by every request in the process
+read_cache_backend = create_backend()
+food_stall_cache = ReadThroughCache("food_stall", read_cache_backend)
+menu_cache = ReadThroughCache("menu", read_cache_backend)
+review_cache = ReadThroughCache("reviews", read_cache_backend)
+# Full FoodStalls scans running at once share one scan
+food_stall_scans = SingleFlight()
+# Query results depend on every stall, so they stay in this process and are
+# keyed by the query catalog's version rather than invalidated
+nearby_cache = ReadThroughCache(
+    "nearby",
+    InMemoryCacheBackend(max_size=NEARBY_CACHE_MAX_SIZE, ttl=NEARBY_CACHE_TTL_SECONDS),
+    ttl=NEARBY_CACHE_TTL_SECONDS,
+    negative_ttl=NEARBY_CACHE_TTL_SECONDS
+)
@@ -1,9 +1,12 @@
 from .dynamodb_service import DynamoDBService
+from .read_cache import review_cache
+from ..models.records import ReviewRecord
 
 class ReviewService:
     def __init__(self):
         self.dynamodb = DynamoDBService()
         self.table_name = "Reviews"
+        self.cache = review_cache
     
     async def create_review(self, food_stall_id, user_id, user_name, rating, comment):
         """Create a new review"""
@@ -21,25 +24,31 @@ class ReviewService:
         }
         
         await self.dynamodb.put_item(self.table_name, review)
+        await self.cache.invalidate(food_stall_id)
         return review
     
     async def get_review_by_id(self, review_id):
         """Get review by ID"""
-        return await self.dynamodb.get_item(self.table_name, {"id": review_id})
+        return await self.dynamodb.get_record(self.table_name, {"id": review_id}, ReviewRecord)
     
     async def get_reviews_by_stall(self, food_stall_id):
-        """Get all reviews for a specific food stall"""
-        return await self.dynamodb.query(
-            table_name=self.table_name,
-            index_name="FoodStallIndex",
-            KeyConditionExpression="food_stall_id = :food_stall_id",
-            ExpressionAttributeValues={":food_stall_id": food_stall_id}
+        """Get all reviews for a specific food stall (cached; treat the result as read-only)"""
+        return await self.cache.get(
+            food_stall_id,
+            lambda: self.dynamodb.query_records(
+                table_name=self.table_name,
+                record_type=ReviewRecord,
+                index_name="FoodStallIndex",
+                KeyConditionExpression="food_stall_id = :food_stall_id",
+                ExpressionAttributeValues={":food_stall_id": food_stall_id}
+            )
         )
     
     async def get_user_review(self, stall_id, user_id):
         """Get a user's review for a specific food stall"""
-        reviews = await self.dynamodb.query(
+        reviews = await self.dynamodb.query_records(
             table_name=self.table_name,
+            record_type=ReviewRecord,
             index_name="UserReviewIndex",
             KeyConditionExpression="food_stall_id = :food_stall_id AND user_id = :user_id",
             ExpressionAttributeValues={
@@ -70,13 +79,23 @@ class ReviewService:
         
         update_expression = "SET " + ", ".join(update_expression_parts)
         
-        return await self.dynamodb.update_item(
+        updated_review = await self.dynamodb.update_item(
             table_name=self.table_name,
             key={"id": review_id},
             update_expression=update_expression,
             expression_attribute_values=expression_attribute_values
         )
+        await self.cache.invalidate(updated_review["food_stall_id"])
+        return updated_review
     
     async def delete_review(self, review_id):
         """Delete a review"""
-        return await self.dynamodb.delete_item(self.table_name, {"id": review_id})
\ No newline at end of file
+        response = await self.dynamodb.delete_item(
+            self.table_name,
+            {"id": review_id},
+            ReturnValues="ALL_OLD"
+        )
+        deleted_review = response.get("Attributes")
+        if deleted_review:
+            await self.cache.invalidate(deleted_review["food_stall_id"])
+        return response
\ No newline at end of file
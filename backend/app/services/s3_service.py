@@ -1,20 +1,89 @@
 import boto3
 import os
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.concurrency import run_in_threadpool
+from .dynamodb_service import DynamoDBService
+from .image_sweeper import IMAGE_SWEEP_CLAIM_SECONDS, image_sweeper
+from .local_storage import LocalObjectStore, MEDIA_BASE_URL
+from ..utils.images import IMAGE_VARIANTS, render_image_variants
+import asyncio
+import base64
+import binascii
+import hashlib
+import tempfile
+import time
 import uuid
-import io
 
 # S3 configuration
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY")
 AWS_SECRET_KEY = os.getenv("AWS_SECRET_KEY")
 S3_BUCKET = os.getenv("S3_BUCKET", "food-stall-finder")
+# "s3", or "local" to keep objects on disk and serve them from /media
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
 
-class S3Service:
-    def __init__(self):
-        # Initialize S3 resource
-        if AWS_ACCESS_KEY and AWS_SECRET_KEY:
-            self.s3 = boto3.client(
+# Upload configuration
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# Files above the threshold are sent as a multipart upload in chunks of this size
+MULTIPART_THRESHOLD_BYTES = int(os.getenv("MULTIPART_THRESHOLD_BYTES", str(8 * 1024 * 1024)))
+MULTIPART_CHUNK_BYTES = int(os.getenv("MULTIPART_CHUNK_BYTES", str(8 * 1024 * 1024)))
+MULTIPART_MAX_CONCURRENCY = int(os.getenv("MULTIPART_MAX_CONCURRENCY", "4"))
+PRESIGNED_UPLOAD_EXPIRES_SECONDS = int(os.getenv("PRESIGNED_UPLOAD_EXPIRES_SECONDS", "900"))
+
+# Folders clients may upload into directly with a presigned POST
+DIRECT_UPLOAD_FOLDERS = ("food_stalls", "menu_items")
+
+# Image variant configuration
+IMAGE_VARIANT_FORMAT = os.getenv("IMAGE_VARIANT_FORMAT", "WEBP")
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_VARIANT_CONTENT_TYPES = {
+    "WEBP": "image/webp",
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+}
+
+# Extensions for content-addressed image keys
+IMAGE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+# Content-addressed objects never change, so clients may cache them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+HASH_CHUNK_BYTES = 1024 * 1024
+# Direct uploads fetched back for hashing or resizing spill to disk past this size
+DOWNLOAD_SPOOL_BYTES = 1024 * 1024
+DELETE_OBJECTS_MAX_KEYS = 1000
+# How often to check whether the sweeper has finished with an image being reused
+IMAGE_SWEEP_POLL_SECONDS = float(os.getenv("IMAGE_SWEEP_POLL_SECONDS", "0.1"))
+
+# Resizing runs on its own pool so it can't starve the default threadpool
+_image_executor = None
+
+def get_image_executor():
+    global _image_executor
+    if _image_executor is None:
+        _image_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="images")
+    return _image_executor
+
+class UploadTooLargeError(ValueError):
+    """Raised when an uploaded file exceeds MAX_UPLOAD_BYTES"""
+
+_s3_client = None
+
+def get_s3_client():
+    """Get the S3 client shared by every S3Service, creating it on first use"""
+    global _s3_client
+    if _s3_client is None:
+        if STORAGE_BACKEND == "local":
+            # Same client API, backed by the local filesystem
+            _s3_client = LocalObjectStore()
+        elif AWS_ACCESS_KEY and AWS_SECRET_KEY:
+            _s3_client = boto3.client(
                 's3',
                 region_name=AWS_REGION,
                 aws_access_key_id=AWS_ACCESS_KEY,
@@ -22,7 +91,37 @@ class S3Service:
             )
         else:
             # For local development with moto or when using IAM roles
-            self.s3 = boto3.client('s3', region_name=AWS_REGION)
+            _s3_client = boto3.client('s3', region_name=AWS_REGION)
+    return _s3_client
+
+class S3Service:
+    def __init__(self):
+        # The client is shared and created on first use, keeping cold starts cheap
+        self._s3 = None
+        if STORAGE_BACKEND == "local":
+            self.base_url = MEDIA_BASE_URL
+        else:
+            self.base_url = f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com"
+        
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD_BYTES,
+            multipart_chunksize=MULTIPART_CHUNK_BYTES,
+            max_concurrency=MULTIPART_MAX_CONCURRENCY
+        )
+        
+        # Reference counts of content-addressed images, shared by stalls and menu items
+        self.dynamodb = DynamoDBService()
+        self.refs_table_name = "ImageRefs"
+    
+    @property
+    def s3(self):
+        if self._s3 is None:
+            self._s3 = get_s3_client()
+        return self._s3
+    
+    @s3.setter
+    def s3(self, client):
+        self._s3 = client
     
     async def upload_file(self, file, folder, object_id=None):
         """Upload a file to S3 bucket and return the URL"""
@@ -37,23 +136,26 @@ class S3Service:
         key = f"{folder}/{object_id}.{ext}" if ext else f"{folder}/{object_id}"
         
         try:
-            # Read file content
-            contents = await file.read()
+            size = self._get_file_size(file.file)
+            if size > MAX_UPLOAD_BYTES:
+                raise UploadTooLargeError(
+                    f"File is {size} bytes; the maximum is {MAX_UPLOAD_BYTES} bytes"
+                )
             
-            # Upload to S3
-            self.s3.upload_fileobj(
-                io.BytesIO(contents),
+            # Stream from the spooled upload file in bounded chunks, off the event loop
+            await run_in_threadpool(
+                self.s3.upload_fileobj,
+                file.file,
                 S3_BUCKET,
                 key,
                 ExtraArgs={
                     'ContentType': file.content_type,
                     'ACL': 'public-read'  # Make the file publicly accessible
-                }
+                },
+                Config=self.transfer_config
             )
             
-            # Generate URL
-            url = f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{key}"
-            return url
+            return self.get_url(key)
         
         except ClientError as e:
             print(f"Error uploading file to S3: {e}")
@@ -62,11 +164,503 @@ class S3Service:
             # Reset file cursor
             await file.seek(0)
     
+    async def upload_image(self, file, folder):
+        """
+        Upload an image and its resized variants under a content-addressed key
+        
+        The key is {folder}/{sha256 of the bytes}, so an image that is uploaded
+        again or reused across items is stored once, and the upload is skipped
+        when it already exists. Returns image_url and image_variants.
+        """
+        prepared = await self.prepare_image(file, folder)
+        try:
+            await self.store_image(prepared)
+        except Exception:
+            await self.release_image(prepared["image_url"])
+            raise
+        finally:
+            await file.seek(0)
+        return {"image_url": prepared["image_url"], "image_variants": prepared["image_variants"]}
+    
+    async def prepare_image(self, file, folder):
+        """
+        Hash an uploaded image, take a reference to it and render its variants
+        
+        Nothing is written to S3 yet, but image_url and image_variants are
+        final, so the metadata write can run alongside store_image.
+        """
+        size = self._get_file_size(file.file)
+        if size > MAX_UPLOAD_BYTES:
+            raise UploadTooLargeError(
+                f"File is {size} bytes; the maximum is {MAX_UPLOAD_BYTES} bytes"
+            )
+        
+        digest = await run_in_threadpool(self._hash_file, file.file)
+        return await self._prepare_image(file.file, folder, digest, file.content_type)
+    
+    async def _prepare_image(self, fileobj, folder, digest, content_type, copy_source=None):
+        key = self._content_key(folder, digest, content_type)
+        prepared = {
+            "key": key,
+            "fileobj": fileobj,
+            "content_type": content_type,
+            "copy_source": copy_source,
+            "rendered": None,
+            "image_url": self.get_url(key),
+            "image_variants": {}
+        }
+        
+        # Taken before looking for the object, so the sweeper can't delete it from under us
+        refs = await self.acquire_image(key)
+        try:
+            if refs > 1:
+                head = await self._head_object(key)
+                if head is not None:
+                    # Already stored, along with its variants
+                    variant_names = head.get("Metadata", {}).get("variants", "")
+                    prepared["image_variants"] = {
+                        name: self.get_url(self._variant_key(key, name))
+                        for name in variant_names.split(",") if name
+                    }
+                    return prepared
+            
+            if fileobj is None:
+                # A direct upload S3 already hashed; fetch it now that its variants are needed
+                fileobj = await run_in_threadpool(self._download_original, copy_source)
+                try:
+                    prepared["rendered"] = await self._render_variants(fileobj, key)
+                finally:
+                    fileobj.close()
+            else:
+                prepared["rendered"] = await self._render_variants(fileobj, key)
+            prepared["image_variants"] = {
+                name: self.get_url(self._variant_key(key, name)) for name in prepared["rendered"]
+            }
+            return prepared
+        except Exception:
+            await self.release_image(prepared["image_url"])
+            raise
+    
+    async def store_image(self, prepared):
+        """Write a prepared image and its variants to S3, unless it is already there"""
+        key = prepared["key"]
+        rendered = prepared["rendered"]
+        
+        try:
+            if rendered is not None:
+                # Variants go first so an existing original always has all of its variants
+                await self._put_variants(key, rendered)
+                extra_args = {
+                    'ContentType': prepared["content_type"],
+                    'CacheControl': IMMUTABLE_CACHE_CONTROL,
+                    'Metadata': {'variants': ",".join(rendered)},
+                    'ACL': 'public-read'
+                }
+                
+                if prepared["copy_source"]:
+                    # The bytes are already in the bucket; copy them server-side
+                    await run_in_threadpool(
+                        self.s3.copy_object,
+                        Bucket=S3_BUCKET,
+                        Key=key,
+                        CopySource={'Bucket': S3_BUCKET, 'Key': prepared["copy_source"]},
+                        MetadataDirective='REPLACE',
+                        **extra_args
+                    )
+                else:
+                    prepared["fileobj"].seek(0)
+                    await run_in_threadpool(
+                        self.s3.upload_fileobj,
+                        prepared["fileobj"],
+                        S3_BUCKET,
+                        key,
+                        ExtraArgs=extra_args,
+                        Config=self.transfer_config
+                    )
+        except ClientError as e:
+            print(f"Error uploading image to S3: {e}")
+            raise
+        
+        if prepared["copy_source"]:
+            # The staging object is no longer referenced by anything
+            try:
+                await run_in_threadpool(self.s3.delete_object, Bucket=S3_BUCKET, Key=prepared["copy_source"])
+            except ClientError as e:
+                print(f"Error deleting staged upload from S3: {e}")
+    
+    async def store_image_with(self, prepared, write, undo=None):
+        """
+        Store a prepared image while the write that references it runs
+        
+        If the write fails the image's reference is released. If the upload
+        fails, undo(result of the write) is awaited to stop the record from
+        pointing at the missing image, and the reference is released.
+        Returns the result of the write.
+        """
+        stored, written = await asyncio.gather(self.store_image(prepared), write, return_exceptions=True)
+        
+        if isinstance(written, BaseException):
+            await self.release_image(prepared["image_url"])
+            raise written
+        
+        if isinstance(stored, BaseException):
+            if undo is not None:
+                try:
+                    await undo(written)
+                except Exception as e:
+                    print(f"Error undoing write after failed image upload: {e}")
+            await self.release_image(prepared["image_url"])
+            raise stored
+        
+        return written
+    
+    async def acquire_image(self, key):
+        """
+        Count a new reference to an image; returns the reference count
+        
+        If the sweeper is deleting the image right now, waits for it to
+        finish, so the caller finds the objects gone and stores them again
+        instead of having its upload deleted.
+        """
+        refs = await self.dynamodb.update_item(
+            table_name=self.refs_table_name,
+            key={"key": key},
+            update_expression="ADD refs :one",
+            expression_attribute_values={":one": 1}
+        )
+        if refs.get("sweeping") is not None:
+            await self._wait_for_sweep(key)
+        return int(refs["refs"])
+    
+    async def _wait_for_sweep(self, key):
+        while True:
+            row = await self.dynamodb.get_item(self.refs_table_name, {"key": key})
+            claimed_at = (row or {}).get("sweeping")
+            # A claim this old belongs to a sweeper that died before finishing
+            if claimed_at is None or int(claimed_at) < time.time() - IMAGE_SWEEP_CLAIM_SECONDS:
+                return
+            await asyncio.sleep(IMAGE_SWEEP_POLL_SECONDS)
+    
+    async def release_image(self, url):
+        """Drop a reference to an image; unreferenced images are deleted later by the sweeper"""
+        if not url:
+            return
+        try:
+            key = self.get_key(url)
+        except IndexError:
+            # Not one of ours
+            return
+        
+        released_at = int(time.time())
+        try:
+            refs = await self.dynamodb.update_item(
+                table_name=self.refs_table_name,
+                key={"key": key},
+                update_expression="ADD refs :minus_one SET released_at = :released_at",
+                expression_attribute_values={":minus_one": -1, ":released_at": released_at}
+            )
+        except ClientError:
+            # Keeping an unused image is better than failing the request
+            return
+        if int(refs["refs"]) <= 0:
+            image_sweeper.schedule(key, released_at)
+    
+    async def claim_unreferenced_image(self, key, released_before):
+        """
+        Mark an image as being swept if it is still unreferenced
+        
+        Returns the claim to pass to finish_sweep or abandon_sweep, or None
+        if the image is referenced again or another sweeper holds it. The
+        row stays in place until the objects are gone, so an upload of the
+        same image meanwhile can see the sweep and wait for it.
+        """
+        claimed_at = int(time.time())
+        try:
+            await self.dynamodb.update_item(
+                table_name=self.refs_table_name,
+                key={"key": key},
+                update_expression="SET sweeping = :claimed_at",
+                expression_attribute_values={
+                    ":zero": 0,
+                    ":released_before": int(released_before),
+                    ":claimed_at": claimed_at,
+                    ":stale": claimed_at - IMAGE_SWEEP_CLAIM_SECONDS
+                },
+                ConditionExpression=(
+                    "refs <= :zero AND released_at <= :released_before"
+                    " AND (attribute_not_exists(sweeping) OR sweeping < :stale)"
+                )
+            )
+            return claimed_at
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return None
+            raise
+    
+    async def finish_sweep(self, key, claimed_at):
+        """Remove a swept image's reference row, or just the claim if it was referenced again meanwhile"""
+        try:
+            await self.dynamodb.delete_item(
+                self.refs_table_name,
+                {"key": key},
+                ConditionExpression="refs <= :zero AND sweeping = :claimed_at",
+                ExpressionAttributeValues={":zero": 0, ":claimed_at": claimed_at}
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            await self.abandon_sweep(key, claimed_at)
+    
+    async def abandon_sweep(self, key, claimed_at):
+        """Drop a claim without removing the row, e.g. when deleting the objects failed"""
+        try:
+            await self.dynamodb.update_item(
+                table_name=self.refs_table_name,
+                key={"key": key},
+                update_expression="REMOVE sweeping",
+                expression_attribute_values={":claimed_at": claimed_at},
+                ConditionExpression="sweeping = :claimed_at"
+            )
+        except ClientError as e:
+            # Someone else's claim now, or the row is gone
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+    
+    async def get_unreferenced_images(self):
+        """Get (key, released_at) of every image without references"""
+        items = await self.dynamodb.scan_all(
+            self.refs_table_name,
+            FilterExpression="refs <= :zero",
+            ExpressionAttributeValues={":zero": 0}
+        )
+        return [(item["key"], int(item.get("released_at", 0))) for item in items]
+    
+    async def delete_images(self, keys):
+        """
+        Delete images and their variants with as few DeleteObjects calls as possible
+        
+        Originals go first and an image's variants are only deleted once its
+        original is gone, so an original that is still there always has all
+        of its variants. Returns the keys whose original couldn't be deleted.
+        """
+        failed = set(await self._delete_objects(keys))
+        variant_keys = [
+            self._variant_key(key, name)
+            for key in keys if key not in failed
+            for name in IMAGE_VARIANTS
+        ]
+        await self._delete_objects(variant_keys)
+        return [key for key in keys if key in failed]
+    
+    async def _delete_objects(self, object_keys):
+        failed = []
+        for start in range(0, len(object_keys), DELETE_OBJECTS_MAX_KEYS):
+            batch = object_keys[start:start + DELETE_OBJECTS_MAX_KEYS]
+            response = await run_in_threadpool(
+                self.s3.delete_objects,
+                Bucket=S3_BUCKET,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+            for error in response.get("Errors", []):
+                print(f"Error deleting {error.get('Key')} from S3: {error.get('Message')}")
+                failed.append(error.get("Key"))
+        return failed
+    
+    def _content_key(self, folder, digest, content_type):
+        ext = IMAGE_EXTENSIONS.get(content_type)
+        return f"{folder}/{digest}.{ext}" if ext else f"{folder}/{digest}"
+    
+    def _variant_key(self, key, variant):
+        base = key.rsplit('.', 1)[0] if '.' in key.rsplit('/', 1)[-1] else key
+        return f"{base}_{variant}.{IMAGE_VARIANT_FORMAT.lower()}"
+    
+    def _hash_file(self, fileobj):
+        """Get the sha256 hex digest of a seekable file and rewind it"""
+        fileobj.seek(0)
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: fileobj.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+        fileobj.seek(0)
+        return digest.hexdigest()
+    
+    async def _head_object(self, key, checksum=False):
+        """Get an object's metadata (with its checksum if asked), or None if it does not exist"""
+        params = {"ChecksumMode": "ENABLED"} if checksum else {}
+        try:
+            return await run_in_threadpool(self.s3.head_object, Bucket=S3_BUCKET, Key=key, **params)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            print(f"Error checking file in S3: {e}")
+            raise
+    
+    async def _render_variants(self, fileobj, key):
+        """
+        Render the IMAGE_VARIANTS sizes of an image on the image worker pool
+        
+        Returns a dict of variant name -> encoded bytes, which is empty if the
+        file could not be read as an image.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                get_image_executor(),
+                render_image_variants,
+                fileobj,
+                IMAGE_VARIANTS,
+                IMAGE_VARIANT_FORMAT,
+                IMAGE_VARIANT_QUALITY
+            )
+        except ValueError as e:
+            print(f"Skipping image variants for {key}: {e}")
+            return {}
+    
+    async def _put_variants(self, key, rendered):
+        """Store rendered variants next to the original as {key without extension}_{variant}.{format}"""
+        content_type = IMAGE_VARIANT_CONTENT_TYPES.get(IMAGE_VARIANT_FORMAT, "application/octet-stream")
+        await asyncio.gather(*(
+            run_in_threadpool(
+                self.s3.put_object,
+                Bucket=S3_BUCKET,
+                Key=self._variant_key(key, name),
+                Body=data,
+                ContentType=content_type,
+                CacheControl=IMMUTABLE_CACHE_CONTROL,
+                ACL='public-read'
+            )
+            for name, data in rendered.items()
+        ))
+    
+    def get_key(self, url):
+        """Get the object key from a URL returned by get_url"""
+        return url.split(f"{self.base_url}/", 1)[1]
+    
+    def get_url(self, key):
+        """Get the public URL of an object"""
+        return f"{self.base_url}/{key}"
+    
+    def _direct_upload_prefix(self, folder, owner_id):
+        return f"{folder}/uploads/{owner_id}/"
+    
+    async def create_presigned_upload(self, folder, owner_id, filename, content_type):
+        """
+        Create a presigned POST that lets a client upload an image straight to S3
+        
+        The object key is scoped to the owner under {folder}/uploads/ and the
+        policy pins the content type and caps the size at MAX_UPLOAD_BYTES.
+        Clients should also send the file's base64 SHA-256 as
+        x-amz-checksum-sha256: S3 verifies it, and finalizing then needs
+        no download unless the image is new.
+        """
+        if folder not in DIRECT_UPLOAD_FOLDERS:
+            raise ValueError(f"Uploads are not allowed into '{folder}'")
+        if not content_type or not content_type.startswith("image/"):
+            raise ValueError("Only image uploads are allowed")
+        
+        ext = filename.split('.')[-1].lower() if filename and '.' in filename else ''
+        object_id = str(uuid.uuid4())
+        key = self._direct_upload_prefix(folder, owner_id) + (f"{object_id}.{ext}" if ext else object_id)
+        
+        try:
+            presigned = await run_in_threadpool(
+                self.s3.generate_presigned_post,
+                S3_BUCKET,
+                key,
+                Fields={
+                    'Content-Type': content_type,
+                    'acl': 'public-read'
+                },
+                Conditions=[
+                    {'Content-Type': content_type},
+                    {'acl': 'public-read'},
+                    ['content-length-range', 1, MAX_UPLOAD_BYTES],
+                    ['starts-with', '$x-amz-checksum-sha256', '']
+                ],
+                ExpiresIn=PRESIGNED_UPLOAD_EXPIRES_SECONDS
+            )
+        except ClientError as e:
+            print(f"Error creating presigned upload: {e}")
+            raise
+        
+        return {
+            "key": key,
+            "url": presigned["url"],
+            "fields": presigned["fields"],
+            "expires_in": PRESIGNED_UPLOAD_EXPIRES_SECONDS
+        }
+    
+    async def finalize_direct_upload(self, key, folder, owner_id):
+        """
+        Check that a directly uploaded object exists and belongs to the owner,
+        and prepare it to be moved to its content-addressed key
+        
+        Returns a prepared image for store_image, like prepare_image; raises
+        ValueError if the key is not one the owner could have been issued, or
+        the upload never completed.
+        """
+        if not key or not key.startswith(self._direct_upload_prefix(folder, owner_id)) or ".." in key:
+            raise ValueError("Invalid upload key")
+        
+        head = await self._head_object(key, checksum=True)
+        if head is None:
+            raise ValueError("Upload not found; upload the file before finalizing")
+        
+        content_type = head.get("ContentType", "")
+        if not content_type.startswith("image/"):
+            raise ValueError("Uploaded file is not an image")
+        size = int(head.get("ContentLength", 0))
+        if size > MAX_UPLOAD_BYTES:
+            raise UploadTooLargeError(
+                f"File is {size} bytes; the maximum is {MAX_UPLOAD_BYTES} bytes"
+            )
+        
+        digest = self._checksum_digest(head.get("ChecksumSHA256"))
+        if digest is not None:
+            # The original is only fetched if its variants have to be rendered
+            return await self._prepare_image(None, folder, digest, content_type, copy_source=key)
+        
+        # No checksum from the client: stream the original to a temporary file to hash it
+        original = await run_in_threadpool(self._download_original, key)
+        try:
+            digest = await run_in_threadpool(self._hash_file, original)
+            return await self._prepare_image(original, folder, digest, content_type, copy_source=key)
+        finally:
+            original.close()
+    
+    def _checksum_digest(self, checksum):
+        """Turn S3's base64 ChecksumSHA256 into a hex digest, or None if it isn't one for the whole object"""
+        if not checksum or "-" in checksum:
+            # Missing, or a composite checksum of multipart upload parts
+            return None
+        try:
+            raw = base64.b64decode(checksum, validate=True)
+        except (binascii.Error, ValueError):
+            return None
+        return raw.hex() if len(raw) == hashlib.sha256().digest_size else None
+    
+    def _download_original(self, key):
+        """Stream an object into a temporary file, rewound"""
+        fileobj = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_BYTES)
+        try:
+            self.s3.download_fileobj(S3_BUCKET, key, fileobj, Config=self.transfer_config)
+        except Exception:
+            fileobj.close()
+            raise
+        fileobj.seek(0)
+        return fileobj
+    
+    def _get_file_size(self, fileobj):
+        """Get the size of a seekable file and rewind it"""
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell()
+        fileobj.seek(0)
+        return size
+    
     async def delete_file(self, url):
         """Delete a file from S3 bucket by URL"""
         try:
             # Extract key from URL
-            key = url.split(f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/")[1]
+            key = self.get_key(url)
             
             # Delete from S3
             self.s3.delete_object(
@@ -0,0 +1,126 @@
+from .dynamodb_service import DynamoDBService
+from ..models.records import FoodStallRecord, MenuItemRecord
+from ..utils.search_index import InvertedIndex
+import asyncio
+import os
+import time
+
+# Rebuild the index from DynamoDB after this many seconds, so writes made by
+# other processes (e.g. other Lambda instances) eventually become searchable
+SEARCH_INDEX_TTL_SECONDS = int(os.getenv("SEARCH_INDEX_TTL_SECONDS", "300"))
+
+FOOD_STALL = "food_stall"
+MENU_ITEM = "menu_item"
+
+# Names weigh more than categories, which weigh more than free-text descriptions
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "category": 2.0,
+    "description": 1.0,
+}
+
+# The index is shared by every SearchService instance in the process
+_index = InvertedIndex(field_weights=FIELD_WEIGHTS)
+_stall_menu_items = {}  # food_stall_id -> set of menu item ids
+_state = {"loaded_at": None}
+_load_lock = asyncio.Lock()
+
+
+class SearchService:
+    def __init__(self):
+        self.dynamodb = DynamoDBService()
+        self.index = _index
+
+    async def search(self, query, limit=20, doc_type=None):
+        """Search food stalls and menu items, best matches first"""
+        await self.ensure_loaded()
+
+        doc_filter = None
+        if doc_type:
+            doc_filter = lambda doc_key, payload: doc_key[0] == doc_type
+
+        results = []
+        for score, doc_key, payload in self.index.search(query, limit=limit, doc_filter=doc_filter):
+            result = dict(payload)
+            result["score"] = round(score, 4)
+            results.append(result)
+        return results
+
+    async def ensure_loaded(self):
+        """Build the index from DynamoDB if it is missing or stale"""
+        if not self._is_stale():
+            return
+
+        async with _load_lock:
+            # Another request may have rebuilt the index while we waited
+            if not self._is_stale():
+                return
+
+            food_stalls = await self.dynamodb.scan_records("FoodStalls", FoodStallRecord)
+            menu_items = await self.dynamodb.scan_records("MenuItems", MenuItemRecord)
+
+            self.index.clear()
+            _stall_menu_items.clear()
+            for stall in food_stalls:
+                self.index_food_stall(stall)
+            for item in menu_items:
+                self.index_menu_item(item)
+
+            _state["loaded_at"] = time.monotonic()
+
+    def index_food_stall(self, stall):
+        """Add or refresh a food stall in the index"""
+        if not stall:
+            return
+
+        self.index.add(
+            (FOOD_STALL, stall["id"]),
+            {
+                "name": stall.get("name"),
+                "description": stall.get("description"),
+            },
+            payload={
+                "type": FOOD_STALL,
+                "id": stall["id"],
+                "food_stall_id": stall["id"],
+                "name": stall.get("name", ""),
+            }
+        )
+
+    def remove_food_stall(self, stall_id):
+        """Remove a food stall and its menu items from the index"""
+        self.index.remove((FOOD_STALL, stall_id))
+        for item_id in _stall_menu_items.pop(stall_id, set()):
+            self.index.remove((MENU_ITEM, item_id))
+
+    def index_menu_item(self, item):
+        """Add or refresh a menu item in the index"""
+        if not item:
+            return
+
+        self.index.add(
+            (MENU_ITEM, item["id"]),
+            {
+                "name": item.get("name"),
+                "description": item.get("description"),
+                "category": item.get("category"),
+            },
+            payload={
+                "type": MENU_ITEM,
+                "id": item["id"],
+                "food_stall_id": item.get("food_stall_id", ""),
+                "name": item.get("name", ""),
+            }
+        )
+        _stall_menu_items.setdefault(item.get("food_stall_id"), set()).add(item["id"])
+
+    def remove_menu_item(self, item_id):
+        """Remove a menu item from the index"""
+        payload = self.index.get_payload((MENU_ITEM, item_id))
+        self.index.remove((MENU_ITEM, item_id))
+        if payload:
+            _stall_menu_items.get(payload["food_stall_id"], set()).discard(item_id)
+
+    def _is_stale(self):
+        loaded_at = _state["loaded_at"]
+        return loaded_at is None or time.monotonic() - loaded_at > SEARCH_INDEX_TTL_SECONDS
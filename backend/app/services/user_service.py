@@ -1,10 +1,8 @@
 from .dynamodb_service import DynamoDBService
+from .principal_cache import principal_cache, token_version_cache
+from .password_service import password_hasher
 import uuid
 import os
-from passlib.context import CryptContext
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class UserService:
     def __init__(self):
@@ -38,7 +36,7 @@ class UserService:
         user_id = self.dynamodb.generate_id()
         
         # Hash the password
-        hashed_password = pwd_context.hash(password)
+        hashed_password = await password_hasher.hash(password)
         
         # Create user item
         user = {
@@ -47,6 +45,8 @@ class UserService:
             "password": hashed_password,
             "name": name,
             "user_type": user_type,
+            "token_version": 0,
+            "revoked_version": 0,
             "created_at": self.dynamodb.get_timestamp(),
             "updated_at": self.dynamodb.get_timestamp()
         }
@@ -56,10 +56,55 @@ class UserService:
         
         return user_id
     
+    async def get_token_versions(self, user_id):
+        """Get a user's (token_version, revoked_version), or None if the user doesn't exist"""
+        user = await self.dynamodb.get_item(
+            self.table_name,
+            {"id": user_id},
+            ProjectionExpression="token_version, revoked_version"
+        )
+        if user is None:
+            return None
+        return int(user.get("token_version", 0)), int(user.get("revoked_version", 0))
+    
+    async def revoke_tokens(self, user_id):
+        """Invalidate every access and refresh token issued to a user"""
+        updated_user = await self.dynamodb.update_item(
+            table_name=self.table_name,
+            key={"id": user_id},
+            update_expression=(
+                "SET token_version = if_not_exists(token_version, :zero) + :one, "
+                "revoked_version = if_not_exists(token_version, :zero) + :one, "
+                "updated_at = :updated_at"
+            ),
+            expression_attribute_values={
+                ":zero": 0,
+                ":one": 1,
+                ":updated_at": self.dynamodb.get_timestamp()
+            },
+            ConditionExpression="attribute_exists(id)"
+        )
+        self._forget_cached_tokens(updated_user)
+        return updated_user
+    
     async def update_user(self, user_id, name=None, email=None, password=None):
-        """Update user information"""
+        """
+        Update user information
+        
+        Changing anything bumps token_version, so tokens carrying the old
+        profile stop being accepted in stateless mode; a password change
+        also revokes every outstanding token. Returns the current user
+        unchanged if nothing was given.
+        """
+        if not (name or email or password):
+            return await self.get_user_by_id(user_id)
+        
         update_expression_parts = []
-        expression_attribute_values = {":updated_at": self.dynamodb.get_timestamp()}
+        expression_attribute_values = {
+            ":updated_at": self.dynamodb.get_timestamp(),
+            ":zero": 0,
+            ":one": 1
+        }
         
         if name:
             update_expression_parts.append("name = :name")
@@ -70,18 +115,35 @@ class UserService:
             expression_attribute_values[":email"] = email
         
         if password:
-            hashed_password = pwd_context.hash(password)
+            hashed_password = await password_hasher.hash(password)
             update_expression_parts.append("password = :password")
             expression_attribute_values[":password"] = hashed_password
+            # A password change also revokes outstanding refresh tokens
+            update_expression_parts.append("revoked_version = if_not_exists(token_version, :zero) + :one")
+        
+        # Tokens carrying the old profile claims stop being accepted
+        update_expression_parts.append("token_version = if_not_exists(token_version, :zero) + :one")
         
         # Add the updated_at timestamp
         update_expression_parts.append("updated_at = :updated_at")
         
         update_expression = "SET " + ", ".join(update_expression_parts)
         
-        return await self.dynamodb.update_item(
+        updated_user = await self.dynamodb.update_item(
             table_name=self.table_name,
             key={"id": user_id},
             update_expression=update_expression,
             expression_attribute_values=expression_attribute_values
+        )
+        
+        self._forget_cached_tokens(updated_user)
+        
+        return updated_user
+    
+    def _forget_cached_tokens(self, user):
+        """Drop cached principals and record the user's new token versions"""
+        principal_cache.invalidate_user(user["id"])
+        token_version_cache.set(
+            user["id"],
+            (int(user.get("token_version", 0)), int(user.get("revoked_version", 0)))
         )
\ No newline at end of file
@@ -0,0 +1,186 @@
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from .ttl_cache import TTLCache
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    # Brotli is optional; without it clients get gzip
+    brotli = None
+
+# Response compression configuration
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))  # smaller bodies aren't worth it
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+COMPRESSION_CACHE_MAX_SIZE = int(os.getenv("COMPRESSION_CACHE_MAX_SIZE", "512"))
+COMPRESSION_CACHE_TTL_SECONDS = float(os.getenv("COMPRESSION_CACHE_TTL_SECONDS", "300"))
+# Bodies at least this large are compressed off the event loop
+COMPRESSION_THREAD_MIN_BYTES = int(os.getenv("COMPRESSION_THREAD_MIN_BYTES", "262144"))
+COMPRESSIBLE_TYPES = ("application/json",)
+
+
+def negotiate_encoding(accept_encoding, available):
+    """
+    Pick the content coding to use from an Accept-Encoding header
+
+    The highest q-value wins; ties go to the earlier coding in `available`.
+    Returns None if the client accepts none of them.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class ResponseCompressor:
+    """
+    Compresses response bodies
+
+    Responses with an ETag are cached per (URL, ETag, coding), so a hot
+    payload such as a full stall list is compressed once per version
+    rather than on every request.
+    """
+
+    def __init__(self, gzip_level=COMPRESSION_GZIP_LEVEL, brotli_quality=COMPRESSION_BROTLI_QUALITY,
+                 max_size=COMPRESSION_CACHE_MAX_SIZE, ttl=COMPRESSION_CACHE_TTL_SECONDS,
+                 thread_min_bytes=COMPRESSION_THREAD_MIN_BYTES):
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_min_bytes = thread_min_bytes
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def encodings(self):
+        """Supported content codings, most preferred first"""
+        return ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def _compress(self, body, coding):
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        # mtime=0 keeps the output identical for identical bodies
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def compress(self, body, coding, cache_key=None):
+        """Compress a body with `coding`, reusing the cached result for cache_key if there is one"""
+        if cache_key is not None:
+            cached = self.cache.get((cache_key, coding))
+            if cached is not None:
+                return cached
+
+        if len(body) >= self.thread_min_bytes:
+            compressed = await run_in_threadpool(self._compress, body, coding)
+        else:
+            compressed = self._compress(body, coding)
+
+        self.compressed += 1
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+        if cache_key is not None:
+            self.cache.set((cache_key, coding), compressed)
+        return compressed
+
+    def stats(self):
+        """Get compression counters and the compressed-body cache's stats"""
+        return {
+            "encodings": list(self.encodings),
+            "compressed": self.compressed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else 0.0,
+            "cache": self.cache.stats(),
+        }
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON responses of at least COMPRESSION_MIN_BYTES with
+    Brotli or gzip, whichever the client prefers
+
+    Only complete bodies are compressed; streamed responses pass through.
+    """
+
+    def __init__(self, app, compressor=None, min_bytes=COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.compressor = compressor or response_compressor
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        coding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"), self.compressor.encodings)
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Hold the headers until the body shows whether to compress
+                start = message
+                return
+
+            passthrough = True
+            if message["type"] != "http.response.body":
+                await send(start)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            compressible = (
+                headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                and "content-encoding" not in headers
+                and start["status"] not in (204, 304)
+            )
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+
+            body = message.get("body", b"")
+            if not compressible or coding is None or message.get("more_body") or len(body) < self.min_bytes:
+                await send(start)
+                await send(message)
+                return
+
+            cache_key = None
+            etag = headers.get("etag")
+            if etag:
+                query = scope.get("query_string", b"").decode("latin-1")
+                cache_key = (scope["path"], query, etag)
+
+            body = await self.compressor.compress(body, coding, cache_key)
+            headers["Content-Encoding"] = coding
+            headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+# Shared by every request in the process
+response_compressor = ResponseCompressor()
@@ -0,0 +1,155 @@
+from collections.abc import Mapping
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+from typing import Union, get_args, get_origin
+
+
+def json_default(value):
+    """Encode the non-JSON types found in DynamoDB items (Decimals, sets) and timestamps"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, Mapping):
+        # Records from DynamoDBService.get_record and friends
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def plain_value(value):
+    """Convert the Decimals in a DynamoDB value (at any depth) to ints and floats"""
+    value_type = type(value)
+    if value_type is Decimal:
+        return int(value) if value == value.to_integral_value() else float(value)
+    if value_type is dict:
+        return {key: plain_value(item) for key, item in value.items()}
+    if value_type in (list, set, frozenset):
+        return [plain_value(item) for item in value]
+    if isinstance(value, Mapping):
+        return {key: plain_value(item) for key, item in value.items()}
+    return value
+
+
+def dumps(content):
+    """
+    Encode plain content as compact UTF-8 JSON bytes with pydantic's native encoder
+
+    Decimals would be encoded as strings, so convert them first (shape_like
+    and plain_value do).
+    """
+    return to_json(content, inf_nan_mode="null")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded natively, for content prepared by shape_like"""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def _nested_model(annotation):
+    """Get (model, is_list) for a field typed Model, Optional[Model] or List[Model]"""
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return None, False
+        annotation = args[0]
+
+    many = get_origin(annotation) in (list, tuple)
+    if many:
+        annotation = get_args(annotation)[0]
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, many
+    return None, False
+
+
+_MISSING = object()
+_SCALARS = frozenset((str, int, float, bool))
+
+
+def parse_fields(fields, model):
+    """
+    Parse a sparse fieldset such as "id,name,location" into a tuple of field names
+
+    Returns None if no fields were asked for. Raises ValueError for names
+    `model` doesn't declare.
+    """
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in model.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names or None
+
+
+# Fieldsets are chosen by clients, so keep only the most recently used shapes
+SHAPE_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=SHAPE_CACHE_SIZE)
+def _shape(model, fields=None):
+    """Get the (name, nested, many, has_default, default) of each field, in model order"""
+    shape = []
+    for name, field in model.model_fields.items():
+        if fields is not None and name not in fields:
+            continue
+        nested, many = _nested_model(field.annotation)
+        if field.is_required():
+            has_default, default = False, None
+        else:
+            has_default, default = True, field.get_default(call_default_factory=True)
+        shape.append((name, nested, many, has_default, default))
+    return tuple(shape)
+
+
+def shape_like(model, data, fields=None):
+    """
+    Trim data to the fields a response model declares, filling in defaults
+    and converting Decimals to numbers
+
+    Does what response_model filtering does, without validating anything:
+    items were validated when they were written. `fields` (from
+    parse_fields) narrows the top-level fields further.
+    """
+    if data is None:
+        return None
+    if fields is not None and type(fields) is not frozenset:
+        # Output follows the model's field order, so "a,b" and "b,a" share a shape
+        fields = frozenset(fields)
+    if isinstance(data, list):
+        return [shape_like(model, item, fields) for item in data]
+
+    shaped = {}
+    for name, nested, many, has_default, default in _shape(model, fields):
+        value = data.get(name, _MISSING)
+        if value is not _MISSING:
+            if value is None or type(value) in _SCALARS:
+                pass
+            elif nested is not None:
+                value = [shape_like(nested, item) for item in value] if many else shape_like(nested, value)
+            else:
+                value = plain_value(value)
+            shaped[name] = value
+        elif has_default:
+            # Copy mutable defaults so responses never share them
+            shaped[name] = default.copy() if isinstance(default, (dict, list)) else default
+    return shaped
+
+
+def model_response(model, data, response=None, fields=None):
+    """
+    Respond with data shaped like `model` (limited to `fields`, if given),
+    skipping response_model validation
+
+    Headers already set on the route's injected `response` are carried over.
+    """
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(shape_like(model, data, fields), headers=headers)
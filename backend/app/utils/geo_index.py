@@ -0,0 +1,142 @@
+import math
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+def cell_for(latitude, longitude, cell_size):
+    """Get the grid cell (row, column) containing a point"""
+    return (
+        math.floor(float(latitude) / cell_size),
+        math.floor(float(longitude) / cell_size),
+    )
+
+
+def quantize_point(latitude, longitude, precision):
+    """
+    Round a point to `precision` decimal places (3 is about 110 m)
+
+    Searches from almost the same spot then share one cache key.
+    """
+    return round(float(latitude), precision), round(float(longitude), precision)
+
+
+def circle_bounds(latitude, longitude, radius):
+    """
+    Get the (south, west, north, east) bounding box of a circle
+
+    The radius is in kilometers.
+    """
+    latitude = float(latitude)
+    longitude = float(longitude)
+    lat_delta = radius / KM_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    lng_delta = min(radius / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+    return latitude - lat_delta, longitude - lng_delta, latitude + lat_delta, longitude + lng_delta
+
+
+def cell_range(south, west, north, east, cell_size):
+    """Get the (min_row, min_col, max_row, max_col) of the cells intersecting a bounding box"""
+    min_row, min_col = cell_for(south, west, cell_size)
+    max_row, max_col = cell_for(north, east, cell_size)
+    return min_row, min_col, max_row, max_col
+
+
+def count_cells_in_bounds(south, west, north, east, cell_size):
+    """Count the grid cells intersecting a bounding box without listing them"""
+    min_row, min_col, max_row, max_col = cell_range(south, west, north, east, cell_size)
+    return max(max_row - min_row + 1, 0) * max(max_col - min_col + 1, 0)
+
+
+def cells_covering(latitude, longitude, radius, cell_size, max_cells=None):
+    """
+    Get every grid cell intersecting the bounding box of a circle
+
+    The radius is in kilometers and the cell size in degrees.
+    """
+    return cells_in_bounds(*circle_bounds(latitude, longitude, radius), cell_size, max_cells=max_cells)
+
+
+def cells_in_bounds(south, west, north, east, cell_size, max_cells=None):
+    """
+    Get every grid cell intersecting a lat/lng bounding box
+
+    Raises ValueError, before listing anything, if there are more than
+    max_cells of them.
+    """
+    if max_cells is not None and count_cells_in_bounds(south, west, north, east, cell_size) > max_cells:
+        raise ValueError(f"Area covers more than {max_cells} cells")
+    min_row, min_col, max_row, max_col = cell_range(south, west, north, east, cell_size)
+
+    return [
+        (row, col)
+        for row in range(min_row, max_row + 1)
+        for col in range(min_col, max_col + 1)
+    ]
+
+
+class GeoCellIndex:
+    """Grid of fixed-size lat/lng cells mapping each cell to the ids inside it"""
+
+    def __init__(self, cell_size=0.02):
+        self.cell_size = cell_size
+        self.cells = {}  # (row, col) -> set of ids
+        self.positions = {}  # id -> (latitude, longitude, cell)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def clear(self):
+        """Remove every entry from the index"""
+        self.cells.clear()
+        self.positions.clear()
+
+    def add(self, key, latitude, longitude):
+        """Add or move an entry"""
+        self.remove(key)
+        latitude = float(latitude)
+        longitude = float(longitude)
+        cell = cell_for(latitude, longitude, self.cell_size)
+        self.cells.setdefault(cell, set()).add(key)
+        self.positions[key] = (latitude, longitude, cell)
+
+    def remove(self, key):
+        """Remove an entry if present"""
+        position = self.positions.pop(key, None)
+        if position is None:
+            return False
+
+        members = self.cells.get(position[2])
+        if members is not None:
+            members.discard(key)
+            if not members:
+                del self.cells[position[2]]
+        return True
+
+    def get_position(self, key):
+        """Get the (latitude, longitude) of an entry"""
+        position = self.positions.get(key)
+        return position[:2] if position else None
+
+    def covering_cells(self, latitude, longitude, radius):
+        """Get the non-empty cells intersecting a circle"""
+        bounds = circle_bounds(latitude, longitude, radius)
+        # A huge radius covers far more cells than are populated; don't list them
+        if count_cells_in_bounds(*bounds, self.cell_size) > len(self.cells):
+            min_row, min_col, max_row, max_col = cell_range(*bounds, self.cell_size)
+            return [
+                cell for cell in self.cells
+                if min_row <= cell[0] <= max_row and min_col <= cell[1] <= max_col
+            ]
+        return [cell for cell in cells_in_bounds(*bounds, self.cell_size) if cell in self.cells]
+
+    def estimate(self, latitude, longitude, radius):
+        """Count the entries in the cells intersecting a circle"""
+        return sum(
+            len(self.cells[cell])
+            for cell in self.covering_cells(latitude, longitude, radius)
+        )
+
+    def candidates(self, latitude, longitude, radius):
+        """Lazily yield the ids in the cells intersecting a circle"""
+        for cell in self.covering_cells(latitude, longitude, radius):
+            yield from list(self.cells.get(cell, ()))
@@ -0,0 +1,58 @@
+from fastapi import Response, status
+import hashlib
+import os
+
+# Responses depend on the caller's token, so only the client may cache them,
+# and it must revalidate (cheaply, with If-None-Match) before reusing them
+HTTP_CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "private, no-cache")
+
+
+def weak_etag(*parts):
+    """Build a weak ETag from the values that identify a representation's version"""
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def collection_etag(items, *parts):
+    """
+    Build a weak ETag for a list of entities
+
+    Uses the newest updated_at plus the ids in order, so edits, additions,
+    removals and reordering all change it.
+    """
+    latest = max((item.get("updated_at") or "" for item in items), default="")
+    ids = hashlib.blake2b("\0".join(str(item.get("id")) for item in items).encode("utf-8"), digest_size=12)
+    return weak_etag(*parts, len(items), latest, ids.hexdigest())
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header against an ETag using weak comparison"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified_response(request, response, etag, cache_control=HTTP_CACHE_CONTROL):
+    """
+    Set ETag and Cache-Control on a response, and get a 304 response if the
+    client's copy is still current (None otherwise)
+
+    Return the 304 straight from the route so the body is never serialized.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,51 @@
+import io
+import os
+
+# Variant name -> longest edge in pixels
+IMAGE_VARIANTS = {
+    "thumb": 160,  # list and map markers
+    "detail": 640,  # stall and menu item detail screens
+    "full": 1600,  # full-screen viewer
+}
+# Larger images are refused before they are decoded (a 10 MB PNG can decode to gigabytes)
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))
+
+
+def render_image_variants(fileobj, variants=IMAGE_VARIANTS, image_format="WEBP", quality=80,
+                          max_pixels=IMAGE_MAX_PIXELS):
+    """
+    Resize an image to each variant size and encode it
+
+    Images are never upscaled and EXIF orientation is applied. Returns a dict
+    of variant name -> encoded bytes. Raises ValueError if the file is not a
+    readable image or has more than max_pixels pixels. Blocking and
+    CPU-heavy; run it on a worker pool.
+    """
+    # Imported here so the API starts without paying for Pillow
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    fileobj.seek(0)
+    try:
+        with Image.open(fileobj) as original:
+            # Only the header has been read so far
+            width, height = original.size
+            if width * height > max_pixels:
+                raise ValueError(f"Image is {width}x{height}; the maximum is {max_pixels} pixels")
+            original = ImageOps.exif_transpose(original)
+            mode = "RGBA" if original.mode in ("RGBA", "LA", "P") else "RGB"
+            original = original.convert(mode)
+
+            rendered = {}
+            for name, max_edge in variants.items():
+                image = original.copy()
+                image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+                output = io.BytesIO()
+                image.save(output, format=image_format, quality=quality, method=4)
+                rendered[name] = output.getvalue()
+            return rendered
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"Image is too large: {e}")
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"Not a readable image: {e}")
+    finally:
+        fileobj.seek(0)
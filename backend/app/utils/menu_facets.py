@@ -0,0 +1,25 @@
+import statistics
+
+
+def compute_menu_facets(items):
+    """
+    Summarize a menu for list views
+
+    Returns the item count, the number of items per category and the
+    minimum, maximum and median price (None for an empty menu).
+    """
+    categories = {}
+    prices = []
+    for item in items:
+        category = item.get("category") or "Other"
+        categories[category] = categories.get(category, 0) + 1
+        if item.get("price") is not None:
+            prices.append(float(item["price"]))
+
+    return {
+        "item_count": len(items),
+        "categories": dict(sorted(categories.items())),
+        "min_price": min(prices) if prices else None,
+        "max_price": max(prices) if prices else None,
+        "median_price": statistics.median(prices) if prices else None,
+    }
@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+import math
+import mimetypes
+import posixpath
+
+MENU_IMPORT_COLUMNS = ("name", "price", "description", "category", "image")
+MENU_IMPORT_IMAGE_TYPES = ("image/jpeg", "image/png", "image/webp", "image/gif")
+
+
+def parse_menu_manifest(data, filename=None, content_type=None):
+    """
+    Parse a menu import manifest into a list of row dicts
+
+    CSV needs a header row naming the MENU_IMPORT_COLUMNS; JSON is a list
+    of objects with the same keys (or {"items": [...]}). Raises ValueError
+    if the manifest can't be read.
+    """
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("Manifest must be UTF-8")
+
+    is_json = (
+        (content_type or "").startswith("application/json")
+        or (filename or "").lower().endswith(".json")
+        or text.lstrip().startswith(("[", "{"))
+    )
+    if is_json:
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON manifest: {e}")
+        if isinstance(rows, dict):
+            rows = rows.get("items")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("JSON manifest must be a list of menu items")
+        return rows
+
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [column for column in MENU_IMPORT_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV manifest is missing columns: {', '.join(missing)}")
+    return [row for row in reader if any((value or "").strip() for value in row.values() if isinstance(value, str))]
+
+
+def validate_menu_rows(rows, image_sizes, max_image_bytes):
+    """
+    Check every manifest row before anything is written
+
+    image_sizes maps the image names in the archive to their uncompressed
+    sizes. Returns (cleaned rows, errors), where errors are
+    {"row": n, "error": message} with rows numbered from 1.
+    """
+    cleaned = []
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        problems = []
+        name = str(row.get("name") or "").strip()
+        category = str(row.get("category") or "").strip()
+        description = str(row.get("description") or "").strip()
+        image = posixpath.normpath(str(row.get("image") or "").strip().lstrip("/"))
+
+        if not name:
+            problems.append("name is required")
+        if not category:
+            problems.append("category is required")
+
+        try:
+            price = float(row.get("price"))
+        except (TypeError, ValueError):
+            price = None
+        if price is None or not math.isfinite(price) or price <= 0:
+            problems.append("price must be a positive number")
+
+        if image in ("", "."):
+            problems.append("image is required")
+        elif image not in image_sizes:
+            problems.append(f"image {image!r} is not in the archive")
+        elif mimetypes.guess_type(image)[0] not in MENU_IMPORT_IMAGE_TYPES:
+            problems.append(f"image {image!r} is not a JPEG, PNG, WebP or GIF")
+        elif image_sizes[image] > max_image_bytes:
+            problems.append(f"image {image!r} is larger than {max_image_bytes} bytes")
+
+        if problems:
+            errors.append({"row": number, "error": "; ".join(problems)})
+            continue
+
+        cleaned.append({
+            "row": number,
+            "name": name,
+            "price": price,
+            "description": description,
+            "category": category,
+            "image": image,
+            "content_type": mimetypes.guess_type(image)[0],
+        })
+    return cleaned, errors
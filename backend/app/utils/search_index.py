@@ -0,0 +1,185 @@
+import bisect
+import heapq
+import math
+import re
+import unicodedata
+
+# BM25 tuning parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Score multiplier for terms matched only by prefix (search-as-you-type)
+PREFIX_MATCH_WEIGHT = 0.8
+
+# Upper bound on how many vocabulary terms a single prefix may expand to
+MAX_PREFIX_EXPANSIONS = 50
+
+_WORD_RE = re.compile(r"[^\W_]+")
+_CJK_RE = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+
+
+def tokenize(text):
+    """
+    Split text into normalized search terms
+
+    Words are NFKC-normalized and case-folded. Runs of CJK characters are
+    split into overlapping bigrams, since they are not separated by spaces.
+    """
+    if not text:
+        return []
+
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        if _CJK_RE.search(word) and len(word) > 2:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index with BM25 ranking and prefix matching
+
+    Documents are made of weighted fields; a term's frequency in a document is
+    the sum of its occurrences in each field multiplied by the field weight.
+    """
+
+    def __init__(self, field_weights=None):
+        self.field_weights = field_weights or {}
+        self.postings = {}  # term -> {doc_key: weighted term frequency}
+        self.documents = {}  # doc_key -> (payload, terms)
+        self.doc_lengths = {}  # doc_key -> weighted document length
+        self.total_length = 0.0
+        self.vocabulary = []  # sorted list of terms, for prefix lookups
+
+    def __len__(self):
+        return len(self.documents)
+
+    def clear(self):
+        """Remove every document from the index"""
+        self.postings.clear()
+        self.documents.clear()
+        self.doc_lengths.clear()
+        self.total_length = 0.0
+        self.vocabulary = []
+
+    def add(self, doc_key, fields, payload=None):
+        """Add or replace a document made of {field_name: text} pairs"""
+        if doc_key in self.documents:
+            self.remove(doc_key)
+
+        frequencies = {}
+        length = 0.0
+        for field, text in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            for term in tokenize(text):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+                length += weight
+
+        for term, frequency in frequencies.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                bisect.insort(self.vocabulary, term)
+            posting[doc_key] = frequency
+
+        self.documents[doc_key] = (payload, tuple(frequencies))
+        self.doc_lengths[doc_key] = length
+        self.total_length += length
+
+    def remove(self, doc_key):
+        """Remove a document from the index if present"""
+        entry = self.documents.pop(doc_key, None)
+        if entry is None:
+            return False
+
+        _, terms = entry
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(doc_key, None)
+            if not posting:
+                del self.postings[term]
+                position = bisect.bisect_left(self.vocabulary, term)
+                if position < len(self.vocabulary) and self.vocabulary[position] == term:
+                    del self.vocabulary[position]
+
+        self.total_length -= self.doc_lengths.pop(doc_key, 0.0)
+        return True
+
+    def get_payload(self, doc_key):
+        """Get the payload stored with a document"""
+        entry = self.documents.get(doc_key)
+        return entry[0] if entry else None
+
+    def expand_prefix(self, prefix, limit=MAX_PREFIX_EXPANSIONS):
+        """Get vocabulary terms starting with the given prefix"""
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        terms = []
+        for term in self.vocabulary[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query, limit=20, prefix=True, doc_filter=None):
+        """
+        Search the index and return a list of (score, doc_key, payload)
+
+        Every query term must match (AND semantics). When prefix is True the
+        last query term also matches any term it is a prefix of, so partially
+        typed words still find results.
+        """
+        terms = tokenize(query)
+        if not terms or not self.documents:
+            return []
+
+        doc_count = len(self.documents)
+        avg_length = self.total_length / doc_count if doc_count else 0.0
+
+        scores = None
+        for position, term in enumerate(terms):
+            expansions = [(term, 1.0)]
+            if prefix and position == len(terms) - 1:
+                expansions.extend(
+                    (expanded, PREFIX_MATCH_WEIGHT)
+                    for expanded in self.expand_prefix(term)
+                    if expanded != term
+                )
+
+            term_scores = {}
+            for expanded, weight in expansions:
+                posting = self.postings.get(expanded)
+                if not posting:
+                    continue
+                idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_key, frequency in posting.items():
+                    if scores is not None and doc_key not in scores:
+                        continue
+                    length_norm = 1 - BM25_B + BM25_B * self.doc_lengths[doc_key] / (avg_length or 1.0)
+                    score = weight * idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+                    if score > term_scores.get(doc_key, 0.0):
+                        term_scores[doc_key] = score
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    doc_key: scores[doc_key] + score
+                    for doc_key, score in term_scores.items()
+                }
+            if not scores:
+                return []
+
+        if doc_filter is not None:
+            scores = {
+                doc_key: score
+                for doc_key, score in scores.items()
+                if doc_filter(doc_key, self.get_payload(doc_key))
+            }
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda entry: entry[1])
+        return [(score, doc_key, self.get_payload(doc_key)) for doc_key, score in best]
@@ -0,0 +1,62 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time
+
+    Callers asking for a key whose call is still running wait for that
+    call and share its result (or exception) instead of starting their own.
+    Nothing is kept once the call finishes, so results must be treated as
+    read-only by everyone who gets them.
+    """
+
+    def __init__(self):
+        self.inflight = {}  # key -> future of the running call
+        self.calls = 0
+        self.coalesced = 0
+
+    def __contains__(self, key):
+        return key in self.inflight
+
+    async def do(self, key, func):
+        """Get the result of func(), or of the call already running for key"""
+        inflight = self.inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.calls += 1
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            value = await func()
+            future.set_result(value)
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+        return value
+
+    def forget(self, key):
+        """Make later callers start a new call rather than join the running one, e.g. after a write"""
+        self.inflight.pop(key, None)
+
+    def forget_all(self):
+        """Forget every running call, e.g. after a write that affects them all"""
+        self.inflight.clear()
+
+    def stats(self):
+        """Get call and coalescing counters"""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "inflight": len(self.inflight),
+        }
@@ -0,0 +1,53 @@
+"""
+Measure Lambda cold starts: importing the handler, then its first response
+
+Every run is a fresh interpreter, like a new Lambda execution environment.
+Run from backend/: python -m benchmarks.cold_start [runs]
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, os, time
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+started = time.perf_counter()
+from app.lambda_handler import handler
+imported = time.perf_counter()
+event = {
+    "resource": "/health", "path": "/health", "httpMethod": "GET",
+    "headers": {"Host": "api.example.com"}, "multiValueHeaders": {},
+    "queryStringParameters": None, "multiValueQueryStringParameters": None,
+    "requestContext": {"resourcePath": "/health", "httpMethod": "GET", "path": "/prod/health",
+                       "stage": "prod", "identity": {"sourceIp": "127.0.0.1"}},
+    "body": None, "isBase64Encoded": False,
+}
+response = handler(event, None)
+responded = time.perf_counter()
+assert response["statusCode"] == 200, response
+from app.services.dynamodb_service import DynamoDBService
+DynamoDBService().get_table("FoodStalls")
+connected = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (responded - imported) * 1000,
+    "import_to_first_response_ms": (responded - started) * 1000,
+    "first_table_ms": (connected - responded) * 1000,
+}))
+"""
+
+
+def main(runs=7):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", CHILD], check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    for metric in samples[0]:
+        values = [sample[metric] for sample in samples]
+        print(f"{metric}: median {statistics.median(values):.0f} ms (min {min(values):.0f}, max {max(values):.0f})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 7)
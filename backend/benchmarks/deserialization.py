@@ -0,0 +1,49 @@
+"""
+Compare the resource API's item deserialization with DynamoDBService's
+low-level path into records
+
+Run from backend/: python -m benchmarks.deserialization
+"""
+import timeit
+import tracemalloc
+from boto3.dynamodb.types import TypeDeserializer
+from app.models.food_stall import FoodStall
+from app.models.records import FoodStallRecord
+from app.services.dynamodb_service import from_dynamodb_item, to_dynamodb_value
+from app.utils.fast_json import FastJSONResponse, shape_like
+from benchmarks.serialization import make_stall
+
+
+def resource_items(raw_items):
+    # What the resource API does to every item it returns
+    deserializer = TypeDeserializer()
+    return [{name: deserializer.deserialize(value) for name, value in item.items()} for item in raw_items]
+
+
+def record_items(raw_items):
+    return [from_dynamodb_item(item, FoodStallRecord) for item in raw_items]
+
+
+def allocated(load, raw_items):
+    tracemalloc.start()
+    items = load(raw_items)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return size
+
+
+def main(count=2000, number=10):
+    raw_items = [{name: to_dynamodb_value(value) for name, value in make_stall(i).items()} for i in range(count)]
+    for name, load in (("resource API (Decimals, dicts)", resource_items), ("low-level client (records)", record_items)):
+        load_time = min(timeit.repeat(lambda: load(raw_items), number=number, repeat=3)) / number
+        items = load(raw_items)
+        respond_time = min(timeit.repeat(
+            lambda: FastJSONResponse(shape_like(FoodStall, items)).body, number=number, repeat=3
+        )) / number
+        print(f"{name}: deserialize {load_time * 1000:.1f} ms, respond {respond_time * 1000:.1f} ms, "
+              f"{allocated(load, raw_items) / 1024 / 1024:.1f} MiB for {count} stalls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare response serialization through response_model with the fast path
+
+Run from backend/: python -m benchmarks.serialization
+"""
+from decimal import Decimal
+from typing import List
+import asyncio
+import timeit
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from app.models.food_stall import FoodStall
+from app.models.menu import MenuItem
+from app.models.review import Review
+from app.utils.fast_json import FastJSONResponse, shape_like
+
+
+def make_stall(i):
+    return {
+        "id": f"stall-{i}",
+        "owner_id": f"owner-{i % 50}",
+        "name": f"Stall {i}",
+        "description": "Noodles, dumplings and tea " * 3,
+        "location": {"latitude": Decimal("1.3521") + i, "longitude": Decimal("103.8198"), "address": f"{i} Market St"},
+        "image_url": f"https://cdn.example.com/food_stalls/{i:064x}.jpg",
+        "image_variants": {name: f"https://cdn.example.com/food_stalls/{i:064x}_{name}.webp" for name in ("thumb", "detail", "full")},
+        "created_at": "2024-05-01T12:00:00",
+        "updated_at": "2024-05-02T12:00:00",
+        "average_rating": Decimal("4.25"),
+        "review_count": Decimal(i % 100),
+        "menu_facets": {"item_count": Decimal(12), "categories": {"mains": Decimal(8), "drinks": Decimal(4)},
+                        "min_price": Decimal("2.5"), "max_price": Decimal("9.9"), "median_price": Decimal("5")},
+        "geocell": "w21z7",  # stored attributes the API doesn't return
+        "search_terms": ["noodles", "dumplings", "tea"],
+    }
+
+
+def make_item(i):
+    return {
+        "id": f"item-{i}",
+        "food_stall_id": "stall-1",
+        "name": f"Item {i}",
+        "price": Decimal("4.5") + i % 10,
+        "description": "Hand-pulled noodles in broth",
+        "category": ("mains", "sides", "drinks")[i % 3],
+        "image_url": f"https://cdn.example.com/menu_items/{i:064x}.jpg",
+        "image_variants": {},
+        "created_at": "2024-05-01T12:00:00",
+        "updated_at": "2024-05-02T12:00:00",
+    }
+
+
+def make_review(i):
+    return {
+        "id": f"review-{i}",
+        "food_stall_id": "stall-1",
+        "user_id": f"user-{i}",
+        "user_name": f"User {i}",
+        "rating": Decimal(1 + i % 5),
+        "comment": "Great food, friendly staff " * 4,
+        "created_at": "2024-05-01T12:00:00",
+        "updated_at": "2024-05-02T12:00:00",
+    }
+
+
+def response_model_body(field, data):
+    return asyncio.run(serialize_response(field=field, response_content=data, dump_json=True))
+
+
+def fast_path_body(model, data):
+    return FastJSONResponse(shape_like(model, data)).body
+
+
+def main(number=20):
+    cases = [
+        ("GET /foodstalls/ (2000 stalls)", FoodStall, [make_stall(i) for i in range(2000)]),
+        ("GET /menus/items/{id} (300 items)", MenuItem, [make_item(i) for i in range(300)]),
+        ("GET /reviews/{id} (1000 reviews)", Review, [make_review(i) for i in range(1000)]),
+    ]
+    for name, model, data in cases:
+        field = create_model_field("response", List[model], mode="serialization")
+        before = min(timeit.repeat(lambda: response_model_body(field, data), number=number, repeat=3)) / number
+        after = min(timeit.repeat(lambda: fast_path_body(model, data), number=number, repeat=3)) / number
+        print(f"{name}: response_model {before * 1000:.1f} ms, fast path {after * 1000:.1f} ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from app.utils.compression import CompressionMiddleware, ResponseCompressor, negotiate_encoding
+
+BODY = '{"items":[' + ",".join('{"name":"Noodles","price":4.5}' for _ in range(200)) + ']}'
+
+def make_client(compressor):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, compressor=compressor, min_bytes=1024)
+
+    @app.get("/big")
+    async def big():
+        return Response(BODY, media_type="application/json", headers={"ETag": 'W/"v1"'})
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/text")
+    async def text():
+        return Response("x" * 5000, media_type="text/plain")
+
+    return TestClient(app)
+
+def test_negotiation_uses_q_values_then_preference():
+    assert negotiate_encoding("gzip, br", ("br", "gzip")) == "br"
+    assert negotiate_encoding("br;q=0.5, gzip", ("br", "gzip")) == "gzip"
+    assert negotiate_encoding("*", ("gzip",)) == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity", ("gzip",)) is None
+    assert negotiate_encoding(None, ("gzip",)) is None
+
+def test_large_json_is_gzipped_and_cached_by_etag():
+    compressor = ResponseCompressor()
+    client = make_client(compressor)
+    for _ in range(3):
+        response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.text == BODY
+    assert int(response.headers["content-length"]) < len(BODY) // 5
+    # Compressed once, served from the cache afterwards
+    assert compressor.compressed == 1
+    assert compressor.cache.hits == 2
+
+def test_small_and_non_json_responses_are_left_alone():
+    client = make_client(ResponseCompressor())
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in client.get("/text", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+
+def test_brotli_is_preferred_when_installed():
+    pytest.importorskip("brotli")
+    compressor = ResponseCompressor()
+    response = make_client(compressor).get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    # httpx decodes Brotli itself when brotli is installed
+    assert response.text == BODY
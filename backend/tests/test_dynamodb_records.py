@@ -0,0 +1,118 @@
+import asyncio
+import json
+from app.models.food_stall import FoodStall
+from app.models.records import FoodStallRecord, ReviewRecord
+from app.services import dynamodb_service
+from app.services.dynamodb_service import DynamoDBService, from_dynamodb_item, to_dynamodb_value
+from app.utils.fast_json import json_default
+
+STALL = {
+    "id": {"S": "s1"},
+    "owner_id": {"S": "o1"},
+    "name": {"S": "Noodle Bar"},
+    "description": {"S": "Hand-pulled noodles"},
+    "location": {"M": {"latitude": {"N": "1.35"}, "longitude": {"N": "-103"}, "address": {"S": "1 Market St"}}},
+    "image_url": {"S": ""},
+    "created_at": {"S": "2025-01-01T00:00:00"},
+    "updated_at": {"S": "2025-01-02T00:00:00"},
+    "review_count": {"N": "12"},
+    "average_rating": {"N": "4.5"},
+    "geocell": {"S": "w21z7"},
+    "tags": {"SS": ["noodles"]},
+    "open": {"BOOL": True},
+    "closed_on": {"NULL": True},
+}
+
+class FakeClient:
+    """Low-level client double returning pages of a query"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def query(self, **params):
+        self.calls.append(params)
+        return self.pages[len(self.calls) - 1]
+
+    scan = query
+
+def test_numbers_are_ints_and_floats():
+    stall = from_dynamodb_item(STALL)
+    assert stall["review_count"] == 12 and type(stall["review_count"]) is int
+    assert stall["average_rating"] == 4.5
+    assert stall["location"] == {"latitude": 1.35, "longitude": -103, "address": "1 Market St"}
+    assert stall["tags"] == {"noodles"} and stall["open"] is True and stall["closed_on"] is None
+
+def test_values_round_trip_through_the_client_format():
+    value = {"price": 4.5, "count": 3, "tags": ["a", "b"], "nested": {"ok": True}}
+    assert dynamodb_service.from_dynamodb_value(to_dynamodb_value(value)) == value
+
+def test_records_behave_like_item_dicts():
+    stall = from_dynamodb_item(STALL, FoodStallRecord)
+    assert stall["name"] == "Noodle Bar" and stall.get("geocell") == "w21z7"
+    assert "menu_facets" not in stall and stall.get("menu_facets") is None
+    assert stall.extra == {"geocell": "w21z7", "tags": {"noodles"}, "open": True, "closed_on": None}
+    assert len(stall) == len(STALL)
+
+    stall["distance"] = 1.5
+    assert dict(stall)["distance"] == 1.5
+    assert FoodStall.model_validate(stall).review_count == 12
+    assert json.loads(json.dumps(stall, default=json_default))["location"]["latitude"] == 1.35
+
+def test_query_records_follows_every_page():
+    review = {"id": {"S": "r1"}, "food_stall_id": {"S": "s1"}, "rating": {"N": "5"}}
+    client = FakeClient([
+        {"Items": [review], "LastEvaluatedKey": {"id": {"S": "r1"}}},
+        {"Items": [dict(review, id={"S": "r2"})]},
+    ])
+    original, dynamodb_service._client = dynamodb_service._client, client
+    try:
+        reviews = asyncio.run(DynamoDBService().query_records(
+            table_name="Reviews",
+            record_type=ReviewRecord,
+            index_name="FoodStallIndex",
+            KeyConditionExpression="food_stall_id = :food_stall_id",
+            ExpressionAttributeValues={":food_stall_id": "s1"}
+        ))
+    finally:
+        dynamodb_service._client = original
+
+    assert [review["id"] for review in reviews] == ["r1", "r2"]
+    assert isinstance(reviews[0], ReviewRecord) and reviews[0]["rating"] == 5
+    assert client.calls[0]["ExpressionAttributeValues"] == {":food_stall_id": {"S": "s1"}}
+    assert client.calls[0]["IndexName"] == "FoodStallIndex"
+    assert client.calls[1]["ExclusiveStartKey"] == {"id": {"S": "r1"}}
+
+def test_services_share_one_lazily_created_resource():
+    original_resource, original_tables = dynamodb_service._resource, dynamodb_service._tables
+    dynamodb_service._resource, dynamodb_service._tables = None, {}
+    try:
+        first, second = DynamoDBService(), DynamoDBService()
+        assert dynamodb_service._resource is None
+
+        table = first.get_table("FoodStalls")
+        assert second.get_table("FoodStalls") is table
+        assert first.dynamodb is second.dynamodb is dynamodb_service._resource
+    finally:
+        dynamodb_service._resource, dynamodb_service._tables = original_resource, original_tables
+
+def test_projections_use_attribute_name_placeholders():
+    client = FakeClient([{"Items": [{"id": {"S": "s1"}, "name": {"S": "Noodle Bar"}}]}])
+    original, dynamodb_service._client = dynamodb_service._client, client
+    try:
+        stalls = asyncio.run(DynamoDBService().scan_records(
+            "FoodStalls",
+            FoodStallRecord,
+            projection=("id", "name"),
+            FilterExpression="#status = :open",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues={":open": "open"}
+        ))
+    finally:
+        dynamodb_service._client = original
+
+    assert dict(stalls[0]) == {"id": "s1", "name": "Noodle Bar"}
+    assert client.calls[0]["ProjectionExpression"] == "#projected0, #projected1"
+    assert client.calls[0]["ExpressionAttributeNames"] == {
+        "#status": "status", "#projected0": "id", "#projected1": "name"
+    }
@@ -0,0 +1,86 @@
+from decimal import Decimal
+from typing import List
+import json
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from app.models.food_stall import FoodStall
+from app.models.menu import MenuDocument
+import pytest
+from app.utils.fast_json import dumps, model_response, parse_fields, plain_value, shape_like
+
+STALL = {
+    "id": "s1",
+    "owner_id": "o1",
+    "name": "Noodle Bar",
+    "description": "Hand-pulled noodles",
+    "location": {"latitude": Decimal("1.35"), "longitude": Decimal("103"), "address": "1 Market St"},
+    "image_url": "https://cdn.example.com/s1.jpg",
+    "created_at": "2025-01-01T00:00:00",
+    "updated_at": "2025-01-02T00:00:00",
+    "average_rating": Decimal("4.5"),
+    "review_count": Decimal("12"),
+    "geocell": "w21z7",
+}
+
+def test_decimals_become_numbers():
+    assert plain_value({"a": [Decimal("2"), Decimal("2.5")], "b": "x"}) == {"a": [2, 2.5], "b": "x"}
+    assert json.loads(dumps(plain_value({"price": Decimal("4.10")}))) == {"price": 4.1}
+
+def test_shape_like_matches_response_model_output():
+    shaped = shape_like(FoodStall, STALL)
+    assert "geocell" not in shaped
+    assert shaped["image_variants"] == {}
+    assert shaped["menu_facets"] is None
+    assert shaped["review_count"] == 12 and type(shaped["review_count"]) is int
+    assert json.loads(dumps(shaped)) == FoodStall(**STALL).model_dump(mode="json")
+
+def test_shape_like_handles_nested_lists():
+    item = {"id": "i1", "food_stall_id": "s1", "name": "Noodles", "price": Decimal("5.5"),
+            "description": "", "category": "mains", "image_url": "", "position": Decimal("3")}
+    shaped = shape_like(MenuDocument, {"food_stall_id": "s1", "version": Decimal("7"), "updated_at": "", "items": [item]})
+    assert shaped["version"] == 7
+    assert shaped["items"] == [{"id": "i1", "food_stall_id": "s1", "name": "Noodles", "price": 5.5, "description": "",
+                                "category": "mains", "image_url": "", "image_variants": {}}]
+
+def test_defaults_are_not_shared_between_responses():
+    first, second = shape_like(FoodStall, [STALL, STALL])
+    first["image_variants"]["thumb"] = "x"
+    assert second["image_variants"] == {}
+
+def test_sparse_fieldsets_trim_to_the_requested_fields():
+    fields = parse_fields(" id,name, location,average_rating,name", FoodStall)
+    assert fields == ("id", "name", "location", "average_rating")
+    assert shape_like(FoodStall, [STALL], fields) == [{
+        "id": "s1",
+        "name": "Noodle Bar",
+        "location": {"latitude": 1.35, "longitude": 103, "address": "1 Market St"},
+        "average_rating": 4.5,
+    }]
+    assert parse_fields("", FoodStall) is None
+
+    with pytest.raises(ValueError, match="geocell"):
+        parse_fields("id,geocell", FoodStall)
+
+def test_model_response_keeps_route_headers():
+    app = FastAPI()
+
+    @app.get("/stalls", response_model=List[FoodStall])
+    async def get_stalls(response: Response):
+        response.headers["ETag"] = 'W/"1"'
+        return model_response(FoodStall, [STALL], response)
+
+    result = TestClient(app).get("/stalls")
+    assert result.status_code == 200
+    assert result.headers["etag"] == 'W/"1"'
+    assert result.json()[0]["location"] == {"latitude": 1.35, "longitude": 103, "address": "1 Market St"}
+
+def test_fieldsets_in_any_order_share_one_cached_shape():
+    from app.utils.fast_json import _shape
+    stall = {"id": "s1", "name": "Tacos", "average_rating": 4}
+    _shape.cache_clear()
+
+    first = shape_like(FoodStall, stall, parse_fields("name,id", FoodStall))
+    second = shape_like(FoodStall, stall, parse_fields("id,name", FoodStall))
+    assert list(first) == list(second)
+    assert set(first) == {"id", "name"}
+    assert _shape.cache_info().currsize == 1
@@ -0,0 +1,43 @@
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from app.utils.http_cache import collection_etag, etag_matches, not_modified_response, weak_etag
+
+def test_weak_etags_change_with_the_version():
+    assert weak_etag("stall", "a", "2025-01-01").startswith('W/"')
+    assert weak_etag("stall", "a", "2025-01-01") == weak_etag("stall", "a", "2025-01-01")
+    assert weak_etag("stall", "a", "2025-01-01") != weak_etag("stall", "a", "2025-01-02")
+
+def test_collection_etags_notice_removals():
+    items = [{"id": "a", "updated_at": "1"}, {"id": "b", "updated_at": "2"}]
+    assert collection_etag(items) != collection_etag(items[1:])
+    assert collection_etag(items) != collection_etag(list(reversed(items)))
+    assert collection_etag([]) == collection_etag([])
+
+def test_if_none_match_uses_weak_comparison():
+    etag = weak_etag("x")
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag[2:], etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+def test_unchanged_resources_get_304():
+    app = FastAPI()
+
+    @app.get("/thing")
+    async def get_thing(request: Request, response: Response):
+        not_modified = not_modified_response(request, response, weak_etag("thing", 1))
+        if not_modified:
+            return not_modified
+        return {"id": "thing"}
+
+    client = TestClient(app)
+    first = client.get("/thing")
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    second = client.get("/thing", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == first.headers["etag"]
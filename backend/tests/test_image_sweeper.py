@@ -0,0 +1,133 @@
+import asyncio
+from app.services.image_sweeper import ImageSweeper
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class FakeS3Service:
+    def __init__(self, referenced=(), undeletable=()):
+        self.referenced = set(referenced)
+        self.undeletable = set(undeletable)
+        self.deleted_batches = []
+        self.claims = {}
+        self.removed = []
+        self.scans = 0
+        self.unreferenced = []
+
+    async def claim_unreferenced_image(self, key, released_before):
+        if key in self.referenced or key in self.claims:
+            return None
+        self.claims[key] = 1
+        return 1
+
+    async def delete_images(self, keys):
+        self.deleted_batches.append(list(keys))
+        return [key for key in keys if key in self.undeletable]
+
+    async def finish_sweep(self, key, claimed_at):
+        del self.claims[key]
+        self.removed.append(key)
+
+    async def abandon_sweep(self, key, claimed_at):
+        del self.claims[key]
+
+    async def get_unreferenced_images(self):
+        self.scans += 1
+        return [(key, 0) for key in self.unreferenced]
+
+def make_sweeper(batch_size=2):
+    clock = FakeClock()
+    return ImageSweeper(grace_seconds=60, batch_size=batch_size, clock=clock), clock
+
+def test_images_are_kept_during_the_grace_period():
+    sweeper, clock = make_sweeper()
+    s3_service = FakeS3Service()
+    sweeper.schedule("menu_items/a.jpg")
+
+    clock.now += 30
+    assert asyncio.run(sweeper.sweep(s3_service)) == 0
+    assert s3_service.deleted_batches == []
+
+    clock.now += 31
+    assert asyncio.run(sweeper.sweep(s3_service)) == 1
+    assert s3_service.deleted_batches == [["menu_items/a.jpg"]]
+    assert sweeper.pending == {}
+
+def test_deletes_are_batched():
+    sweeper, clock = make_sweeper(batch_size=2)
+    s3_service = FakeS3Service()
+    for name in "abcde":
+        sweeper.schedule(f"menu_items/{name}.jpg")
+
+    clock.now += 61
+    assert asyncio.run(sweeper.sweep(s3_service)) == 5
+    assert [len(batch) for batch in s3_service.deleted_batches] == [2, 2, 1]
+
+def test_images_referenced_again_are_not_deleted():
+    sweeper, clock = make_sweeper()
+    s3_service = FakeS3Service(referenced={"menu_items/a.jpg"})
+    sweeper.schedule("menu_items/a.jpg")
+    sweeper.schedule("menu_items/b.jpg")
+
+    clock.now += 61
+    assert asyncio.run(sweeper.sweep(s3_service)) == 1
+    assert s3_service.deleted_batches == [["menu_items/b.jpg"]]
+    assert sweeper.stats()["kept"] == 1
+
+def test_reference_rows_are_removed_only_after_the_objects():
+    sweeper, clock = make_sweeper()
+    s3_service = FakeS3Service(undeletable={"menu_items/b.jpg"})
+    sweeper.schedule("menu_items/a.jpg")
+    sweeper.schedule("menu_items/b.jpg")
+
+    clock.now += 61
+    assert asyncio.run(sweeper.sweep(s3_service)) == 1
+    assert s3_service.removed == ["menu_items/a.jpg"]
+    # The failed image keeps its row, loses its claim and is tried again
+    assert s3_service.claims == {}
+    assert "menu_items/b.jpg" in sweeper.pending
+
+def test_failed_delete_keeps_every_row():
+    sweeper, clock = make_sweeper()
+    s3_service = FakeS3Service()
+
+    async def failing_delete(keys):
+        raise RuntimeError("S3 is down")
+    s3_service.delete_images = failing_delete
+    sweeper.schedule("menu_items/a.jpg")
+
+    clock.now += 61
+    assert asyncio.run(sweeper.sweep(s3_service)) == 0
+    assert s3_service.removed == []
+    assert s3_service.claims == {}
+    assert "menu_items/a.jpg" in sweeper.pending
+
+def test_first_full_scan_waits_for_the_scan_interval():
+    clock = FakeClock()
+    sweeper = ImageSweeper(grace_seconds=60, interval=0, scan_interval=3600, clock=clock)
+    s3_service = FakeS3Service()
+
+    async def run():
+        sweeper.start(s3_service)
+        await asyncio.sleep(0.01)
+        scans = s3_service.scans
+        clock.now += 3600
+        await asyncio.sleep(0.01)
+        await sweeper.stop()
+        return scans
+
+    assert asyncio.run(run()) == 0
+    assert s3_service.scans == 1
+
+def test_one_off_sweep_scans_then_deletes():
+    from app.cli.sweep_images import sweep_once
+    sweeper, clock = make_sweeper()
+    s3_service = FakeS3Service()
+    s3_service.unreferenced = ["menu_items/a.jpg"]
+
+    assert asyncio.run(sweep_once(s3_service, sweeper)) == 1
+    assert s3_service.removed == ["menu_items/a.jpg"]
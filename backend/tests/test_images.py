@@ -0,0 +1,38 @@
+import io
+import pytest
+from PIL import Image
+from app.utils.images import render_image_variants
+
+def _png(width, height):
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(output, format="PNG")
+    output.seek(0)
+    return output
+
+def test_variants_fit_their_longest_edge():
+    rendered = render_image_variants(_png(2000, 1000), {"thumb": 160, "detail": 640})
+    with Image.open(io.BytesIO(rendered["thumb"])) as thumb:
+        assert thumb.format == "WEBP"
+        assert thumb.size == (160, 80)
+    with Image.open(io.BytesIO(rendered["detail"])) as detail:
+        assert detail.size == (640, 320)
+
+def test_small_images_are_not_upscaled():
+    source = _png(100, 50)
+    rendered = render_image_variants(source, {"full": 1600})
+    with Image.open(io.BytesIO(rendered["full"])) as full:
+        assert full.size == (100, 50)
+    assert source.tell() == 0
+
+def test_unreadable_images_raise_value_error():
+    with pytest.raises(ValueError):
+        render_image_variants(io.BytesIO(b"not an image"))
+
+def test_images_over_the_pixel_cap_are_refused_before_decoding():
+    with pytest.raises(ValueError, match="maximum"):
+        render_image_variants(_png(200, 100), {"thumb": 160}, max_pixels=10_000)
+
+def test_decompression_bombs_raise_value_error(monkeypatch):
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    with pytest.raises(ValueError, match="too large"):
+        render_image_variants(_png(200, 100), {"thumb": 160})
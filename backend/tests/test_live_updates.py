@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers import live
+from app.services.live_updates import InMemoryBroker, LiveUpdates, RESYNC, CREATED, MOVED
+
+def make_stall(stall_id, latitude, longitude, **extra):
+    return dict({
+        "id": stall_id, "owner_id": "o1", "name": stall_id.title(), "description": "",
+        "location": {"latitude": latitude, "longitude": longitude, "address": ""},
+        "image_url": "", "created_at": "1", "updated_at": "1",
+    }, **extra)
+
+def drain(subscription):
+    messages = []
+    while not subscription.queue.empty():
+        messages.append(subscription.queue.get_nowait())
+    return messages
+
+def test_events_reach_only_subscribers_watching_the_area():
+    hub = LiveUpdates(InMemoryBroker(), cell_size=0.05)
+    shinjuku, shibuya = hub.subscribe(), hub.subscribe()
+    hub.watch_radius(shinjuku, 35.690, 139.700, 1)
+    hub.watch_bounds(shibuya, 35.650, 139.690, 35.665, 139.710)
+
+    asyncio.run(hub.publish(CREATED, make_stall("ramen", 35.691, 139.701)))
+
+    assert [message["stall"]["id"] for message in drain(shinjuku)] == ["ramen"]
+    assert drain(shibuya) == []
+
+def test_moves_reach_the_old_and_the_new_area():
+    hub = LiveUpdates(InMemoryBroker(), cell_size=0.05)
+    shinjuku, shibuya = hub.subscribe(), hub.subscribe()
+    hub.watch_radius(shinjuku, 35.690, 139.700, 1)
+    hub.watch_radius(shibuya, 35.658, 139.701, 1)
+
+    previous = make_stall("ramen", 35.691, 139.701)
+    asyncio.run(hub.publish(MOVED, make_stall("ramen", 35.659, 139.701), previous))
+
+    assert [message["type"] for message in drain(shinjuku)] == ["moved"]
+    assert [message["type"] for message in drain(shibuya)] == ["moved"]
+
+def test_slow_subscribers_get_one_resync_instead_of_a_backlog():
+    hub = LiveUpdates(InMemoryBroker(), cell_size=0.05, queue_size=3)
+    subscription = hub.subscribe()
+    hub.watch_radius(subscription, 35.690, 139.700, 1)
+
+    for rating in range(5):
+        asyncio.run(hub.publish(CREATED, make_stall("ramen", 35.691, 139.701, average_rating=rating)))
+
+    messages = drain(subscription)
+    assert messages[0] == RESYNC
+    assert [message["stall"]["average_rating"] for message in messages[1:]] == [4]
+    assert hub.stats()["overflows"] == 1
+
+def test_oversized_areas_are_refused_and_unsubscribing_clears_the_index():
+    hub = LiveUpdates(InMemoryBroker(), cell_size=0.05, max_cells=10)
+    subscription = hub.subscribe()
+    with pytest.raises(ValueError, match="too large"):
+        hub.watch_radius(subscription, 35.690, 139.700, 50)
+
+    hub.watch_radius(subscription, 35.690, 139.700, 1)
+    assert hub.cells
+    hub.unsubscribe(subscription)
+    assert hub.cells == {} and hub.subscriptions == {}
+
+def test_websocket_pushes_events_for_the_watched_area(monkeypatch):
+    hub = LiveUpdates(InMemoryBroker(), cell_size=0.05)
+    monkeypatch.setattr(live, "live_updates", hub)
+    app = FastAPI()
+    app.include_router(live.router, prefix="/live")
+    app.dependency_overrides[live.websocket_user] = lambda: {"id": "u1"}
+
+    with TestClient(app) as client, client.websocket_connect("/live/stalls") as websocket:
+        websocket.send_text('{"latitude": 35.69, "longitude": 139.70, "radius": 1}')
+        assert websocket.receive_json()["type"] == "subscribed"
+
+        websocket.send_text('{"latitude": 35.69}')
+        assert websocket.receive_json()["type"] == "error"
+
+        client.portal.call(hub.publish, CREATED, make_stall("ramen", 35.691, 139.701))
+        event = websocket.receive_json()
+        assert event["type"] == "created" and event["stall"]["id"] == "ramen"
+
+def test_huge_areas_are_refused_without_listing_their_cells(monkeypatch):
+    from app.utils import geo_index
+    listed = []
+    real = geo_index.cell_range
+    monkeypatch.setattr(geo_index, "cell_range", lambda *args: listed.append(args) or real(*args))
+
+    hub = LiveUpdates(InMemoryBroker(), cell_size=0.05, max_cells=400)
+    subscription = hub.subscribe()
+    with pytest.raises(ValueError, match="too large"):
+        hub.watch_bounds(subscription, -90, -180, 90, 180)
+    with pytest.raises(ValueError, match="too large"):
+        hub.watch_radius(subscription, 0, 0, 1_000_000)
+    # Only counted, once each
+    assert len(listed) == 2
+    assert geo_index.count_cells_in_bounds(-90, -180, 90, 180, 0.05) == 3601 * 7201
+
+def test_event_stream_radius_is_capped():
+    app = FastAPI()
+    app.include_router(live.router, prefix="/live")
+    app.dependency_overrides[live.get_current_user] = lambda: {"id": "u1"}
+
+    response = TestClient(app).get("/live/stalls/events?latitude=0&longitude=0&radius=1000000")
+    assert response.status_code == 422
+    with pytest.raises(ValueError):
+        live.LiveArea.model_validate({"latitude": 0, "longitude": 0, "radius": 1_000_000})
@@ -0,0 +1,71 @@
+import io
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers import media
+from app.services.local_storage import LocalObjectStore
+
+def test_objects_round_trip_with_metadata(tmp_path):
+    store = LocalObjectStore(root=str(tmp_path))
+    store.upload_fileobj(io.BytesIO(b"hello"), None, "menu_items/a.png",
+                         ExtraArgs={"ContentType": "image/png", "Metadata": {"variants": "thumb"}})
+
+    head = store.head_object(Bucket=None, Key="menu_items/a.png")
+    assert head["ContentType"] == "image/png"
+    assert head["Metadata"] == {"variants": "thumb"}
+    assert head["ContentLength"] == 5
+
+    store.copy_object(Bucket=None, Key="menu_items/b.png", CopySource={"Key": "menu_items/a.png"})
+    output = io.BytesIO()
+    store.download_fileobj(None, "menu_items/b.png", output)
+    assert output.getvalue() == b"hello"
+
+    store.delete_objects(Bucket=None, Delete={"Objects": [{"Key": "menu_items/a.png"}, {"Key": "menu_items/b.png"}]})
+    with pytest.raises(ClientError):
+        store.head_object(Bucket=None, Key="menu_items/a.png")
+    # No temporary files are left behind
+    assert not [p for p in tmp_path.rglob(".tmp-*")]
+
+def test_keys_cannot_escape_the_root(tmp_path):
+    store = LocalObjectStore(root=str(tmp_path))
+    for key in ("../secret", "a/../../b", "/etc/passwd", ".meta/a.png.json", ""):
+        with pytest.raises(ValueError):
+            store.path_for(key)
+
+def test_presigned_policies_are_verified(tmp_path):
+    store = LocalObjectStore(root=str(tmp_path), secret="test")
+    presigned = store.generate_presigned_post(
+        None, "menu_items/uploads/u1/x.png",
+        Fields={"Content-Type": "image/png"},
+        Conditions=[["content-length-range", 1, 100]],
+        ExpiresIn=60
+    )
+    fields = presigned["fields"]
+    policy = store.verify_presigned_post(fields["policy"], fields["signature"])
+    assert policy["key"] == "menu_items/uploads/u1/x.png"
+    assert policy["max_bytes"] == 100
+    with pytest.raises(ValueError):
+        store.verify_presigned_post(fields["policy"], "forged")
+
+def test_media_route_serves_ranges(tmp_path, monkeypatch):
+    store = LocalObjectStore(root=str(tmp_path))
+    store.put_object(Bucket=None, Key="food_stalls/a.png", Body=b"0123456789",
+                     ContentType="image/png", CacheControl="public, max-age=60")
+    monkeypatch.setattr(media.s3_service, "s3", store)
+
+    app = FastAPI()
+    app.include_router(media.router, prefix="/media")
+    client = TestClient(app)
+
+    response = client.get("/media/food_stalls/a.png")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["cache-control"] == "public, max-age=60"
+
+    response = client.get("/media/food_stalls/a.png", headers={"Range": "bytes=2-5"})
+    assert response.status_code == 206
+    assert response.content == b"2345"
+
+    assert client.get("/media/food_stalls/missing.png").status_code == 404
+    assert client.get("/media/.meta/food_stalls/a.png.json").status_code == 404
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from botocore.exceptions import ClientError
+from app.services import login_throttle as throttle_module
+from app.services.login_throttle import DynamoDBAttemptStore, InMemoryAttemptStore, LoginThrottle
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_throttle():
+    clock = FakeClock()
+    return LoginThrottle(store=InMemoryAttemptStore(), clock=clock), clock
+
+def fail(throttle, times, email="a@example.com", ip="10.0.0.1"):
+    for _ in range(times):
+        asyncio.run(throttle.record_failure(email, ip))
+
+def test_email_is_locked_after_too_many_failures():
+    throttle, clock = make_throttle()
+    fail(throttle, throttle_module.LOGIN_MAX_ATTEMPTS_PER_EMAIL - 1)
+    assert asyncio.run(throttle.check("a@example.com", "10.0.0.1")) == 0
+
+    fail(throttle, 1)
+    assert asyncio.run(throttle.check("A@example.com", "10.0.0.2")) == throttle_module.LOGIN_LOCKOUT_BASE_SECONDS
+
+    clock.now += throttle_module.LOGIN_LOCKOUT_BASE_SECONDS
+    assert asyncio.run(throttle.check("a@example.com", "10.0.0.1")) == 0
+
+def test_repeated_lockouts_grow_exponentially():
+    throttle, clock = make_throttle()
+    fail(throttle, throttle_module.LOGIN_MAX_ATTEMPTS_PER_EMAIL)
+    clock.now += throttle_module.LOGIN_LOCKOUT_BASE_SECONDS
+    fail(throttle, throttle_module.LOGIN_MAX_ATTEMPTS_PER_EMAIL)
+    assert asyncio.run(throttle.check("a@example.com")) == 2 * throttle_module.LOGIN_LOCKOUT_BASE_SECONDS
+
+def test_old_failures_slide_out_of_the_window():
+    throttle, clock = make_throttle()
+    fail(throttle, throttle_module.LOGIN_MAX_ATTEMPTS_PER_EMAIL - 1)
+    clock.now += throttle_module.LOGIN_WINDOW_SECONDS + 1
+    fail(throttle, 1)
+    assert asyncio.run(throttle.check("a@example.com")) == 0
+
+def test_success_clears_email_but_not_ip_failures():
+    throttle, _ = make_throttle()
+    for index in range(throttle_module.LOGIN_MAX_ATTEMPTS_PER_IP):
+        fail(throttle, 1, email=f"user{index}@example.com")
+        asyncio.run(throttle.record_success(f"user{index}@example.com", "10.0.0.1"))
+    assert asyncio.run(throttle.check("new@example.com", "10.0.0.1")) > 0
+    assert asyncio.run(throttle.check("new@example.com", "10.0.0.2")) == 0
+
+
+class FakeAttemptsTable:
+    """Applies each update atomically, but only after yielding like a network call"""
+
+    def __init__(self):
+        self.items = {}
+
+    async def get_item(self, table_name, key):
+        return self.items.get(key["key"])
+
+    async def update_item(self, table_name, key, update_expression, expression_attribute_values, ConditionExpression):
+        await asyncio.sleep(0)
+        values = expression_attribute_values
+        item = self.items.get(key["key"])
+        if ConditionExpression == "size(failures) = :seen":
+            allowed = item is not None and len(item["failures"]) == values[":seen"]
+        elif ConditionExpression == "expires_at <= :now":
+            allowed = item is not None and item["expires_at"] <= values[":now"]
+        else:
+            allowed = item is None or item["expires_at"] > values[":now"]
+        if not allowed:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+
+        item = dict(item or {"key": key["key"]})
+        if "list_append" in update_expression:
+            item["failures"] = item.get("failures", []) + values[":failure"]
+        elif ":failure" in values:
+            item.update(failures=values[":failure"], lockouts=0, locked_until=0)
+        else:
+            item.update(failures=values[":failures"], lockouts=values[":lockouts"], locked_until=values[":locked_until"])
+        item["expires_at"] = values[":expires_at"]
+        self.items[key["key"]] = item
+        return item
+
+def test_concurrent_failures_in_dynamodb_are_all_counted():
+    store = DynamoDBAttemptStore()
+    store.dynamodb = FakeAttemptsTable()
+    clock = FakeClock()
+    clock.now = time.time()
+    throttle = LoginThrottle(store=store, clock=clock)
+
+    async def fail_together():
+        await asyncio.gather(*(
+            throttle.record_failure("a@example.com", f"10.0.0.{index}")
+            for index in range(throttle_module.LOGIN_MAX_ATTEMPTS_PER_EMAIL)
+        ))
+
+    asyncio.run(fail_together())
+    assert throttle.lockouts == 1
+    assert asyncio.run(throttle.check("a@example.com")) == throttle_module.LOGIN_LOCKOUT_BASE_SECONDS
+
+def test_expired_dynamodb_attempts_start_over():
+    store = DynamoDBAttemptStore()
+    store.dynamodb = FakeAttemptsTable()
+    clock = FakeClock()
+    clock.now = time.time()
+    throttle = LoginThrottle(store=store, clock=clock)
+    store.dynamodb.items["email:a@example.com"] = {
+        "key": "email:a@example.com",
+        "failures": [clock.now - 1] * (throttle_module.LOGIN_MAX_ATTEMPTS_PER_EMAIL - 1),
+        "lockouts": 3,
+        "locked_until": 0,
+        "expires_at": int(clock.now) - 1,
+    }
+
+    asyncio.run(throttle.record_failure("a@example.com"))
+    assert asyncio.run(throttle.check("a@example.com")) == 0
+    assert store.dynamodb.items["email:a@example.com"]["lockouts"] == 0
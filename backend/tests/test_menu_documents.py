@@ -0,0 +1,84 @@
+import asyncio
+from botocore.exceptions import ClientError
+from app.services.menu_service import MenuService, encode_menu_items, decode_menu_items
+
+
+class RacingTables:
+    """MenuItems and MenuDocuments, where another writer wins every document write"""
+
+    def __init__(self):
+        self.items = {}
+        self.document = {"food_stall_id": "s1", "version": 1, "updated_at": "", "items": encode_menu_items([])}
+        self.ids = 0
+
+    def generate_id(self):
+        self.ids += 1
+        return f"item-{self.ids}"
+
+    def get_timestamp(self):
+        return "2024-01-01T00:00:00"
+
+    async def put_item(self, table_name, item, **kwargs):
+        if table_name == "MenuItems":
+            self.items[item["id"]] = item
+            return
+        if kwargs.get("ExpressionAttributeValues", {}).get(":expected_version") != self.document["version"] or self.racing:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem")
+        self.document = dict(item)
+
+    async def get_item(self, table_name, key, **kwargs):
+        return dict(self.document)
+
+    async def get_record(self, table_name, key, record_type=dict, projection=None, **kwargs):
+        return self.items.get(key["id"])
+
+    async def update_item(self, table_name, key, update_expression, expression_attribute_values, **kwargs):
+        assert update_expression == "ADD pending_ids :item_ids, version :one"
+        self.document["pending_ids"] = self.document.get("pending_ids", set()) | expression_attribute_values[":item_ids"]
+        self.document["version"] += 1
+        return dict(self.document)
+
+
+class FakeIndex:
+    def index_menu_item(self, item):
+        pass
+
+
+class FakeStalls:
+    def __init__(self):
+        self.facets = None
+
+    async def update_menu_facets(self, food_stall_id, facets):
+        self.facets = facets
+
+
+class FakeCache:
+    async def invalidate(self, key):
+        pass
+
+
+def make_service():
+    service = MenuService()
+    service.dynamodb = RacingTables()
+    service.search_service = FakeIndex()
+    service.query_service = FakeIndex()
+    service.foodstall_service = FakeStalls()
+    service.cache = FakeCache()
+    return service
+
+
+def test_items_whose_document_write_lost_every_race_still_appear():
+    service = make_service()
+    service.dynamodb.racing = True
+    item = asyncio.run(service.create_menu_item("s1", "Tea", 2, "Hot", "drinks", ""))
+
+    document = asyncio.run(service._read_menu_document("s1"))
+    assert [entry["id"] for entry in document["items"]] == [item["id"]]
+    assert service.foodstall_service.facets is not None
+
+    # The next write that goes through folds the pending item in for good
+    service.dynamodb.racing = False
+    asyncio.run(service.create_menu_item("s1", "Noodles", 4, "Hot", "mains", ""))
+    stored = service.dynamodb.document
+    assert "pending_ids" not in stored
+    assert {entry["name"] for entry in decode_menu_items(stored["items"])} == {"Tea", "Noodles"}
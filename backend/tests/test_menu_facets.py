@@ -0,0 +1,23 @@
+from decimal import Decimal
+from app.utils.menu_facets import compute_menu_facets
+
+def test_facets_summarize_categories_and_prices():
+    facets = compute_menu_facets([
+        {"category": "Ramen", "price": Decimal("900")},
+        {"category": "Ramen", "price": 1200.0},
+        {"category": "Drinks", "price": 300},
+        {"category": "Drinks", "price": 250},
+    ])
+    assert facets == {
+        "item_count": 4,
+        "categories": {"Drinks": 2, "Ramen": 2},
+        "min_price": 250.0,
+        "max_price": 1200.0,
+        "median_price": 600.0,
+    }
+
+def test_facets_of_an_empty_menu():
+    facets = compute_menu_facets([])
+    assert facets["item_count"] == 0
+    assert facets["categories"] == {}
+    assert facets["min_price"] is None and facets["median_price"] is None
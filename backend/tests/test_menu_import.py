@@ -0,0 +1,148 @@
+import io
+import zipfile
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers import menus
+from app.services.auth_service import get_current_user
+from app.services.menu_service import encode_menu_items
+from app.utils.menu_import import parse_menu_manifest, validate_menu_rows
+
+CSV = b"name,price,description,category,image\nNoodles,4.5,Hot,mains,a.png\n,,,,\nTea,2,,drinks,photos/b.jpg\n"
+
+def test_csv_and_json_manifests_parse_to_rows():
+    rows = parse_menu_manifest(CSV, "menu.csv", "text/csv")
+    assert [row["name"] for row in rows] == ["Noodles", "Tea"]
+
+    json_rows = parse_menu_manifest(b'{"items": [{"name": "Tea", "price": 2}]}', "menu.json")
+    assert json_rows == [{"name": "Tea", "price": 2}]
+
+def test_unreadable_manifests_are_rejected():
+    with pytest.raises(ValueError):
+        parse_menu_manifest(b"name,price\nTea,2\n", "menu.csv")
+    with pytest.raises(ValueError):
+        parse_menu_manifest(b'[{"name": "Tea",', "menu.json")
+    with pytest.raises(ValueError):
+        parse_menu_manifest(b'"just a string"', "menu.json")
+
+def test_rows_are_validated_up_front():
+    rows = parse_menu_manifest(CSV, "menu.csv") + [
+        {"name": "Free", "price": "0", "category": "mains", "image": "a.png"},
+        {"name": "Big", "price": "3", "category": "mains", "image": "big.png"},
+        {"name": "Doc", "price": "3", "category": "mains", "image": "menu.pdf"},
+    ]
+    sizes = {"a.png": 100, "photos/b.jpg": 200, "big.png": 10_000, "menu.pdf": 10}
+    cleaned, errors = validate_menu_rows(rows, sizes, max_image_bytes=1000)
+
+    assert [row["row"] for row in cleaned] == [1, 2]
+    assert cleaned[1]["content_type"] == "image/jpeg" and cleaned[1]["price"] == 2.0
+    assert [error["row"] for error in errors] == [3, 4, 5]
+    assert "price" in errors[0]["error"]
+    assert "larger" in errors[1]["error"]
+    assert "not a JPEG" in errors[2]["error"]
+
+def test_missing_images_are_reported_per_row():
+    _, errors = validate_menu_rows([{"name": "Tea", "price": 2, "category": "drinks", "image": "../x.png"}], {}, 1000)
+    assert errors == [{"row": 1, "error": "image '../x.png' is not in the archive"}]
+
+class FakeMenuTables:
+    """MenuItems and MenuDocuments, where the batch write fails after flushing every item"""
+
+    def __init__(self):
+        self.items = {}
+        self.ids = 0
+        self.fail_deletes = False
+
+    def generate_id(self):
+        self.ids += 1
+        return f"item-{self.ids}"
+
+    def get_timestamp(self):
+        return "2024-01-01T00:00:00"
+
+    async def batch_write_items(self, table_name, items):
+        for item in items:
+            self.items[item["id"]] = item
+        raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "BatchWriteItem")
+
+    async def batch_delete_items(self, table_name, keys):
+        if self.fail_deletes:
+            raise ClientError({"Error": {"Code": "500"}}, "BatchWriteItem")
+        for key in keys:
+            self.items.pop(key["id"], None)
+
+    async def get_item(self, table_name, key, **kwargs):
+        return {"food_stall_id": key["food_stall_id"], "version": 1, "updated_at": "", "items": encode_menu_items([])}
+
+
+class FakeIndex:
+    def index_menu_item(self, item):
+        pass
+
+    def remove_menu_item(self, item_id):
+        pass
+
+def make_import_client(monkeypatch):
+    tables = FakeMenuTables()
+    released = []
+
+    async def get_food_stall_by_id(stall_id):
+        return {"id": stall_id, "owner_id": "owner-1"}
+
+    async def upload_image(file, folder):
+        return {"image_url": menus.s3_service.get_url(f"{folder}/{file.filename}"), "image_variants": {}}
+
+    async def acquire_image(key):
+        return 2
+
+    async def release_image(url):
+        released.append(url)
+
+    monkeypatch.setattr(menus.foodstall_service, "get_food_stall_by_id", get_food_stall_by_id)
+    monkeypatch.setattr(menus.s3_service, "upload_image", upload_image)
+    monkeypatch.setattr(menus.s3_service, "acquire_image", acquire_image)
+    monkeypatch.setattr(menus.s3_service, "release_image", release_image)
+    monkeypatch.setattr(menus.menu_service, "dynamodb", tables)
+    monkeypatch.setattr(menus.menu_service, "search_service", FakeIndex())
+    monkeypatch.setattr(menus.menu_service, "query_service", FakeIndex())
+
+    app = FastAPI()
+    app.include_router(menus.router, prefix="/menus")
+    app.dependency_overrides[get_current_user] = lambda: {"id": "owner-1"}
+    return TestClient(app, raise_server_exceptions=False), tables, released
+
+def post_import(client):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.png", b"not really a png")
+        zf.writestr("photos/b.jpg", b"not really a jpeg")
+    return client.post("/menus/import/stall-1", files={
+        "manifest": ("menu.csv", CSV, "text/csv"),
+        "images": ("images.zip", archive.getvalue(), "application/zip"),
+    })
+
+def test_failed_import_deletes_written_items_before_releasing_images(monkeypatch):
+    client, tables, released = make_import_client(monkeypatch)
+
+    # Every item is flushed, then the batch write gives up
+    response = post_import(client)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 0 and body["failed"] == 2
+    assert [result["status"] for result in body["results"]] == ["failed", "failed"]
+    assert "retry" in body["results"][0]["error"]
+    assert tables.ids == 2
+    assert tables.items == {}
+    assert sorted(menus.s3_service.get_key(url) for url in released) == [
+        "menu_items/a.png",
+        "menu_items/photos/b.jpg",
+    ]
+
+def test_failed_import_keeps_images_of_items_it_could_not_delete(monkeypatch):
+    client, tables, released = make_import_client(monkeypatch)
+    tables.fail_deletes = True
+
+    assert post_import(client).status_code == 500
+    assert len(tables.items) == 2
+    assert released == []
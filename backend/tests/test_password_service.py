@@ -0,0 +1,42 @@
+import asyncio
+import time
+import pytest
+from app.services.password_service import PasswordHasher, PasswordPoolBusy
+
+def slow_upper(value):
+    time.sleep(0.05)
+    return value.upper()
+
+def test_pool_runs_work_off_the_event_loop():
+    hasher = PasswordHasher(max_workers=2, kind="thread", max_pending=10)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        results = await asyncio.gather(hasher._run(slow_upper, "a"), hasher._run(slow_upper, "b"), ticker())
+        return results[:2], ticks
+
+    results, ticks = asyncio.run(main())
+    assert results == ["A", "B"]
+    assert ticks == 5
+    assert hasher.stats()["completed"] == 2
+    assert hasher.stats()["pending"] == 0
+
+def test_pool_refuses_work_over_max_pending():
+    hasher = PasswordHasher(max_workers=1, kind="thread", max_pending=1)
+
+    async def main():
+        first = asyncio.ensure_future(hasher._run(slow_upper, "a"))
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordPoolBusy):
+            await hasher._run(slow_upper, "b")
+        return await first
+
+    assert asyncio.run(main()) == "A"
+    assert hasher.stats()["rejected"] == 1
@@ -0,0 +1,65 @@
+import asyncio
+from app.services.query_service import QueryService, StallCatalog, SPATIAL, CATEGORY, PRICE
+
+def make_service():
+    service = QueryService()
+    service.catalog = StallCatalog(cell_size=0.02)
+
+    async def loaded():
+        return None
+    service.ensure_loaded = loaded
+
+    stalls = [
+        ("shinjuku", 35.6900, 139.7000, 4.5),
+        ("shibuya", 35.6580, 139.7016, 3.0),
+        ("osaka", 34.6937, 135.5023, 4.8),
+    ]
+    for stall_id, lat, lng, rating in stalls:
+        service.index_food_stall({
+            "id": stall_id,
+            "name": stall_id.title(),
+            "location": {"latitude": lat, "longitude": lng},
+            "average_rating": rating,
+        })
+
+    items = [
+        ("s1", "shinjuku", "Ramen", 900),
+        ("s2", "shinjuku", "Drinks", 300),
+        ("b1", "shibuya", "Ramen", 1200),
+        ("o1", "osaka", "ramen", 800),
+    ]
+    for item_id, stall_id, category, price in items:
+        service.index_menu_item({"id": item_id, "food_stall_id": stall_id, "category": category, "price": price})
+    return service
+
+def query(service, **kwargs):
+    return asyncio.run(service.query_food_stalls(**kwargs))
+
+def test_category_and_price_must_match_the_same_item():
+    response = query(make_service(), category="ramen", max_price=1000)
+    assert sorted(stall["id"] for stall in response["results"]) == ["osaka", "shinjuku"]
+
+def test_location_results_are_sorted_by_distance():
+    response = query(make_service(), latitude=35.6895, longitude=139.6917, radius=10)
+    assert [stall["id"] for stall in response["results"]] == ["shinjuku", "shibuya"]
+    assert response["plan"]["index"] == SPATIAL
+
+def test_min_rating_filters_candidates():
+    response = query(make_service(), latitude=35.6895, longitude=139.6917, radius=10, min_rating=4)
+    assert [stall["id"] for stall in response["results"]] == ["shinjuku"]
+
+def test_planner_picks_the_smallest_candidate_set():
+    service = make_service()
+    assert service.plan(category="drinks")[0] == CATEGORY
+    assert service.plan(max_price=500, category="ramen")[0] == PRICE
+    assert service.plan(latitude=34.69, longitude=135.50, radius=1, category="ramen")[0] == SPATIAL
+
+def test_menu_changes_update_price_indexes():
+    service = make_service()
+    service.remove_menu_item("s1")
+    response = query(service, category="ramen", max_price=1000)
+    assert [stall["id"] for stall in response["results"]] == ["osaka"]
+
+    service.remove_food_stall("osaka")
+    assert query(service, category="ramen")["results"][0]["id"] == "shibuya"
+    assert service.catalog.count_at_most(1000) == 1
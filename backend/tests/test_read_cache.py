@@ -0,0 +1,115 @@
+import asyncio
+import sys
+import pytest
+from decimal import Decimal
+from app.services.read_cache import (
+    InMemoryCacheBackend,
+    InMemorySharedClient,
+    ReadThroughCache,
+    SharedCacheBackend,
+)
+
+class Loader:
+    def __init__(self, value, delay=0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+def make_cache(backend=None):
+    return ReadThroughCache("test", backend or InMemoryCacheBackend(max_size=100, ttl=60), ttl=60, negative_ttl=5)
+
+def test_reads_are_cached_until_invalidated():
+    cache = make_cache()
+    loader = Loader({"id": "a"})
+
+    async def scenario():
+        assert await cache.get("a", loader) == {"id": "a"}
+        assert await cache.get("a", loader) == {"id": "a"}
+        await cache.invalidate("a")
+        assert await cache.get("a", loader) == {"id": "a"}
+
+    asyncio.run(scenario())
+    assert loader.calls == 2
+    assert cache.stats()["hits"] == 1
+
+def test_misses_are_cached():
+    cache = make_cache()
+    loader = Loader(None)
+
+    async def scenario():
+        assert await cache.get("missing", loader) is None
+        assert await cache.get("missing", loader) is None
+
+    asyncio.run(scenario())
+    assert loader.calls == 1
+    assert cache.stats()["negative_hits"] == 1
+
+def test_concurrent_misses_load_once():
+    cache = make_cache()
+    loader = Loader({"id": "a"}, delay=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get("a", loader) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == [{"id": "a"}] * 10
+    assert loader.calls == 1
+    assert cache.stats()["coalesced"] == 9
+
+def test_loads_overtaken_by_a_write_are_not_cached():
+    cache = make_cache()
+    loader = Loader({"id": "a", "name": "old"}, delay=0.01)
+
+    async def scenario():
+        load = asyncio.ensure_future(cache.get("a", loader))
+        await asyncio.sleep(0)
+        await cache.invalidate("a")
+        await load
+        loader.value = {"id": "a", "name": "new"}
+        return await cache.get("a", loader)
+
+    assert asyncio.run(scenario())["name"] == "new"
+    assert loader.calls == 2
+
+def test_shared_backend_round_trips_dynamodb_values():
+    cache = make_cache(SharedCacheBackend(InMemorySharedClient()))
+    loader = Loader({"id": "a", "average_rating": Decimal("4.5"), "review_count": Decimal("2")})
+
+    async def scenario():
+        await cache.get("a", loader)
+        return await cache.get("a", loader)
+
+    assert asyncio.run(scenario()) == {"id": "a", "average_rating": 4.5, "review_count": 2}
+    assert loader.calls == 1
+
+def test_loads_overtaken_by_a_write_in_another_process_are_not_cached():
+    client = InMemorySharedClient()
+    process_a = make_cache(SharedCacheBackend(client))
+    process_b = make_cache(SharedCacheBackend(client))
+    loader = Loader({"id": "a", "name": "old"}, delay=0.01)
+
+    async def scenario():
+        load = asyncio.ensure_future(process_a.get("a", loader))
+        await asyncio.sleep(0)
+        # B writes the stall and invalidates while A's load is still running
+        await process_b.invalidate("a")
+        await load
+        loader.value = {"id": "a", "name": "new"}
+        return await process_b.get("a", loader)
+
+    assert asyncio.run(scenario())["name"] == "new"
+    assert process_a.backend.stats()["refused"] == 1
+
+def test_shared_cache_url_without_redis_fails_clearly(monkeypatch):
+    from app.services import read_cache
+    monkeypatch.setattr(read_cache, "READ_CACHE_BACKEND", "shared")
+    monkeypatch.setattr(read_cache, "READ_CACHE_URL", "redis://cache:6379/0")
+    monkeypatch.setitem(sys.modules, "redis", None)
+    monkeypatch.setitem(sys.modules, "redis.asyncio", None)
+
+    with pytest.raises(RuntimeError, match="redis package is not installed"):
+        read_cache.create_backend()
@@ -0,0 +1,235 @@
+import asyncio
+import base64
+import hashlib
+import io
+import time
+import pytest
+from botocore.exceptions import ClientError
+from PIL import Image
+from app.services import s3_service
+from app.services.image_sweeper import image_sweeper
+from app.services.s3_service import S3Service
+
+class FakeS3:
+    """Just enough of the S3 client for content-addressed uploads"""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = 0
+
+    def head_object(self, Bucket, Key, **kwargs):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return self.objects[Key]
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = {"ContentType": kwargs.get("ContentType"), "Metadata": {}}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        self.uploads += 1
+        self.objects[key] = {"ContentType": ExtraArgs["ContentType"], "Metadata": ExtraArgs["Metadata"]}
+
+class FakeRefs:
+    """Just enough of DynamoDBService for image reference counts"""
+
+    def __init__(self):
+        self.refs = {}
+
+    async def update_item(self, table_name, key, update_expression, expression_attribute_values, **kwargs):
+        delta = expression_attribute_values.get(":one", expression_attribute_values.get(":minus_one"))
+        self.refs[key["key"]] = self.refs.get(key["key"], 0) + delta
+        return {"key": key["key"], "refs": self.refs[key["key"]]}
+
+class Upload:
+    def __init__(self, data, content_type="image/png"):
+        self.file = io.BytesIO(data)
+        self.content_type = content_type
+
+    async def seek(self, offset):
+        self.file.seek(offset)
+
+def make_service():
+    service = S3Service()
+    service.s3 = FakeS3()
+    service.dynamodb = FakeRefs()
+    return service
+
+def png_bytes(color):
+    output = io.BytesIO()
+    Image.new("RGB", (320, 200), color).save(output, format="PNG")
+    return output.getvalue()
+
+def test_identical_images_are_stored_once():
+    service = make_service()
+    first = asyncio.run(service.upload_image(Upload(png_bytes((255, 0, 0))), "menu_items"))
+    second = asyncio.run(service.upload_image(Upload(png_bytes((255, 0, 0))), "menu_items"))
+
+    assert first == second
+    assert service.s3.uploads == 1
+    assert list(service.dynamodb.refs.values()) == [2]
+    assert set(first["image_variants"]) == {"thumb", "detail", "full"}
+    assert first["image_url"].endswith(".png")
+
+def test_different_images_get_different_keys():
+    service = make_service()
+    red = asyncio.run(service.upload_image(Upload(png_bytes((255, 0, 0))), "menu_items"))
+    blue = asyncio.run(service.upload_image(Upload(png_bytes((0, 0, 255))), "menu_items"))
+
+    assert red["image_url"] != blue["image_url"]
+    assert service.s3.uploads == 2
+
+def test_failed_write_releases_the_image():
+    service = make_service()
+    prepared = asyncio.run(service.prepare_image(Upload(png_bytes((0, 255, 0))), "food_stalls"))
+
+    async def failing_write():
+        raise RuntimeError("write failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.store_image_with(prepared, failing_write()))
+    assert service.dynamodb.refs[prepared["key"]] == 0
+    assert prepared["key"] in image_sweeper.pending
+
+def test_failed_upload_undoes_the_write():
+    service = make_service()
+    prepared = asyncio.run(service.prepare_image(Upload(png_bytes((0, 255, 0))), "food_stalls"))
+    undone = []
+
+    def failing_upload(*args, **kwargs):
+        raise ClientError({"Error": {"Code": "500"}}, "PutObject")
+    service.s3.upload_fileobj = failing_upload
+
+    async def write():
+        return {"id": "stall-1"}
+
+    async def undo(stall):
+        undone.append(stall["id"])
+
+    with pytest.raises(ClientError):
+        asyncio.run(service.store_image_with(prepared, write(), undo=undo))
+    assert undone == ["stall-1"]
+    assert service.dynamodb.refs[prepared["key"]] == 0
+
+def test_client_is_created_on_first_use(monkeypatch):
+    client = FakeS3()
+    monkeypatch.setattr(s3_service, "get_s3_client", lambda: client)
+
+    service = S3Service()
+    assert service._s3 is None
+    assert service.s3 is client
+
+class SweepingRefs(FakeRefs):
+    """Reference counts for an image the sweeper is deleting right now"""
+
+    def __init__(self, service, key, polls_until_done):
+        super().__init__()
+        self.service = service
+        self.key = key
+        self.polls_until_done = polls_until_done
+
+    async def update_item(self, table_name, key, update_expression, expression_attribute_values, **kwargs):
+        row = await super().update_item(table_name, key, update_expression, expression_attribute_values, **kwargs)
+        if key["key"] == self.key:
+            row["sweeping"] = int(time.time())
+        return row
+
+    async def get_item(self, table_name, key, **kwargs):
+        self.polls_until_done -= 1
+        if self.polls_until_done > 0:
+            return {"key": key["key"], "refs": self.refs[key["key"]], "sweeping": int(time.time())}
+        # The sweeper deleted the objects and dropped its claim
+        self.service.s3.objects.clear()
+        return {"key": key["key"], "refs": self.refs[key["key"]]}
+
+def test_reuploading_an_image_being_swept_stores_it_again(monkeypatch):
+    monkeypatch.setattr(s3_service, "IMAGE_SWEEP_POLL_SECONDS", 0)
+    service = make_service()
+    data = png_bytes((10, 20, 30))
+    first = asyncio.run(service.upload_image(Upload(data), "menu_items"))
+    key = service.get_key(first["image_url"])
+    asyncio.run(service.release_image(first["image_url"]))
+
+    refs = SweepingRefs(service, key, polls_until_done=3)
+    refs.refs = dict(service.dynamodb.refs)
+    service.dynamodb = refs
+    second = asyncio.run(service.upload_image(Upload(data), "menu_items"))
+
+    assert second == first
+    assert refs.polls_until_done == 0
+    assert service.s3.uploads == 2
+    assert key in service.s3.objects
+
+class DirectUploadS3(FakeS3):
+    """FakeS3 holding one object a client uploaded with a presigned POST"""
+
+    def __init__(self, key, data, checksum=None):
+        super().__init__()
+        self.data = {key: data}
+        self.objects[key] = {"ContentType": "image/png", "ContentLength": len(data), "Metadata": {}}
+        if checksum:
+            self.objects[key]["ChecksumSHA256"] = checksum
+        self.downloads = 0
+
+    def download_fileobj(self, bucket, key, fileobj, Config=None):
+        self.downloads += 1
+        fileobj.write(self.data[key])
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective, **kwargs):
+        self.objects[Key] = {"ContentType": kwargs["ContentType"], "Metadata": kwargs["Metadata"]}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+def finalize(service, key):
+    async def run():
+        prepared = await service.finalize_direct_upload(key, "menu_items", "owner-1")
+        await service.store_image(prepared)
+        return prepared
+    return asyncio.run(run())
+
+def test_direct_upload_with_checksum_is_not_downloaded_when_already_stored():
+    data = png_bytes((1, 2, 3))
+    service = make_service()
+    stored = asyncio.run(service.upload_image(Upload(data), "menu_items"))
+
+    key = "menu_items/uploads/owner-1/a.png"
+    checksum = base64.b64encode(hashlib.sha256(data).digest()).decode("ascii")
+    service.s3 = DirectUploadS3(key, data, checksum)
+    service.s3.objects[service.get_key(stored["image_url"])] = {"Metadata": {"variants": "thumb"}}
+    prepared = finalize(service, key)
+
+    assert prepared["image_url"] == stored["image_url"]
+    assert service.s3.downloads == 0
+
+def test_direct_upload_with_checksum_is_downloaded_once_to_render_variants():
+    data = png_bytes((4, 5, 6))
+    key = "menu_items/uploads/owner-1/a.png"
+    checksum = base64.b64encode(hashlib.sha256(data).digest()).decode("ascii")
+    service = make_service()
+    service.s3 = DirectUploadS3(key, data, checksum)
+    prepared = finalize(service, key)
+
+    assert service.get_key(prepared["image_url"]) == f"menu_items/{hashlib.sha256(data).hexdigest()}.png"
+    assert set(prepared["image_variants"]) == {"thumb", "detail", "full"}
+    assert service.s3.downloads == 1
+    assert key not in service.s3.objects
+
+def test_direct_upload_without_checksum_is_hashed_from_a_streamed_copy():
+    data = png_bytes((7, 8, 9))
+    key = "menu_items/uploads/owner-1/a.png"
+    service = make_service()
+    service.s3 = DirectUploadS3(key, data)
+    prepared = finalize(service, key)
+
+    assert service.get_key(prepared["image_url"]) == f"menu_items/{hashlib.sha256(data).hexdigest()}.png"
+    assert service.s3.downloads == 1
+
+def test_oversized_direct_upload_is_refused(monkeypatch):
+    monkeypatch.setattr(s3_service, "MAX_UPLOAD_BYTES", 10)
+    key = "menu_items/uploads/owner-1/a.png"
+    service = make_service()
+    service.s3 = DirectUploadS3(key, png_bytes((0, 0, 0)))
+
+    with pytest.raises(ValueError):
+        asyncio.run(service.finalize_direct_upload(key, "menu_items", "owner-1"))
+    assert service.s3.downloads == 0
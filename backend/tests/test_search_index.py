@@ -0,0 +1,37 @@
+from app.utils.search_index import InvertedIndex, tokenize
+
+def build_index():
+    index = InvertedIndex(field_weights={"name": 3.0, "description": 1.0})
+    index.add("a", {"name": "Tonkotsu Ramen", "description": "Rich pork broth"}, payload={"id": "a"})
+    index.add("b", {"name": "Miso Soup", "description": "Goes well with ramen"}, payload={"id": "b"})
+    index.add("c", {"name": "Gyoza", "description": "Pan fried dumplings"}, payload={"id": "c"})
+    return index
+
+def test_tokenize_normalizes_case_and_width():
+    assert tokenize("ＲＡＭＥＮ Bowl!") == ["ramen", "bowl"]
+
+def test_tokenize_splits_cjk_into_bigrams():
+    assert tokenize("味噌ラーメン") == ["味噌", "噌ラ", "ラー", "ーメ", "メン"]
+
+def test_name_matches_rank_above_description_matches():
+    results = build_index().search("ramen")
+    assert [doc_key for _, doc_key, _ in results] == ["a", "b"]
+
+def test_prefix_matches_last_term_only():
+    index = build_index()
+    assert [doc_key for _, doc_key, _ in index.search("gyo")] == ["c"]
+    assert index.search("gyo", prefix=False) == []
+    assert index.search("ram pork") == []
+
+def test_all_terms_must_match():
+    results = build_index().search("ramen pork")
+    assert [doc_key for _, doc_key, _ in results] == ["a"]
+
+def test_remove_and_replace_documents():
+    index = build_index()
+    index.remove("a")
+    assert [doc_key for _, doc_key, _ in index.search("tonkotsu")] == []
+    index.add("b", {"name": "Shoyu Ramen"}, payload={"id": "b"})
+    assert [doc_key for _, doc_key, _ in index.search("miso")] == []
+    assert [doc_key for _, doc_key, _ in index.search("shoyu")] == ["b"]
+    assert "tonkotsu" not in index.vocabulary
@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from app.services.foodstall_service import FoodStallService
+from app.services.query_service import StallCatalog
+from app.utils.single_flight import SingleFlight
+
+class Call:
+    def __init__(self, value, delay=0.01):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        value = self.value
+        await asyncio.sleep(self.delay)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+class FakeScans:
+    """Just enough of DynamoDBService for full FoodStalls scans"""
+
+    def __init__(self, stalls):
+        self.stalls = stalls
+        self.scans = 0
+
+    async def scan_records(self, table_name, record_type, projection=None):
+        self.scans += 1
+        await asyncio.sleep(0.01)
+        return self.stalls
+
+def test_concurrent_calls_share_one_call():
+    flights = SingleFlight()
+    call = Call({"id": "a"})
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("a", call) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == [{"id": "a"}] * 10
+    assert call.calls == 1
+    assert flights.stats() == {"calls": 1, "coalesced": 9, "inflight": 0}
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flights = SingleFlight()
+    call = Call(RuntimeError("throttled"))
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("a", call) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(scenario()))
+    call.value = "ok"
+    assert asyncio.run(flights.do("a", call)) == "ok"
+    assert call.calls == 2
+
+def test_callers_after_forget_start_a_new_call():
+    flights = SingleFlight()
+    call = Call("old")
+
+    async def scenario():
+        first = asyncio.ensure_future(flights.do("a", call))
+        await asyncio.sleep(0)
+        flights.forget("a")
+        call.value = "new"
+        return await first, await flights.do("a", call)
+
+    assert asyncio.run(scenario()) == ("old", "new")
+    assert call.calls == 2
+
+def test_nearby_searches_from_almost_the_same_spot_share_one_scan():
+    service = FoodStallService()
+    service.query_service.catalog = StallCatalog()
+    service.dynamodb = FakeScans([
+        {"id": "near", "location": {"latitude": 35.6900, "longitude": 139.7000}},
+        {"id": "far", "location": {"latitude": 34.6937, "longitude": 135.5023}},
+    ])
+
+    async def scenario():
+        return await asyncio.gather(
+            service.get_food_stalls_by_location(35.69001, 139.70002, 5),
+            service.get_food_stalls_by_location(35.69004, 139.69998, 5),
+        )
+
+    first, second = asyncio.run(scenario())
+    assert [stall["id"] for stall in first] == ["near"] == [stall["id"] for stall in second]
+    assert first[0]["distance"] == pytest.approx(0.0)
+    assert "distance" not in service.dynamodb.stalls[0]
+    assert service.dynamodb.scans == 1
+
+    # A stall write changes the catalog version, so the next search is fresh
+    service.query_service.index_food_stall({"id": "new", "location": {"latitude": 35.691, "longitude": 139.7}})
+    asyncio.run(service.get_food_stalls_by_location(35.69001, 139.70002, 5))
+    assert service.dynamodb.scans == 2
@@ -0,0 +1,90 @@
+import os
+import re
+import pytest
+from app.cli import table_transfer
+from app.cli.table_transfer import TABLES, export_tables, import_tables
+
+TABLES_JS = os.path.join(os.path.dirname(__file__), "..", "..", "infrastructure", "dynamodb", "tables.js")
+
+class FakeClient:
+    """Low-level client double: segmented, paginated scans and throttled batch writes"""
+
+    def __init__(self, items=(), page_size=3, fail_after_scans=None):
+        self.items = {item["id"]["S"]: item for item in items}
+        self.page_size = page_size
+        self.fail_after_scans = fail_after_scans
+        self.scans = 0
+        self.batches = 0
+
+    def scan(self, TableName, Segment, TotalSegments, ExclusiveStartKey=None):
+        self.scans += 1
+        if self.fail_after_scans is not None and self.scans > self.fail_after_scans:
+            raise RuntimeError("connection lost")
+        ids = sorted(item_id for item_id in self.items if int(item_id) % TotalSegments == Segment)
+        if ExclusiveStartKey:
+            ids = [item_id for item_id in ids if item_id > ExclusiveStartKey["id"]["S"]]
+        page = ids[:self.page_size]
+        response = {"Items": [self.items[item_id] for item_id in page]}
+        if len(ids) > self.page_size:
+            response["LastEvaluatedKey"] = {"id": {"S": page[-1]}}
+        return response
+
+    def batch_write_item(self, RequestItems):
+        self.batches += 1
+        (table, requests), = RequestItems.items()
+        # The first batch is throttled halfway
+        unprocessed = requests[len(requests) // 2:] if self.batches == 1 else []
+        for request in requests[:len(requests) - len(unprocessed)]:
+            item = request["PutRequest"]["Item"]
+            self.items[item["id"]["S"]] = item
+        return {"UnprocessedItems": {table: unprocessed} if unprocessed else {}}
+
+def make_items(count):
+    return [
+        {"id": {"S": f"{i:04d}"}, "price": {"N": "4.5"}, "blob": {"B": b"\x00\x01"}, "tags": {"L": [{"S": "a"}]}}
+        for i in range(count)
+    ]
+
+def test_export_then_import_round_trips_every_item(tmp_path, monkeypatch):
+    monkeypatch.setattr(table_transfer.time, "sleep", lambda seconds: None)
+    source = FakeClient(make_items(40))
+    counts = export_tables(source, ["MenuItems"], str(tmp_path), segments=3, workers=3, part_items=5)
+    assert counts == {"MenuItems": 40}
+
+    target = FakeClient()
+    assert import_tables(target, ["MenuItems"], str(tmp_path), workers=2) == {"MenuItems": 40}
+    assert target.items == source.items
+
+    # Everything is checkpointed as done, so a rerun writes nothing
+    assert import_tables(target, ["MenuItems"], str(tmp_path)) == {"MenuItems": 0}
+
+def test_interrupted_exports_resume_without_duplicates(tmp_path):
+    items = make_items(30)
+    with pytest.raises(RuntimeError):
+        export_tables(FakeClient(items, fail_after_scans=4), ["Reviews"], str(tmp_path), segments=2, workers=1, part_items=3)
+
+    counts = export_tables(FakeClient(items), ["Reviews"], str(tmp_path), segments=2, workers=1, part_items=3)
+    assert counts == {"Reviews": 30}
+
+    target = FakeClient()
+    import_tables(target, ["Reviews"], str(tmp_path))
+    assert sorted(target.items) == [f"{i:04d}" for i in range(30)]
+
+def test_resuming_with_a_different_split_is_refused(tmp_path):
+    export_tables(FakeClient(make_items(3)), ["Users"], str(tmp_path), segments=2)
+    with pytest.raises(ValueError):
+        export_tables(FakeClient(make_items(3)), ["Users"], str(tmp_path), segments=4)
+
+@pytest.mark.skipif(not os.path.exists(TABLES_JS), reason="infrastructure/ is not checked out")
+def test_schemas_match_tables_js():
+    with open(TABLES_JS, encoding="utf-8") as f:
+        source = f.read()
+
+    for block in source.split("TableName: '")[1:]:
+        table = block.split("'", 1)[0]
+        if table not in TABLES or "KeySchema" not in block:
+            continue
+        indexes = set(re.findall(r"IndexName: '(\w+)'", block))
+        attributes = dict(re.findall(r"AttributeName: '(\w+)', AttributeType: '(\w)'", block))
+        assert indexes == set(TABLES[table]["indexes"]), table
+        assert attributes == TABLES[table]["attributes"], table
@@ -0,0 +1,210 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+
+from app.services import auth_service as auth_module
+from app.services.auth_service import AuthService, get_current_user
+from app.services.principal_cache import principal_cache, token_version_cache
+
+
+class FakeDynamo:
+    """Just enough of DynamoDBService for the RefreshTokens table"""
+
+    def __init__(self):
+        self.items = {}
+
+    async def put_item(self, table_name, item, **kwargs):
+        if "ConditionExpression" in kwargs and item["id"] in self.items:
+            raise ClientError(
+                {"Error": {"Code": "ConditionalCheckFailedException", "Message": "exists"}},
+                "PutItem"
+            )
+        self.items[item["id"]] = item
+
+    async def delete_item(self, table_name, key, **kwargs):
+        if key["id"] not in self.items:
+            raise ClientError(
+                {"Error": {"Code": "ConditionalCheckFailedException", "Message": "gone"}},
+                "DeleteItem"
+            )
+        return {"Attributes": self.items.pop(key["id"])}
+
+
+class FakeUsers:
+    def __init__(self, user):
+        self.user = user
+
+    async def get_user_by_id(self, user_id):
+        return dict(self.user) if user_id == self.user["id"] else None
+
+
+def make_user(token_version=0, revoked_version=0):
+    return {
+        "id": "user-1",
+        "email": "vendor@example.com",
+        "name": "Vendor",
+        "user_type": "vendor",
+        "token_version": token_version,
+        "revoked_version": revoked_version,
+    }
+
+
+def make_service(user):
+    service = AuthService()
+    service.dynamodb = FakeDynamo()
+    service.user_service = FakeUsers(user)
+    return service
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    token_version_cache.clear()
+    principal_cache.invalidate_user("user-1")
+    yield
+    token_version_cache.clear()
+    principal_cache.invalidate_user("user-1")
+
+
+def test_revoked_access_token_is_refused_in_lookup_mode(monkeypatch):
+    monkeypatch.setattr(auth_module, "STATELESS_AUTH", False)
+    service = make_service(make_user())
+    token = service.create_access_token(service.access_token_claims(make_user()))
+
+    # The principal is cached, as it would be after an earlier request
+    principal_cache.put("user-1", token, {"id": "user-1"}, expires_at=None)
+    token_version_cache.set("user-1", (0, 0))
+    assert asyncio.run(get_current_user(token))["id"] == "user-1"
+
+    # Logout everywhere bumps both versions
+    token_version_cache.set("user-1", (1, 1))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_current_user(token))
+    assert error.value.status_code == 401
+
+
+def test_profile_change_keeps_lookup_tokens_but_not_stateless_ones(monkeypatch):
+    service = make_service(make_user())
+    token = service.create_access_token(service.access_token_claims(make_user()))
+    principal_cache.put("user-1", token, {"id": "user-1"}, expires_at=None)
+    # A profile change moves token_version but not revoked_version
+    token_version_cache.set("user-1", (1, 0))
+
+    monkeypatch.setattr(auth_module, "STATELESS_AUTH", False)
+    assert asyncio.run(get_current_user(token))["id"] == "user-1"
+
+    monkeypatch.setattr(auth_module, "STATELESS_AUTH", True)
+    with pytest.raises(HTTPException):
+        asyncio.run(get_current_user(token))
+
+
+def test_refresh_token_works_once():
+    service = make_service(make_user())
+    refresh_token = asyncio.run(service.issue_refresh_token(make_user()))
+
+    tokens = asyncio.run(service.refresh_user_tokens(refresh_token))
+    assert tokens is not None
+    assert tokens["refresh_token"] != refresh_token
+    assert asyncio.run(service.refresh_user_tokens(refresh_token)) is None
+
+    # The replacement is good for one more exchange
+    assert asyncio.run(service.refresh_user_tokens(tokens["refresh_token"])) is not None
+
+
+def test_refresh_token_issued_before_revocation_is_refused():
+    service = make_service(make_user())
+    refresh_token = asyncio.run(service.issue_refresh_token(make_user()))
+
+    service.user_service = FakeUsers(make_user(token_version=1, revoked_version=1))
+    assert asyncio.run(service.refresh_user_tokens(refresh_token)) is None
+
+
+def test_refresh_token_that_was_never_issued_is_refused():
+    service = make_service(make_user())
+    forged = service.create_refresh_token(make_user(), "not-recorded")
+    assert asyncio.run(service.refresh_user_tokens(forged)) is None
+
+
+def test_tokens_without_a_version_claim_keep_working(monkeypatch):
+    monkeypatch.setattr(auth_module, "STATELESS_AUTH", True)
+    service = make_service(make_user())
+    claims = service.access_token_claims(make_user())
+    del claims["ver"]
+    token = service.create_access_token(claims)
+
+    # Not trusted as stateless claims; resolved through the principal lookup
+    principal_cache.put("user-1", token, {"id": "user-1", "name": "Looked up"}, expires_at=None)
+    token_version_cache.set("user-1", (3, 0))
+    assert asyncio.run(get_current_user(token))["name"] == "Looked up"
+
+    # But refused once the user revokes their tokens
+    token_version_cache.set("user-1", (4, 1))
+    with pytest.raises(HTTPException):
+        asyncio.run(get_current_user(token))
+
+
+def test_refresh_tokens_from_before_rotation_work_once():
+    service = make_service(make_user())
+    legacy = service.create_access_token(
+        {"sub": "user-1", "type": "refresh"}, expires_delta=timedelta(days=1)
+    )
+
+    assert asyncio.run(service.refresh_user_tokens(legacy)) is not None
+    assert asyncio.run(service.refresh_user_tokens(legacy)) is None
+
+
+class FakeUserUpdates:
+    """Applies profile updates the way UserService.update_user bumps versions"""
+
+    def __init__(self, user):
+        self.user = user
+        self.updates = 0
+
+    async def get_user_by_email(self, email):
+        return None
+
+    async def update_user(self, user_id, name=None, email=None, password=None):
+        if not (name or email or password):
+            return dict(self.user)
+        self.updates += 1
+        if password:
+            self.user["revoked_version"] = self.user["token_version"] + 1
+        self.user["token_version"] += 1
+        self.user.update({key: value for key, value in (("name", name), ("email", email)) if value})
+        token_version_cache.set(self.user["id"], (self.user["token_version"], self.user["revoked_version"]))
+        return dict(self.user)
+
+
+def test_profile_update_returns_tokens_that_keep_the_caller_signed_in(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.routers import users
+
+    monkeypatch.setattr(auth_module, "STATELESS_AUTH", True)
+    user = make_user()
+    fake_users = FakeUserUpdates(user)
+    monkeypatch.setattr(users, "user_service", fake_users)
+    monkeypatch.setattr(users.auth_service, "dynamodb", FakeDynamo())
+    app = FastAPI()
+    app.include_router(users.router, prefix="/users")
+    app.dependency_overrides[get_current_user] = lambda: {
+        "id": "user-1", "name": "Vendor", "email": "vendor@example.com", "user_type": "vendor"
+    }
+    client = TestClient(app)
+
+    # Nothing changed: no version bump, no new tokens
+    response = client.put("/users/me", json={"name": "Vendor"})
+    assert response.status_code == 200
+    assert response.json()["access_token"] is None
+    assert fake_users.updates == 0
+
+    response = client.put("/users/me", json={"name": "Renamed", "password": "new secret"})
+    body = response.json()
+    assert body["name"] == "Renamed"
+    assert asyncio.run(get_current_user(body["access_token"]))["name"] == "Renamed"
+
+    # The new refresh token survives the revocation the password change made
+    monkeypatch.setattr(users.auth_service, "user_service", FakeUsers(fake_users.user))
+    assert asyncio.run(users.auth_service.refresh_user_tokens(body["refresh_token"])) is not None
@@ -0,0 +1,45 @@
+from app.utils.ttl_cache import TTLCache
+from app.services.principal_cache import PrincipalCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(max_size=10, ttl=30, clock=clock)
+    cache.set("a", 1)
+    clock.now = 29
+    assert cache.get("a") == 1
+    clock.now = 31
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_size=2, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_entry_ttl_cannot_exceed_cache_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("a", 1, ttl=100)
+    clock.now = 11
+    assert cache.get("a") is None
+
+def test_invalidate_user_drops_all_their_tokens():
+    cache = PrincipalCache(max_size=10, ttl=60)
+    cache.put("u1", "token-1", {"id": "u1"})
+    cache.put("u1", "token-2", {"id": "u1"})
+    cache.put("u2", "token-3", {"id": "u2"})
+    assert cache.invalidate_user("u1") == 2
+    assert cache.get("u1", "token-1") is None
+    assert cache.get("u2", "token-3") == {"id": "u2"}
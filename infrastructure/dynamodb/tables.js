@@ -233,6 +233,127 @@ const createReviewsTable = async () => {
   }
 };
 
+// Menu Documents Table (materialized menu per food stall)
+const createMenuDocumentsTable = async () => {
+  const params = {
+    TableName: 'MenuDocuments',
+    KeySchema: [
+      { AttributeName: 'food_stall_id', KeyType: 'HASH' }
+    ],
+    AttributeDefinitions: [
+      { AttributeName: 'food_stall_id', AttributeType: 'S' }
+    ],
+    ProvisionedThroughput: {
+      ReadCapacityUnits: 5,
+      WriteCapacityUnits: 5
+    }
+  };
+
+  try {
+    await dynamodb.createTable(params).promise();
+    console.log('MenuDocuments table created successfully');
+  } catch (error) {
+    if (error.code === 'ResourceInUseException') {
+      console.log('MenuDocuments table already exists');
+    } else {
+      console.error('Error creating MenuDocuments table:', error);
+    }
+  }
+};
+
+// Login Attempts Table (shared login throttling counters)
+const createLoginAttemptsTable = async () => {
+  const params = {
+    TableName: 'LoginAttempts',
+    KeySchema: [
+      { AttributeName: 'key', KeyType: 'HASH' }
+    ],
+    AttributeDefinitions: [
+      { AttributeName: 'key', AttributeType: 'S' }
+    ],
+    ProvisionedThroughput: {
+      ReadCapacityUnits: 5,
+      WriteCapacityUnits: 5
+    }
+  };
+
+  try {
+    await dynamodb.createTable(params).promise();
+    await dynamodb.waitFor('tableExists', { TableName: 'LoginAttempts' }).promise();
+    await dynamodb.updateTimeToLive({
+      TableName: 'LoginAttempts',
+      TimeToLiveSpecification: { AttributeName: 'expires_at', Enabled: true }
+    }).promise();
+    console.log('LoginAttempts table created successfully');
+  } catch (error) {
+    if (error.code === 'ResourceInUseException') {
+      console.log('LoginAttempts table already exists');
+    } else {
+      console.error('Error creating LoginAttempts table:', error);
+    }
+  }
+};
+
+const createImageRefsTable = async () => {
+  const params = {
+    TableName: 'ImageRefs',
+    KeySchema: [
+      { AttributeName: 'key', KeyType: 'HASH' }
+    ],
+    AttributeDefinitions: [
+      { AttributeName: 'key', AttributeType: 'S' }
+    ],
+    ProvisionedThroughput: {
+      ReadCapacityUnits: 5,
+      WriteCapacityUnits: 5
+    }
+  };
+
+  try {
+    await dynamodb.createTable(params).promise();
+    console.log('ImageRefs table created successfully');
+  } catch (error) {
+    if (error.code === 'ResourceInUseException') {
+      console.log('ImageRefs table already exists');
+    } else {
+      console.error('Error creating ImageRefs table:', error);
+    }
+  }
+};
+
+// Refresh Tokens Table (outstanding single-use refresh tokens)
+const createRefreshTokensTable = async () => {
+  const params = {
+    TableName: 'RefreshTokens',
+    KeySchema: [
+      { AttributeName: 'id', KeyType: 'HASH' }
+    ],
+    AttributeDefinitions: [
+      { AttributeName: 'id', AttributeType: 'S' }
+    ],
+    ProvisionedThroughput: {
+      ReadCapacityUnits: 5,
+      WriteCapacityUnits: 5
+    }
+  };
+
+  try {
+    await dynamodb.createTable(params).promise();
+    await dynamodb.waitFor('tableExists', { TableName: 'RefreshTokens' }).promise();
+    await dynamodb.updateTimeToLive({
+      TableName: 'RefreshTokens',
+      TimeToLiveSpecification: { AttributeName: 'expires_at', Enabled: true }
+    }).promise();
+    console.log('RefreshTokens table created successfully');
+  } catch (error) {
+    if (error.code === 'ResourceInUseException') {
+      console.log('RefreshTokens table already exists');
+    } else {
+      console.error('Error creating RefreshTokens table:', error);
+    }
+  }
+};
+
 // Create all tables
 const createAllTables = async () => {
   console.log('Creating DynamoDB tables with credentials from .env file...');
@@ -243,6 +364,10 @@ const createAllTables = async () => {
     await createFoodStallsTable();
     await createMenuItemsTable();
     await createReviewsTable();
+    await createMenuDocumentsTable();
+    await createLoginAttemptsTable();
+    await createImageRefsTable();
+    await createRefreshTokensTable();
     console.log('All tables created or already exist');
   } catch (error) {
     console.error('Error creating tables:', error);
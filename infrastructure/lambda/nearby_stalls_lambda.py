@@ -2,11 +2,12 @@ import json
 import boto3
 import os
 import math
-from decimal import Decimal
 
 # DynamoDB configuration
-dynamodb = boto3.resource('dynamodb')
-food_stalls_table = dynamodb.Table(os.environ.get('FOOD_STALLS_TABLE', 'FoodStalls'))
+# The low-level client returns numbers as strings, which are parsed straight
+# to ints and floats instead of going through the resource API's Decimals
+dynamodb = boto3.client('dynamodb')
+FOOD_STALLS_TABLE = os.environ.get('FOOD_STALLS_TABLE', 'FoodStalls')
 
 def lambda_handler(event, context):
     try:
@@ -30,8 +31,8 @@ def lambda_handler(event, context):
             }
         
         # Get all food stalls from DynamoDB
-        response = food_stalls_table.scan()
-        food_stalls = response.get('Items', [])
+        response = dynamodb.scan(TableName=FOOD_STALLS_TABLE)
+        food_stalls = [from_dynamodb_item(item) for item in response.get('Items', [])]
         
         # Calculate distance for each food stall and filter by radius
         nearby_stalls = []
@@ -47,8 +48,6 @@ def lambda_handler(event, context):
                 )
                 
                 if distance <= radius:
-                    # Convert Decimal objects to float for JSON serialization
-                    stall = json_serialize(stall)
                     stall['distance'] = round(distance, 2)
                     nearby_stalls.append(stall)
         
@@ -80,13 +79,23 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     
     return c * r
 
-def json_serialize(obj):
-    """Helper function to convert Decimal objects to float for JSON serialization"""
-    if isinstance(obj, dict):
-        return {k: json_serialize(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [json_serialize(item) for item in obj]
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    else:
-        return obj
\ No newline at end of file
+def from_dynamodb_value(value):
+    """Convert a low-level client attribute value (e.g. {"N": "4.5"}) to a plain Python value"""
+    for tag, inner in value.items():
+        if tag == 'S':
+            return inner
+        if tag == 'N':
+            return float(inner) if '.' in inner or 'e' in inner or 'E' in inner else int(inner)
+        if tag == 'M':
+            return {k: from_dynamodb_value(v) for k, v in inner.items()}
+        if tag == 'L':
+            return [from_dynamodb_value(v) for v in inner]
+        if tag == 'NULL':
+            return None
+        if tag in ('SS', 'NS', 'BS'):
+            return [from_dynamodb_value({tag[0]: v}) for v in inner]
+        return inner
+
+def from_dynamodb_item(item):
+    """Convert a low-level client item to a JSON-ready dict"""
+    return {k: from_dynamodb_value(v) for k, v in item.items()}